@@ -1,6 +1,6 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.contrib.auth.admin import UserAdmin
-from .models import Student, Subject, Course, User, Staff
+from .models import Student, Subject, Course, User, Staff, Professor, ClassRanking, GradeArchive, GradeAuditEntry
 
 class CustomUserAdmin(UserAdmin):
     list_display = ('username', 'email', 'role', 'is_staff')
@@ -29,15 +29,80 @@ class CustomUserAdmin(UserAdmin):
 class StaffAdmin(admin.ModelAdmin):
     list_display = ('user',)
     search_fields = ('user__username',)
+    list_select_related = ('user',)
+
+class ProfessorAdmin(admin.ModelAdmin):
+    list_display = ('name', 'staff')
+    search_fields = ('name', 'staff__user__username')
+    list_select_related = ('staff__user',)
 
 class StudentAdmin(admin.ModelAdmin):
     list_display = ('user', 'student_number', 'year_level', 'course')
     search_fields = ('user__username', 'student_number', 'course__name')
+    list_select_related = ('user', 'course')
+    actions = ['preview_term_rollover', 'rollover_to_next_term']
+
+    def _rollover(self, request, queryset, dry_run):
+        from .rollover import rollover_students
+        reports = rollover_students(queryset, dry_run=dry_run)
+        prefix = "Dry run: " if dry_run else ""
+        for report in reports:
+            self.message_user(
+                request,
+                f"{prefix}{report.course_name} {report.source_label} -> {report.target_label}: "
+                f"{report.students} student(s), {report.grades_done} grade(s) marked Done, "
+                f"{report.grades_created} grade row(s) created.",
+                messages.WARNING if report.skipped else messages.SUCCESS,
+            )
+        if not reports:
+            self.message_user(request, "No enrolled students with a course were selected.", messages.WARNING)
+
+    def preview_term_rollover(self, request, queryset):
+        self._rollover(request, queryset, dry_run=True)
+    preview_term_rollover.short_description = "Preview rolling selected students over to the next term"
+
+    def rollover_to_next_term(self, request, queryset):
+        self._rollover(request, queryset, dry_run=False)
+    rollover_to_next_term.short_description = "Roll selected students over to the next term"
+
+class ClassRankingAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'year_level', 'semester_order', 'academic_year', 'rank', 'gwa', 'standing')
+    list_filter = ('standing', 'academic_year', 'year_level', 'course')
+    search_fields = ('student__first_name', 'student__last_name', 'student__student_number')
+    list_select_related = ('student__user', 'course')
+    ordering = ('course', 'year_level', 'semester_order', 'academic_year', 'rank')
+
+class GradeArchiveAdmin(admin.ModelAdmin):
+    list_display = ('student', 'subject', 'grade_value', 'semester', 'academic_year', 'status', 'is_active', 'archived_at')
+    list_filter = ('academic_year', 'semester', 'status')
+    search_fields = ('student__first_name', 'student__last_name', 'student__student_number', 'subject__subject_code')
+    list_select_related = ('student__user', 'subject')
+
+class GradeAuditEntryAdmin(admin.ModelAdmin):
+    """Read-only: the audit log is append-only"""
+    list_display = ('recorded_at', 'grade_id', 'student', 'subject', 'action', 'old_value', 'new_value', 'actor')
+    list_filter = ('action', 'academic_year', 'semester_order')
+    search_fields = ('grade_id', 'student__student_number', 'student__last_name', 'subject__subject_code')
+    list_select_related = ('student__user', 'subject', 'actor')
+    ordering = ('-recorded_at', '-id')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
 
 
 
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(Staff, StaffAdmin)
+admin.site.register(Professor, ProfessorAdmin)
 admin.site.register(Student, StudentAdmin)
 admin.site.register(Subject)
 admin.site.register(Course)
+admin.site.register(ClassRanking, ClassRankingAdmin)
+admin.site.register(GradeArchive, GradeArchiveAdmin)
+admin.site.register(GradeAuditEntry, GradeAuditEntryAdmin)
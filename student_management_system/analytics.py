@@ -0,0 +1,206 @@
+"""
+Grade distribution analytics per subject, professor and term.
+
+The database does the work: grades are bucketed on the grade scale with a CASE
+expression and grouped, so each group returns at most one row per bucket with
+its count, sum and sum of squares. Means and standard deviations are exact;
+percentiles resolve to the bucket, which on the 1.00-5.00 scale is the grade
+itself. Archived grades are grouped alongside in the same UNION ALL query, so
+closed terms keep their distributions. Results are cached under a grade
+version counter that every grade change bumps, so dashboards hit the cache
+while grades are being entered and recompute after the next change.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, Count, F, IntegerField, Sum, Value, When
+
+from .gpa import PASSING_GRADE
+from .models import Grade, GradeArchive, SEMESTER_ORDER, semester_order
+
+# Lower edges of the passing buckets; everything above PASSING_GRADE is "Failed"
+GRADE_BUCKETS = (1.00, 1.25, 1.50, 1.75, 2.00, 2.25, 2.50, 2.75, 3.00)
+FAILED_BUCKET = len(GRADE_BUCKETS)
+BUCKET_LABELS = [f'{edge:.2f}' for edge in GRADE_BUCKETS] + ['Failed']
+PERCENTILES = (25, 50, 75, 90)
+
+# Dimension name -> {output key: grade lookup}
+GROUPINGS = {
+    'subject': {
+        'subject_id': 'subject_id',
+        'subject_code': 'subject__subject_code',
+        'subject_name': 'subject__subject_name',
+    },
+    'professor': {
+        'professor_id': 'subject__professor_id',
+        'professor_name': 'subject__professor_name',
+    },
+    'term': {
+        'academic_year': 'academic_year',
+        'semester_order': 'semester_order',
+    },
+}
+# Query parameter -> grade lookup
+FILTERS = {
+    'subject': 'subject_id',
+    'professor': 'subject__professor_id',
+    'course': 'subject__course_id',
+    'year_level': 'year_level',
+    'academic_year': 'academic_year',
+    'semester': 'semester_order',
+}
+SEMESTER_LABELS = {order: semester for semester, order in SEMESTER_ORDER.items()}
+
+GRADE_VERSION_KEY = 'analytics:grade-version'
+
+
+def grade_version():
+    """Current grade version; starts from the clock so an evicted counter never reuses an old value"""
+    version = cache.get(GRADE_VERSION_KEY)
+    if version is None:
+        cache.add(GRADE_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(GRADE_VERSION_KEY)
+    return version
+
+
+def bump_grade_version():
+    """Invalidate every cached distribution; called after grade changes commit"""
+    try:
+        cache.incr(GRADE_VERSION_KEY)
+    except ValueError:
+        cache.add(GRADE_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+
+
+def parse_distribution_params(params):
+    """(group_by, filters) from request parameters; raises ValueError on unknown or malformed values"""
+    group_by = [name.strip() for name in params.get('group_by', 'subject').split(',') if name.strip()]
+    unknown = [name for name in group_by if name not in GROUPINGS]
+    if unknown or not group_by:
+        raise ValueError(f"group_by must be a comma separated list of {', '.join(GROUPINGS)}")
+    filters = {}
+    for param, lookup in FILTERS.items():
+        value = params.get(param)
+        if value in (None, ''):
+            continue
+        if param == 'semester':
+            filters[lookup] = semester_order(value)
+        elif param == 'academic_year':
+            filters[lookup] = value
+        else:
+            try:
+                filters[lookup] = int(value)
+            except ValueError:
+                raise ValueError(f"Invalid value '{value}' for {param}")
+    return group_by, filters
+
+
+def grade_bucket():
+    """CASE expression mapping grade_value to its index in BUCKET_LABELS (NULL when ungraded)"""
+    whens = [When(grade_value__lt=edge, then=Value(index)) for index, edge in enumerate(GRADE_BUCKETS[1:])]
+    whens.append(When(grade_value__lte=PASSING_GRADE, then=Value(FAILED_BUCKET - 1)))
+    whens.append(When(grade_value__isnull=False, then=Value(FAILED_BUCKET)))
+    return Case(*whens, default=None, output_field=IntegerField())
+
+
+def _bucket_rows(group_by, filters):
+    """
+    Grouped bucket rows of live and archived grades: both tables are grouped in one
+    UNION ALL query and a (group, bucket) present in both is merged here
+    """
+    lookups = {key: lookup for name in group_by for key, lookup in GROUPINGS[name].items()}
+    columns = list(lookups.values()) + ['bucket', 'count', 'total', 'squares']
+
+    def grouped(model):
+        return model.objects.filter(is_active=True, **filters).values(*lookups.values()).annotate(
+            bucket=grade_bucket()
+        ).values(*lookups.values(), 'bucket').annotate(
+            count=Count('pk'),
+            total=Sum('grade_value'),
+            squares=Sum(F('grade_value') * F('grade_value')),
+        ).order_by().values_list(*columns)
+
+    merged = {}
+    for values in grouped(Grade).union(grouped(GradeArchive), all=True):
+        row = dict(zip(columns, values))
+        key = values[:len(lookups) + 1]
+        seen = merged.setdefault(key, row)
+        if seen is row:
+            continue
+        seen['count'] += row['count']
+        for column in ('total', 'squares'):
+            if row[column] is not None:
+                seen[column] = (seen[column] or 0) + row[column]
+    return lookups, merged.values()
+
+
+def _percentile(buckets, graded, percentile):
+    """Nearest-rank percentile over (bucket, count, mean) triples in bucket order"""
+    target = max(math.ceil(graded * percentile / 100), 1)
+    seen = 0
+    for _, count, mean in buckets:
+        seen += count
+        if seen >= target:
+            return round(mean, 2)
+    return None
+
+
+def _summarize(keys, bucket_rows):
+    graded_rows = sorted((row['bucket'], row['count'], float(row['total']) / row['count'])
+                         for row in bucket_rows if row['bucket'] is not None)
+    enrolled = sum(row['count'] for row in bucket_rows)
+    graded = sum(count for _, count, _ in graded_rows)
+    total = sum(float(row['total'] or 0) for row in bucket_rows)
+    squares = sum(float(row['squares'] or 0) for row in bucket_rows)
+    failed = sum(count for bucket, count, _ in graded_rows if bucket == FAILED_BUCKET)
+    counts = dict((bucket, count) for bucket, count, _ in graded_rows)
+
+    summary = dict(keys)
+    if 'semester_order' in summary:
+        summary['semester'] = SEMESTER_LABELS.get(summary['semester_order'], '')
+    mean = total / graded if graded else None
+    summary.update({
+        'enrolled': enrolled,
+        'graded': graded,
+        'mean': round(mean, 4) if graded else None,
+        'std_dev': round(math.sqrt(max(squares / graded - mean * mean, 0.0)), 4) if graded else None,
+        'pass_rate': round((graded - failed) / graded, 4) if graded else None,
+        'failed': failed,
+        'percentiles': {f'p{p}': _percentile(graded_rows, graded, p) if graded else None for p in PERCENTILES},
+        'histogram': [{'bucket': label, 'count': counts.get(index, 0)} for index, label in enumerate(BUCKET_LABELS)],
+    })
+    return summary
+
+
+def compute_distribution(group_by, filters):
+    """Distribution summaries of active grades, one per group; a single grouped query"""
+    lookups, rows = _bucket_rows(group_by, filters)
+    groups = {}
+    for row in rows:
+        key = tuple(row[lookup] for lookup in lookups.values())
+        groups.setdefault(key, []).append(row)
+    return [
+        _summarize(zip(lookups, key), groups[key])
+        for key in sorted(groups, key=lambda key: tuple((value is None, str(value)) for value in key))
+    ]
+
+
+def grade_distribution(group_by=('subject',), filters=None):
+    """
+    Cached compute_distribution: {'version', 'group_by', 'groups'}. The cache key carries
+    the grade version, so a grade change makes the next call recompute.
+    """
+    from .metrics import record_cache_lookup
+
+    filters = filters or {}
+    version = grade_version()
+    digest = hashlib.md5(repr((list(group_by), sorted(filters.items()))).encode(), usedforsecurity=False).hexdigest()
+    key = f'analytics:grades:{version}:{digest}'
+    result = cache.get(key)
+    record_cache_lookup('analytics', result is not None)
+    if result is None:
+        result = {'version': version, 'group_by': list(group_by), 'groups': compute_distribution(group_by, filters)}
+        cache.set(key, result, getattr(settings, 'ANALYTICS_CACHE_TIMEOUT', 3600))
+    return result
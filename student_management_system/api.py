@@ -0,0 +1,315 @@
+"""
+Read-only REST API, mounted under /api/v1/.
+
+Every list endpoint uses cursor pagination (?cursor=, ?page_size= up to 500) and
+accepts sparse fieldsets (?fields=id,name). The query budget of each endpoint
+is listed in its docstring and excludes the session and user lookups that
+every authenticated request makes. GET requests read from a replica when
+DATABASE_REPLICAS are configured (see replicas.py).
+"""
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import permissions, viewsets
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.decorators import action
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.routers import DefaultRouter
+
+from .archive import GradeHistory
+from .middleware import resolve_role
+from .models import User, Student, Course, Subject, Grade, ClassRanking, GradeAuditEntry, semester_order
+from .serializers import (
+    StudentSerializer, CourseSerializer, SubjectSerializer, GradeSerializer, ClassRankingSerializer,
+    GradeAuditEntrySerializer,
+)
+
+
+class ApiCursorPagination(CursorPagination):
+    ordering = 'id'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class RankCursorPagination(ApiCursorPagination):
+    ordering = ('rank', 'id')
+
+
+class HistoryCursorPagination(ApiCursorPagination):
+    ordering = ('recorded_at', 'id')
+
+
+class ApiLimitOffsetPagination(LimitOffsetPagination):
+    """For computed (non-queryset) results, which have no ordering a cursor could follow"""
+    default_limit = 50
+    max_limit = 500
+
+
+class IsAdminOrStaff(permissions.BasePermission):
+    """Only admins and staff members may read the API"""
+    def has_permission(self, request, view):
+        # DRF may authenticate a different user than the session middleware saw, so resolve the role here
+        return resolve_role(request.user) in (User.Role.ADMIN, User.Role.STAFF)
+
+
+class ReadOnlyApiViewSet(viewsets.ReadOnlyModelViewSet):
+    pagination_class = ApiCursorPagination
+    permission_classes = [IsAdminOrStaff]
+    replica_reads = True
+    # Maps query parameters to queryset filters, e.g. {'course': 'course_id'}
+    filter_params = {}
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        for param, lookup in self.filter_params.items():
+            value = self.request.query_params.get(param)
+            if value in (None, ''):
+                continue
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except (ValueError, DjangoValidationError):
+                raise ValidationError({param: f"Invalid value '{value}'."})
+        return queryset
+
+
+class StudentViewSet(ReadOnlyApiViewSet):
+    """
+    Students. Filters: ?course=, ?year_level=, ?status=, ?semester=, ?academic_year=.
+    Query budget: 1 query per page.
+    """
+    queryset = Student.objects.select_related('course', 'department_name')
+    serializer_class = StudentSerializer
+    filter_params = {
+        'course': 'course_id',
+        'year_level': 'year_level',
+        'status': 'student_status',
+        'semester': 'semester',
+        'academic_year': 'academic_year',
+    }
+
+
+class CourseViewSet(ReadOnlyApiViewSet):
+    """
+    Courses. Filters: ?department=.
+    Query budget: 1 query per page.
+    """
+    queryset = Course.objects.select_related('department_name')
+    serializer_class = CourseSerializer
+    filter_params = {'department': 'department_name_id'}
+
+
+class SubjectViewSet(ReadOnlyApiViewSet):
+    """
+    Subjects. Filters: ?course=, ?year_level=, ?semester=, ?professor=.
+    Query budget: 1 query per page.
+    """
+    queryset = Subject.objects.select_related('department_name')
+    serializer_class = SubjectSerializer
+    filter_params = {
+        'course': 'course_id_id',
+        'year_level': 'year_level',
+        'semester': 'semester_offered',
+        'professor': 'professor_id',
+    }
+
+    @action(detail=True)
+    def roster(self, request, pk=None):
+        """
+        Students with an active grade in the subject; 404 for an unknown subject.
+        Query budget: 2 queries per page.
+        """
+        subject = self.get_object()
+        students = Student.objects.select_related('course', 'department_name').filter(
+            grades__subject=subject, grades__is_active=True
+        ).distinct()
+        page = self.paginate_queryset(students)
+        serializer = StudentSerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
+
+
+class GradeViewSet(ReadOnlyApiViewSet):
+    """
+    Grades, live and archived (see archive.py); archived grades keep the id they had
+    while live. Filters: ?student=, ?subject=, ?academic_year=, ?semester=, ?status=,
+    ?active=true|false.
+    Query budget: 1 query per page.
+    """
+    queryset = GradeHistory()
+    serializer_class = GradeSerializer
+    filter_params = {
+        'student': 'student_id',
+        'subject': 'subject_id',
+        'academic_year': 'academic_year',
+        'semester': 'semester',
+        'status': 'status',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        active = self.request.query_params.get('active')
+        if active is not None:
+            queryset = queryset.filter(is_active=active.lower() in ('1', 'true', 'yes'))
+        return queryset
+
+    def get_object(self):
+        # GradeHistory is not a QuerySet, so look the grade up with a one-row slice
+        try:
+            grades = self.get_queryset().filter(pk=self.kwargs['pk'])[:1]
+        except (ValueError, DjangoValidationError):
+            raise NotFound()
+        if not grades:
+            raise NotFound()
+        self.check_object_permissions(self.request, grades[0])
+        return grades[0]
+
+
+class ClassRankingViewSet(ReadOnlyApiViewSet):
+    """
+    Precomputed class rankings in rank order (see `manage.py compute_rankings`).
+    Filters: ?course=, ?year_level=, ?semester=, ?academic_year=, ?student=, ?standing=.
+    The dean's list of a cohort: ?course=&year_level=&semester=&academic_year=&standing=Dean's List.
+    Query budget: 1 query per page.
+    """
+    queryset = ClassRanking.objects.select_related('student')
+    serializer_class = ClassRankingSerializer
+    pagination_class = RankCursorPagination
+    filter_params = {
+        'course': 'course_id',
+        'year_level': 'year_level',
+        'academic_year': 'academic_year',
+        'student': 'student_id',
+        'standing': 'standing',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        semester = self.request.query_params.get('semester')
+        if semester:
+            queryset = queryset.filter(semester_order=semester_order(semester))
+        return queryset
+
+
+class GradeHistoryViewSet(ReadOnlyApiViewSet):
+    """
+    Grade audit trail, oldest change first. Filters: ?grade=, ?student=, ?subject=,
+    ?academic_year=, ?semester=, ?action=C|U|D. ?student=&subject= follows one subject
+    across deleted and re-created grades. Reads never write the audit buffer (that would
+    pin the request to the primary), so a change appears once its process flushes it,
+    within AUDIT_FLUSH_INTERVAL.
+    Query budget: 1 query per page.
+    """
+    queryset = GradeAuditEntry.objects.select_related('actor')
+    serializer_class = GradeAuditEntrySerializer
+    pagination_class = HistoryCursorPagination
+    filter_params = {
+        'grade': 'grade_id',
+        'student': 'student_id',
+        'subject': 'subject_id',
+        'academic_year': 'academic_year',
+        'action': 'action',
+    }
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        semester = self.request.query_params.get('semester')
+        if semester:
+            queryset = queryset.filter(semester_order=semester_order(semester))
+        return queryset
+
+
+class GpaViewSet(viewsets.ViewSet):
+    """
+    Credit-weighted averages (GWA) and academic standings from the NumPy GPA engine.
+
+    list: cohort summary and per-student (or per-term with ?by_term=true) results, paginated
+    with ?limit=/&offset=. Filters: ?course=, ?year_level=, ?semester=, ?academic_year=.
+    ?source=snapshot reads the columnar snapshot written by `manage.py compute_gpa --snapshot`
+    instead of the database.
+    retrieve: overall and per-term results of one student.
+    Query budget: 1 query (0 from the snapshot).
+    """
+    permission_classes = [IsAdminOrStaff]
+    pagination_class = ApiLimitOffsetPagination
+    replica_reads = True
+
+    def _cohort_filters(self, params):
+        filters = {}
+        try:
+            for param, key in (('course', 'course_id'), ('year_level', 'year_level')):
+                if params.get(param):
+                    filters[key] = int(params[param])
+        except ValueError:
+            raise ValidationError({param: f"Invalid value '{params[param]}'."})
+        if params.get('semester'):
+            filters['semester_order'] = semester_order(params['semester'])
+        if params.get('academic_year'):
+            filters['academic_year'] = params['academic_year']
+        return filters
+
+    def _load(self, filters):
+        from .gpa import GradeArrays
+
+        if self.request.query_params.get('source') == 'snapshot':
+            try:
+                return GradeArrays.load_snapshot().filter(**filters)
+            except FileNotFoundError:
+                raise NotFound('No GPA snapshot has been written yet.')
+        lookups = {'course_id': 'student__course_id'}
+        grades = GradeHistory().filter(**{lookups.get(key, key): value for key, value in filters.items()})
+        return GradeArrays.from_history(grades)
+
+    def list(self, request):
+        from .gpa import compute_gpa
+
+        by_term = request.query_params.get('by_term', '').lower() in ('1', 'true', 'yes')
+        result = compute_gpa(self._load(self._cohort_filters(request.query_params)), by_term=by_term)
+        paginator = self.pagination_class()
+        page = paginator.paginate_queryset(result.rows(), request, view=self)
+        response = paginator.get_paginated_response(page)
+        response.data['summary'] = result.summary()
+        return response
+
+    def retrieve(self, request, pk=None):
+        from .gpa import GradeArrays, compute_gpa
+
+        try:
+            student_id = int(pk)
+        except ValueError:
+            raise NotFound()
+        arrays = GradeArrays.from_history(GradeHistory().filter(student_id=student_id))
+        overall = compute_gpa(arrays).for_student(student_id)
+        if overall is None and not Student.objects.filter(pk=student_id).exists():
+            raise NotFound()
+        return Response({'overall': overall, 'terms': compute_gpa(arrays, by_term=True).rows()})
+
+
+class GradeDistributionViewSet(viewsets.ViewSet):
+    """
+    Grade distributions computed in SQL: per group, enrolled and graded counts, mean,
+    standard deviation, pass rate, p25/p50/p75/p90 and a histogram over the grade scale.
+    ?group_by= any of subject, professor, term (comma separated, default subject).
+    Filters: ?subject=, ?professor=, ?course=, ?year_level=, ?academic_year=, ?semester=.
+    Cached until the next grade change. Query budget: 1 query on a cache miss, 0 on a hit.
+    """
+    permission_classes = [IsAdminOrStaff]
+    replica_reads = True
+
+    def list(self, request):
+        from .analytics import grade_distribution, parse_distribution_params
+
+        try:
+            group_by, filters = parse_distribution_params(request.query_params)
+        except ValueError as e:
+            raise ValidationError({'detail': str(e)})
+        return Response(grade_distribution(group_by, filters))
+
+
+router = DefaultRouter()
+router.register('students', StudentViewSet)
+router.register('courses', CourseViewSet)
+router.register('subjects', SubjectViewSet)
+router.register('grades', GradeViewSet, basename='grade')
+router.register('rankings', ClassRankingViewSet)
+router.register('grade-history', GradeHistoryViewSet)
+router.register('gpa', GpaViewSet, basename='gpa')
+router.register('analytics/grades', GradeDistributionViewSet, basename='grade-analytics')
@@ -6,3 +6,7 @@ class StudentManagementSystemConfig(AppConfig):
 
     def ready(self):
         import student_management_system.signals
+        from .logs import start_queue_logging
+        start_queue_logging()
+        from .profiling import install_query_recording
+        install_query_recording()
@@ -0,0 +1,170 @@
+"""
+Hot/cold storage for grades.
+
+Grade rows of closed academic years, and inactive rows untouched for longer than
+GRADE_ARCHIVE_INACTIVE_DAYS, are moved to GradeArchive in chunked batches, so the
+live Grade table (and its indexes) only holds current terms. GradeHistory reads
+both tables as one: the same filters apply to each and the rows come back from a
+single UNION ALL query.
+"""
+import logging
+import re
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Q, Value
+from django.utils import timezone
+
+from .models import Student, Subject, Grade, GradeArchive
+
+# Columns shared by Grade and GradeArchive, in the order GradeHistory.records() returns them
+RECORD_FIELDS = (
+    'id', 'student_id', 'subject_id', 'grade_value', 'semester', 'semester_order',
+    'academic_year', 'year_level', 'is_active', 'status',
+)
+ARCHIVED_FIELDS = RECORD_FIELDS + ('created_at', 'updated_at')
+GradeRecord = namedtuple('GradeRecord', RECORD_FIELDS + ('archived',))
+CURRENT_STUDENT_STATUSES = ('Enrolled', 'Pending')
+
+
+class GradeHistory:
+    """
+    Live and archived grades read as one table. filter() and exclude() apply to both
+    querysets (any lookup valid on Grade is valid on GradeArchive); records() runs one
+    UNION ALL query and yields GradeRecord tuples. order_by(), slicing and iteration also
+    run one UNION ALL query and return Grade and GradeArchive instances with their subject
+    loaded, so the history can stand in for a Grade queryset in views and the API.
+    """
+    def __init__(self, live=None, archived=None, ordering=()):
+        self.live = Grade.objects.all() if live is None else live
+        self.archived = GradeArchive.objects.all() if archived is None else archived
+        self.ordering = ordering
+
+    def filter(self, *args, **kwargs):
+        return GradeHistory(self.live.filter(*args, **kwargs), self.archived.filter(*args, **kwargs), self.ordering)
+
+    def exclude(self, *args, **kwargs):
+        return GradeHistory(self.live.exclude(*args, **kwargs), self.archived.exclude(*args, **kwargs), self.ordering)
+
+    def order_by(self, *fields):
+        """Order by columns shared by both tables, e.g. order_by('-id')"""
+        return GradeHistory(self.live, self.archived, fields)
+
+    def subjects(self):
+        """Subjects referenced by either table, resolved with subqueries"""
+        return Subject.objects.filter(
+            Q(pk__in=self.live.values('subject_id')) | Q(pk__in=self.archived.values('subject_id'))
+        )
+
+    def _union(self, *fields):
+        def rows(queryset, archived):
+            return queryset.order_by().annotate(
+                archived=Value(archived, output_field=BooleanField())
+            ).values_list(*fields, 'archived')
+
+        return rows(self.live, False).union(rows(self.archived, True), all=True)
+
+    def records(self, *order_by, chunk_size=2000):
+        query = self._union(*RECORD_FIELDS)
+        if order_by:
+            query = query.order_by(*order_by)
+        return (GradeRecord(*row) for row in query.iterator(chunk_size=chunk_size))
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            raise TypeError('GradeHistory only supports slicing')
+        subject_fields = [field.attname for field in Subject._meta.concrete_fields]
+        query = self._union(*ARCHIVED_FIELDS, *(f'subject__{name}' for name in subject_fields))
+        if self.ordering:
+            query = query.order_by(*self.ordering)
+        grades = []
+        for row in query[key]:
+            model = GradeArchive if row[-1] else Grade
+            grade = model.from_db(query.db, ARCHIVED_FIELDS, row[:len(ARCHIVED_FIELDS)])
+            grade.subject = Subject.from_db(query.db, subject_fields, row[len(ARCHIVED_FIELDS):-1])
+            grades.append(grade)
+        return grades
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def count(self):
+        return self.live.count() + self.archived.count()
+
+
+def academic_year_start(academic_year):
+    """First calendar year of an academic year such as '2024-2025' or '2025', or None"""
+    match = re.match(r'\s*(\d{4})', academic_year or '')
+    return int(match.group(1)) if match else None
+
+
+def closed_academic_years():
+    """
+    Academic years of live grades that start before the earliest academic year an
+    enrolled or pending student is currently in. Empty when no student has a current year.
+    """
+    current = Student.objects.filter(student_status__in=CURRENT_STUDENT_STATUSES).exclude(
+        academic_year=''
+    ).values_list('academic_year', flat=True).distinct()
+    starts = [start for start in map(academic_year_start, current) if start is not None]
+    if not starts:
+        return []
+    earliest = min(starts)
+    years = Grade.objects.order_by().values_list('academic_year', flat=True).distinct()
+    return sorted(year for year in years if (academic_year_start(year) or earliest) < earliest)
+
+
+def archivable_grades(academic_years=None, inactive_days=None):
+    """
+    Live grades due for archival: those of the given (by default the closed) academic years,
+    and inactive grades not updated for inactive_days (default GRADE_ARCHIVE_INACTIVE_DAYS).
+    Pass academic_years=[] or inactive_days=0 to leave either rule out.
+    """
+    if academic_years is None:
+        academic_years = closed_academic_years()
+    if inactive_days is None:
+        inactive_days = getattr(settings, 'GRADE_ARCHIVE_INACTIVE_DAYS', 365)
+    rules = Q(pk__in=[])
+    if academic_years:
+        rules |= Q(academic_year__in=list(academic_years))
+    if inactive_days:
+        rules |= Q(is_active=False, updated_at__lt=timezone.now() - timedelta(days=inactive_days))
+    return Grade.objects.filter(rules)
+
+
+def archive_grades(grades, chunk_size=1000, dry_run=False):
+    """
+    Move the given live grades to GradeArchive, chunk_size rows per transaction. Each chunk
+    is locked, copied and deleted in one transaction, so a grade is never in both tables
+    or in neither. The delete is a plain DELETE: archiving is not a grade change, so the
+    per-row Grade signals (SSE events, ranking marks) do not fire. Returns the rows moved.
+    """
+    from .analytics import bump_grade_version
+    from .kpis import invalidate_grade_kpis
+
+    moved = 0
+    last_pk = 0
+    table = connection.ops.quote_name(Grade._meta.db_table)
+    while True:
+        with transaction.atomic():
+            chunk = list(
+                grades.filter(pk__gt=last_pk).order_by('pk').select_for_update().values(*ARCHIVED_FIELDS)[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1]['id']
+            moved += len(chunk)
+            if dry_run:
+                continue
+            GradeArchive.objects.bulk_create([GradeArchive(**row) for row in chunk])
+            ids = [row['id'] for row in chunk]
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {table} WHERE id IN ({', '.join(['%s'] * len(ids))})", ids)
+        logging.info("Archived %s grades so far", moved)
+
+    if moved and not dry_run:
+        bump_grade_version()
+        invalidate_grade_kpis()
+    return moved
@@ -0,0 +1,218 @@
+"""
+Append-only audit log of grade changes.
+
+Grade signals turn every save and delete into a GradeAuditEntry (old and new
+grade value, other changed fields, actor, timestamp) without writing it: the
+entry is handed to an in-process buffer when the change commits, so a rolled
+back change is never logged. The buffer writes its entries with one bulk_create
+when it holds AUDIT_BUFFER_SIZE entries, when its oldest entry is older than
+AUDIT_FLUSH_INTERVAL seconds (checked as entries arrive, at the end of every
+request by AuditMiddleware, and by a timer started with the first pending
+entry, so an idle worker writes it too), and at interpreter exit. Grade edits therefore
+cost one extra INSERT per batch instead of one per cell.
+
+Queryset update()s send no signals and are not audited; those paths (status
+normalization, term rollover, archival) do not change grade values.
+"""
+import atexit
+import contextvars
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Grade, GradeAuditEntry
+
+# Fields compared on save; grade_value goes to old_value/new_value, the others to changes
+AUDITED_FIELDS = ('grade_value', 'status', 'is_active', 'subject_id', 'semester', 'academic_year', 'year_level')
+
+# Id of the user whose request is being handled; set by AuditMiddleware
+current_actor = contextvars.ContextVar('grade_audit_actor', default=None)
+
+
+def _database_name():
+    return connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+
+
+class AuditBuffer:
+    """
+    Thread-safe list of unsaved entries, flushed in batches. Entries are only ever written
+    to the database they were recorded against: when the default database changes under
+    the process (a test run tearing its database down), pending entries are discarded.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = []
+        self._oldest = None
+        self._database = None
+        self._timer = None
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def add(self, entry):
+        database = _database_name()
+        with self._lock:
+            if self._entries and self._database != database:
+                self._discard()
+            if not self._entries:
+                self._oldest = time.monotonic()
+                self._database = database
+            self._entries.append(entry)
+            self._start_timer()
+        self.flush_if_due()
+
+    def _start_timer(self):
+        # Called with the lock held: flush pending entries AUDIT_FLUSH_INTERVAL from now
+        if self._timer is not None or not self._entries:
+            return
+        self._timer = threading.Timer(getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0), self._flush_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _flush_on_timer(self):
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        finally:
+            # The timer thread's connections would otherwise stay open until it is collected
+            connections.close_all()
+            with self._lock:
+                self._start_timer()
+
+    def is_due(self):
+        with self._lock:
+            return bool(self._entries) and (
+                len(self._entries) >= getattr(settings, 'AUDIT_BUFFER_SIZE', 200)
+                or time.monotonic() - self._oldest >= getattr(settings, 'AUDIT_FLUSH_INTERVAL', 2.0)
+            )
+
+    def flush_if_due(self):
+        if self.is_due():
+            self.flush()
+
+    def flush(self):
+        """Write every buffered entry with one bulk_create; returns the number written"""
+        with self._lock:
+            if self._entries and self._database != _database_name():
+                self._discard()
+            entries, self._entries = self._entries, []
+        if not entries:
+            return 0
+        try:
+            GradeAuditEntry.objects.bulk_create(entries, batch_size=500)
+        except Exception as e:
+            # Keep the entries for the next flush rather than losing the trail, up to a bound
+            logging.error("Could not write %s grade audit entries: %s", len(entries), e)
+            with self._lock:
+                self._entries[:0] = entries
+                limit = getattr(settings, 'AUDIT_BUFFER_SIZE', 200) * 50
+                if len(self._entries) > limit:
+                    logging.error("Dropping %s unwritten grade audit entries", len(self._entries) - limit)
+                    del self._entries[:len(self._entries) - limit]
+                self._oldest = time.monotonic()
+            return 0
+        logging.debug("Wrote %s grade audit entries", len(entries))
+        return len(entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries = []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _discard(self):
+        logging.info("Discarding %s grade audit entries recorded against another database", len(self._entries))
+        self._entries = []
+
+
+buffer = AuditBuffer()
+atexit.register(buffer.flush)
+
+
+def _values(grade):
+    return {field: getattr(grade, field) for field in AUDITED_FIELDS}
+
+
+def _comparable(value):
+    # Loaded values may differ in type from assigned ones ('1.50' vs Decimal('1.50'), 2 vs '2')
+    return None if value in (None, '') else str(value)
+
+
+def _entry(grade, action, old, new):
+    """The unsaved entry of one change, or None when a save changed no audited field"""
+    changes = {
+        field: [_comparable(old.get(field)), _comparable(new.get(field))]
+        for field in AUDITED_FIELDS[1:]
+        if _comparable(old.get(field)) != _comparable(new.get(field))
+    }
+    value_changed = _comparable(old.get('grade_value')) != _comparable(new.get('grade_value'))
+    if action == GradeAuditEntry.UPDATED and not (changes or value_changed):
+        return None
+    term = old if action == GradeAuditEntry.DELETED else new
+    return GradeAuditEntry(
+        academic_year=term.get('academic_year') or '',
+        semester_order=grade.semester_order,
+        grade_id=grade.pk,
+        student_id=grade.student_id,
+        subject_id=term.get('subject_id'),
+        action=action,
+        old_value=old.get('grade_value'),
+        new_value=new.get('grade_value'),
+        changes=changes,
+        actor_id=current_actor.get(),
+        recorded_at=timezone.now(),
+    )
+
+
+def remember_loaded_values(grade):
+    """
+    Called before a save: the row as it is in the database. Grade.from_db keeps it for loaded
+    instances; an instance built by hand with an existing pk is read back once.
+    """
+    if grade._state.adding or hasattr(grade, '_loaded_values'):
+        return
+    row = Grade.objects.filter(pk=grade.pk).values(*AUDITED_FIELDS).first()
+    grade._loaded_values = row or {}
+
+
+def record_save(grade, created):
+    new = _values(grade)
+    old = {} if created else getattr(grade, '_loaded_values', {})
+    entry = _entry(grade, GradeAuditEntry.CREATED if created else GradeAuditEntry.UPDATED, old, new)
+    # The next save of this instance is compared with what this one wrote
+    grade._loaded_values = new
+    if entry is not None:
+        transaction.on_commit(lambda: buffer.add(entry))
+
+
+def record_delete(grade):
+    entry = _entry(grade, GradeAuditEntry.DELETED, _values(grade), {})
+    transaction.on_commit(lambda: buffer.add(entry))
+
+
+def grade_history(grade_id=None, student_id=None, subject_id=None, academic_year=None, semester_order=None):
+    """
+    Audit entries, oldest first, of one grade or of a student (optionally one subject, which
+    follows a subject across deleted and re-created grades), optionally within one term.
+    Only written entries are read: buffered ones appear once flushed, within AUDIT_FLUSH_INTERVAL.
+    """
+    filters = Q()
+    if grade_id is not None:
+        filters &= Q(grade_id=grade_id)
+    if student_id is not None:
+        filters &= Q(student_id=student_id)
+    if subject_id is not None:
+        filters &= Q(subject_id=subject_id)
+    if academic_year is not None:
+        filters &= Q(academic_year=academic_year)
+    if semester_order is not None:
+        filters &= Q(semester_order=semester_order)
+    return GradeAuditEntry.objects.filter(filters).select_related('actor').order_by('recorded_at', 'id')
@@ -0,0 +1,39 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db.models import Q
+
+UserModel = get_user_model()
+
+
+class UsernameOrEmailBackend(ModelBackend):
+    """
+    Authenticate with either a username or an email address.
+
+    The user is resolved with a single query against the indexed username and
+    email columns of User, and the password is hashed exactly once. When
+    LOGIN_DUMMY_PASSWORD_HASH is enabled (the default), a failed lookup still
+    runs one password hash so unknown accounts take as long as wrong passwords.
+    """
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if not username or password is None:
+            return None
+
+        candidates = list(
+            UserModel._default_manager.filter(Q(username=username) | Q(email__iexact=username))[:3]
+        )
+        user = next((candidate for candidate in candidates if candidate.username == username), None)
+        if user is None and len(candidates) == 1:
+            # An email only logs in when it belongs to exactly one account
+            user = candidates[0]
+
+        if user is None:
+            if getattr(settings, 'LOGIN_DUMMY_PASSWORD_HASH', True):
+                UserModel().set_password(password)
+            return None
+
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
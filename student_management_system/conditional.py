@@ -0,0 +1,121 @@
+"""
+Conditional GET support: ETag and Last-Modified validators built from cheap
+aggregate fingerprints, so an unchanged page answers 304 Not Modified after one
+UNION ALL query and skips the view and template entirely.
+
+A fingerprint is a list of parts, one aggregate row per table the page depends
+on: (key, latest updated_at, row count, pending). The row count catches
+deletions, which do not move max(updated_at). A non-zero pending count means
+the view still has normalization writes to make, so no validator is sent and
+the page renders normally.
+"""
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.db.models import CharField, Count, F, IntegerField, Max, Q, Value
+from django.views.decorators.http import condition
+
+from .models import Department, Course, Subject, Student, Grade, ClassRanking
+
+
+def fingerprint_part(queryset, key, pending=None):
+    """One aggregate row over a queryset: latest updated_at, number of rows and pending normalizations"""
+    return queryset.order_by().annotate(
+        fingerprint_key=Value(key, output_field=CharField())
+    ).values('fingerprint_key').annotate(
+        latest=Max('updated_at'),
+        rows=Count('pk'),
+        pending=pending if pending is not None else Value(0, output_field=IntegerField()),
+    )
+
+
+def catalog_parts():
+    """The course catalog: departments, courses and subjects"""
+    return [
+        fingerprint_part(Department.objects.all(), 'departments'),
+        fingerprint_part(Course.objects.all(), 'courses'),
+        fingerprint_part(Subject.objects.all(), 'subjects'),
+    ]
+
+
+def pending_grade_normalizations():
+    """
+    Grades of a student that student_record would still rewrite on its next render
+    (see normalize_student_grades in views): inactive grades of the student's current
+    term, blank academic years, and statuses out of step with the grade value.
+    """
+    current_term = Q(
+        grades__is_active=False,
+        grades__year_level=F('year_level'),
+        grades__semester=F('semester'),
+        grades__academic_year=F('academic_year'),
+    ) & ~Q(semester='') & ~Q(academic_year='')
+    blank_academic_year = (Q(grades__academic_year__isnull=True) | Q(grades__academic_year='')) & ~Q(academic_year='')
+    stale_status = ~Q(grades__semester='') & ~Q(grades__academic_year='') & (
+        Q(grades__grade_value__isnull=False) & ~Q(grades__status='Done')
+        | Q(grades__grade_value__isnull=True) & ~Q(grades__status='Currently Taking')
+    )
+    return Count('grades', filter=current_term | blank_academic_year | stale_status)
+
+
+def student_parts(students, normalized=False):
+    """
+    A student's row version and the fingerprints of their grades and class rankings.
+    With normalized=True, grades the view would normalize count as pending.
+    """
+    return [
+        fingerprint_part(students, 'student', pending_grade_normalizations() if normalized else None),
+        fingerprint_part(Grade.objects.filter(student__in=students.values('pk')), 'grades'),
+        fingerprint_part(ClassRanking.objects.filter(student__in=students.values('pk')), 'rankings'),
+    ]
+
+
+def compute_fingerprint(request, parts):
+    """
+    Run the fingerprint parts as one query and return (etag, last_modified),
+    or (None, None) when the page must render anyway.
+    """
+    # Queued messages are shown (and consumed) by the next rendered page
+    if len(get_messages(request)):
+        return None, None
+
+    query = parts[0].union(*parts[1:], all=True) if len(parts) > 1 else parts[0]
+    rows = sorted(query.values_list('fingerprint_key', 'latest', 'rows', 'pending'))
+    if any(pending for _, _, _, pending in rows):
+        return None, None
+
+    # The rendered page also carries the user's name and a token for their CSRF secret
+    user = request.user
+    seed = repr((rows, user.pk, user.get_username(), request.META.get('CSRF_COOKIE')))
+    etag = hashlib.md5(seed.encode(), usedforsecurity=False).hexdigest()
+    last_modified = max((latest for _, latest, _, _ in rows if latest is not None), default=None)
+    return etag, last_modified
+
+
+def conditional_page(parts_func):
+    """
+    condition() decorator whose ETag and Last-Modified both come from a single
+    fingerprint query. parts_func(request, *args, **kwargs) returns the parts.
+    Place it below the login and role decorators so anonymous requests never run it.
+    """
+    def fingerprint(request, *args, **kwargs):
+        if not hasattr(request, '_page_fingerprint'):
+            request._page_fingerprint = compute_fingerprint(request, parts_func(request, *args, **kwargs))
+        return request._page_fingerprint
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: fingerprint(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: fingerprint(request, *args, **kwargs)[1],
+    )
+
+
+def student_record_parts(request, pk):
+    return student_parts(Student.objects.filter(pk=pk), normalized=True) + catalog_parts()
+
+
+def own_grades_parts(request):
+    return student_parts(Student.objects.filter(user_id=request.user.pk)) + catalog_parts()
+
+
+def catalog_page_parts(request, *args, **kwargs):
+    return catalog_parts()
@@ -0,0 +1,14 @@
+"""MySQL backend with an optional connection pool (see ..pool)"""
+from django.db.backends.mysql.base import Database, DatabaseWrapper as MySQLDatabaseWrapper
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, MySQLDatabaseWrapper):
+    def check_pooled_connection(self, connection):
+        # ping() checks the socket without running a query
+        try:
+            connection.ping()
+        except Database.Error:
+            return False
+        return True
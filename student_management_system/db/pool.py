@@ -0,0 +1,233 @@
+"""
+A connection pool for database backends without one of their own.
+
+Django's MySQL and SQLite backends open a connection per request unless
+CONN_MAX_AGE keeps it, and a kept connection belongs to one thread. The pool
+lets the threads of a worker share a bounded set of connections instead:
+
+    DATABASES['default'] = {
+        'ENGINE': 'student_management_system.db.mysql',
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'pool': {'max_size': 10, 'timeout': 10}},
+        ...
+    }
+
+Closing a connection at the end of a request returns it to the pool, and the
+next request of any thread takes the most recently returned one. With
+CONN_HEALTH_CHECKS a connection is checked as it is taken and replaced if it
+fails. Connections older than max_lifetime or idle longer than max_idle seconds
+are closed rather than handed out. When max_size connections are in use, a
+request waits up to timeout seconds for one and then fails with an
+OperationalError.
+
+Checkouts, waits and timeouts are counted for /metrics, which also reports
+each pool's open, idle and in-use connections and waiting threads.
+"""
+import os
+import threading
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.utils import OperationalError
+
+DEFAULTS = {'max_size': 10, 'timeout': 10.0, 'max_lifetime': 3600.0, 'max_idle': 600.0}
+
+# Alias -> ConnectionPool of this process
+pools = {}
+_pools_lock = threading.Lock()
+_pools_pid = os.getpid()
+
+
+class ConnectionPool:
+    """At most max_size open connections, made by connect() and checked by check(connection) -> bool"""
+    def __init__(self, alias, connect, check=None, max_size=10, timeout=10.0, max_lifetime=3600.0, max_idle=600.0):
+        if max_size < 1:
+            raise ImproperlyConfigured(f"The {alias} connection pool needs a max_size of at least 1.")
+        self.alias = alias
+        self.connect = connect
+        self.check = check
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self._condition = threading.Condition()
+        # [(connection, opened at, returned at)], most recently returned last
+        self._idle = []
+        self._opened = {}
+        self.size = 0
+        self.waiting = 0
+        self.opened_total = 0
+
+    def _expired(self, opened, returned, now):
+        return now - opened > self.max_lifetime or now - returned > self.max_idle
+
+    def _discard(self, connection):
+        self._opened.pop(id(connection), None)
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """A connection from the pool, or a new one if none is idle and the pool is not full"""
+        from ..metrics import registry
+
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            connection = None
+            with self._condition:
+                while True:
+                    now = time.monotonic()
+                    while self._idle:
+                        candidate, opened, returned = self._idle.pop()
+                        if not self._expired(opened, returned, now):
+                            connection = candidate
+                            break
+                        self._discard(candidate)
+                        self.size -= 1
+                    if connection is not None or self.size < self.max_size:
+                        break
+                    if now >= deadline:
+                        registry.inc('sms_db_pool_checkouts_total', {'alias': self.alias, 'result': 'timeout'})
+                        raise OperationalError(
+                            f"Timed out after {self.timeout}s waiting for a connection from the {self.alias} "
+                            f"pool ({self.max_size} in use)"
+                        )
+                    self.waiting += 1
+                    try:
+                        self._condition.wait(deadline - now)
+                    finally:
+                        self.waiting -= 1
+                if connection is None:
+                    # Reserve the slot; the connection is opened outside the lock
+                    self.size += 1
+
+            if connection is None:
+                try:
+                    connection = self.connect()
+                except BaseException:
+                    with self._condition:
+                        self.size -= 1
+                        self._condition.notify()
+                    raise
+                with self._condition:
+                    self._opened[id(connection)] = time.monotonic()
+                    self.opened_total += 1
+                result = 'opened'
+            elif self.check is not None and not self.check(connection):
+                self.release(connection, reusable=False)
+                continue
+            else:
+                result = 'reused'
+            registry.inc('sms_db_pool_checkouts_total', {'alias': self.alias, 'result': result})
+            registry.observe('sms_db_pool_wait_seconds', {'alias': self.alias}, time.monotonic() - started)
+            return connection
+
+    def release(self, connection, reusable=True):
+        """Give a connection back; one that is not reusable is closed"""
+        with self._condition:
+            opened = self._opened.get(id(connection))
+            now = time.monotonic()
+            if reusable and opened is not None and not self._expired(opened, now, now):
+                self._idle.append((connection, opened, now))
+            else:
+                self._discard(connection)
+                self.size -= 1
+            self._condition.notify()
+
+    def close(self):
+        """Close the idle connections; the ones in use are closed when released"""
+        with self._condition:
+            for connection, _, _ in self._idle:
+                self._discard(connection)
+                self.size -= 1
+            self._idle = []
+            self.max_lifetime = -1
+
+    def stats(self):
+        with self._condition:
+            return {'max_size': self.max_size, 'open': self.size, 'idle': len(self._idle),
+                    'in_use': self.size - len(self._idle), 'waiting': self.waiting,
+                    'opened_total': self.opened_total}
+
+
+def get_pool(alias, connect, check, options):
+    """The pool of alias in this process, made on first use; a forked worker starts without its parent's"""
+    global _pools_pid
+    with _pools_lock:
+        if os.getpid() != _pools_pid:
+            # The parent's sockets are not this process's to use
+            pools.clear()
+            _pools_pid = os.getpid()
+        pool = pools.get(alias)
+        if pool is None:
+            unknown = set(options) - set(DEFAULTS)
+            if unknown:
+                raise ImproperlyConfigured(f"Unknown connection pool options for {alias}: {', '.join(sorted(unknown))}")
+            pool = pools[alias] = ConnectionPool(alias, connect, check, **{**DEFAULTS, **options})
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in pools.values():
+            pool.close()
+        pools.clear()
+
+
+class PooledDatabaseWrapperMixin:
+    """
+    Take connections from a ConnectionPool when OPTIONS['pool'] is set (True or a dict of
+    DEFAULTS to override), and give them back on close. Mixed into a backend's DatabaseWrapper.
+    """
+    def pool_options(self):
+        options = self.settings_dict['OPTIONS'].get('pool')
+        if not options:
+            return None
+        if self.settings_dict.get('CONN_MAX_AGE', 0) != 0:
+            raise ImproperlyConfigured("Pooled connections are returned after each request; set CONN_MAX_AGE to 0.")
+        return {} if options is True else options
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pool', None)
+        return params
+
+    def check_pooled_connection(self, connection):
+        """Whether a pooled DB-API connection still answers; backends with a cheaper check override this"""
+        try:
+            cursor = connection.cursor()
+            try:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            finally:
+                cursor.close()
+        except self.Database.Error:
+            return False
+        return True
+
+    def get_new_connection(self, conn_params):
+        options = self.pool_options()
+        if options is None:
+            return super().get_new_connection(conn_params)
+        check = self.check_pooled_connection if self.settings_dict['CONN_HEALTH_CHECKS'] else None
+        # The first wrapper's connect serves every thread: it only opens a connection from conn_params
+        connect = super().get_new_connection
+        self.connection_pool = get_pool(self.alias, lambda: connect(conn_params), check, options)
+        return self.connection_pool.acquire()
+
+    def _close(self):
+        pool = getattr(self, 'connection_pool', None)
+        if pool is None or self.connection is None:
+            return super()._close()
+        connection = self.connection
+        # A connection closed inside atomic() stays referenced by this wrapper, so it cannot be shared
+        reusable = not self.in_atomic_block and not self.errors_occurred
+        if reusable:
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+        pool.release(connection, reusable)
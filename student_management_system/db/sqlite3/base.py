@@ -0,0 +1,8 @@
+"""SQLite backend with an optional connection pool (see ..pool); a stand-in for MySQL in benchmarks"""
+from django.db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+
+from ..pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, SQLiteDatabaseWrapper):
+    pass
@@ -1,42 +1,64 @@
+from asgiref.sync import iscoroutinefunction
 from django.contrib.auth.decorators import user_passes_test
 from django.core.exceptions import PermissionDenied
 from django.shortcuts import redirect
 
+from .middleware import resolve_role
+from .models import User
+
+def _request_role(request, user):
+    """Role resolved by RoleMiddleware, falling back to the user when the middleware is not installed."""
+    if hasattr(request, 'role'):
+        return request.role
+    return resolve_role(user)
+
+def _role_required(view_func, *roles):
+    """
+    Wrap a sync or async view so only users with one of the given roles reach it.
+    Async views get an async wrapper that loads the user with request.auser(),
+    so the check never runs a sync query inside the event loop.
+    """
+    if iscoroutinefunction(view_func):
+        async def _wrapped_view(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return redirect('login')
+            if _request_role(request, user) not in roles:
+                raise PermissionDenied
+            return await view_func(request, *args, **kwargs)
+    else:
+        def _wrapped_view(request, *args, **kwargs):
+            if not request.user.is_authenticated:
+                return redirect('login')
+            if _request_role(request, request.user) not in roles:
+                raise PermissionDenied
+            return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
 def admin_required(view_func):
     """
     Decorator for views that checks that the user is logged in and is a superuser (admin),
     redirects to login page if necessary.
     """
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if not request.user.is_superuser:
-            raise PermissionDenied
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    return _role_required(view_func, User.Role.ADMIN)
 
 def student_required(view_func):
     """
     Decorator for views that checks that the user is logged in and is a student (not staff or superuser),
     redirects to login page if necessary.
     """
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if request.user.is_superuser or getattr(request.user, 'is_staff_member', False):
-            raise PermissionDenied
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    return _role_required(view_func, User.Role.STUDENT)
 
 def staff_required(view_func):
     """
     Decorator for views that checks that the user is logged in and is a staff member (not superuser),
     redirects to login page if necessary.
     """
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if request.user.is_superuser or not getattr(request.user, 'is_staff_member', False):
-            raise PermissionDenied
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
+    return _role_required(view_func, User.Role.STAFF)
+
+def admin_or_staff_required(view_func):
+    """
+    Decorator for views shared by admins and staff members,
+    redirects to login page if necessary.
+    """
+    return _role_required(view_func, User.Role.ADMIN, User.Role.STAFF)
@@ -0,0 +1,176 @@
+"""
+In-process event broker for the Server-Sent Events streams.
+
+Grade signals publish change events to per-student ("student:<id>") and
+per-subject ("subject:<id>") channels, and the SSE views subscribe to them.
+Publishing is thread-safe and may happen from sync code (signal handlers run
+in request threads); delivery is handed to each subscriber's event loop with
+call_soon_threadsafe. The broker only reaches clients connected to the same
+process, so run the ASGI app with a single worker process per host (or put a
+shared broker behind the same publish/subscribe API).
+"""
+import asyncio
+import itertools
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def student_channel(student_id):
+    return f'student:{student_id}'
+
+
+def subject_channel(subject_id):
+    return f'subject:{subject_id}'
+
+
+def format_sse(event_id, event, data):
+    """Encode one event in the text/event-stream wire format"""
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+class Subscription:
+    """A subscriber's queue on its own event loop, registered on one or more channels"""
+    def __init__(self, broker, channels, max_queue):
+        self.broker = broker
+        self.channels = list(channels)
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+
+    def deliver(self, message):
+        """Called from any thread; hands the message over to the subscriber's loop"""
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop is closed: the client went away without unsubscribing
+            self.broker.unsubscribe(self)
+
+    def _put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # A slow client loses events rather than growing memory without bound
+            self.dropped += 1
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """
+    Thread-safe publish/subscribe hub. Each channel keeps a short history so a
+    reconnecting EventSource can replay what it missed via Last-Event-ID; the
+    history of a channel nothing was published to for history_ttl seconds is dropped.
+    """
+    def __init__(self, history_size=50, max_queue=100, history_ttl=600):
+        self.history_size = history_size
+        self.max_queue = max_queue
+        self.history_ttl = history_ttl
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers = defaultdict(set)
+        # Channel -> (last published at, deque of (event id, message)), least recently published first
+        self._history = OrderedDict()
+
+    def subscribe(self, channels, last_event_id=None):
+        """Subscribe the running event loop to channels; use as `async with broker.subscribe(...) as subscription`"""
+        subscription = Subscription(self, channels, self.max_queue)
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+            if last_event_id is not None:
+                missed = sorted(
+                    (event_id, message)
+                    for channel in subscription.channels
+                    for event_id, message in self._history.get(channel, (0, ()))[1]
+                    if event_id > last_event_id
+                )
+                for _, message in missed:
+                    subscription._put(message)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is None:
+                    continue
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def publish(self, channels, event, data):
+        """Send one event to every subscriber of any of the channels; safe to call from any thread"""
+        with self._lock:
+            event_id = next(self._ids)
+            message = format_sse(event_id, event, data)
+            targets = set()
+            now = time.monotonic()
+            for channel in channels:
+                _, history = self._history.pop(channel, (None, None))
+                if history is None:
+                    history = deque(maxlen=self.history_size)
+                history.append((event_id, message))
+                self._history[channel] = (now, history)
+                targets.update(self._subscribers.get(channel, ()))
+            self._evict_idle(now)
+        for subscription in targets:
+            subscription.deliver(message)
+        logging.debug("Published %s event %s to %s subscribers", event, event_id, len(targets))
+        return event_id
+
+    def _evict_idle(self, now):
+        # Oldest first, so this stops at the first channel still in use
+        while self._history:
+            channel, (published_at, _) = next(iter(self._history.items()))
+            if now - published_at <= self.history_ttl:
+                break
+            del self._history[channel]
+
+    def history_channels(self):
+        with self._lock:
+            return len(self._history)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len({subscription for subscribers in self._subscribers.values() for subscription in subscribers})
+
+    def queue_stats(self):
+        """(messages waiting in subscriber queues, messages dropped by full queues) over current subscribers"""
+        with self._lock:
+            subscriptions = {subscription for subscribers in self._subscribers.values() for subscription in subscribers}
+        return sum(s.queue.qsize() for s in subscriptions), sum(s.dropped for s in subscriptions)
+
+
+broker = EventBroker()
+
+
+def grade_event_data(grade):
+    return {
+        'student_id': grade.student_id,
+        'subject_id': grade.subject_id,
+        'grade_value': grade.grade_value,
+        'year_level': grade.year_level,
+        'semester': grade.semester,
+        'academic_year': grade.academic_year,
+        'status': grade.status,
+        'is_active': grade.is_active,
+    }
+
+
+def publish_grade_event(event, data):
+    """Publish a grade change to the channels of its student and its subject"""
+    return broker.publish(
+        [student_channel(data['student_id']), subject_channel(data['subject_id'])], event, data
+    )
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, PasswordChangeForm, SetPasswordForm
-from .models import User, Student, Course, Subject, Grade, Staff
+from .models import User, Student, Course, Subject, Grade, Staff, HIGHEST_GRADE, LOWEST_GRADE
 from django.forms.widgets import DateInput, FileInput, Select
 
 class UserRegistrationForm(UserCreationForm):
@@ -210,8 +210,9 @@ class SubjectForm(forms.ModelForm):
     )
     from .models import Student
 
-    year_level = forms.ChoiceField(
+    year_level = forms.TypedChoiceField(
         choices=[('', 'Choose year level')] + Student.YEAR_LEVEL_CHOICES,
+        coerce=int,
         required=True
     )
     semester_offered = forms.ChoiceField(
@@ -279,8 +280,10 @@ class CourseForm(forms.ModelForm):
         fields = ['course_id', 'name', 'credits', 'department_name']
 
 class GradeForm(forms.ModelForm):
-    year_level = forms.ChoiceField(
-        choices=Student.YEAR_LEVEL_CHOICES,
+    year_level = forms.TypedChoiceField(
+        choices=[('', 'Choose year level')] + Student.YEAR_LEVEL_CHOICES,
+        coerce=int,
+        empty_value=None,
         required=False,
         label="Year Level"
     )
@@ -315,8 +318,8 @@ class GradeForm(forms.ModelForm):
                 ('2nd', '2nd Semester')
             ]),
             'grade_value': forms.NumberInput(attrs={
-                'min': 0,
-                'max': 100,
+                'min': HIGHEST_GRADE,
+                'max': LOWEST_GRADE,
                 'step': 0.01
             }),
             'student': forms.HiddenInput(),
@@ -325,5 +328,5 @@ class GradeForm(forms.ModelForm):
 
     def clean_grade_value(self):
         grade_value = self.cleaned_data.get('grade_value')
-        if grade_value is not None and (grade_value < 0 or grade_value > 100):
-            raise forms.ValidationError("Grade must be between 0 and 100")
+        if grade_value is not None and not HIGHEST_GRADE <= grade_value <= LOWEST_GRADE:
+            raise forms.ValidationError(f"Grade must be between {HIGHEST_GRADE:.2f} and {LOWEST_GRADE:.2f}")
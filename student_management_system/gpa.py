@@ -0,0 +1,241 @@
+"""
+Vectorized GPA (general weighted average) and academic standing engine.
+
+Grades follow the 1.00 (highest) to 5.00 (failed) scale, so a lower average is
+better. Grade rows are loaded as parallel NumPy columns, either with a single
+values_list query or from a columnar .npz snapshot, and grouped with
+np.unique + np.bincount, so the cost is a sort and a few array passes instead of
+a Python loop per grade. One million rows group in well under a second once
+loaded; the query and row conversion dominate a database load.
+"""
+import os
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+
+from .archive import GradeHistory
+from .models import Grade
+
+PASSING_GRADE = 3.00
+DEANS_LIST_MAX_GWA = 1.75
+PROBATION_FAILED_CREDITS_RATIO = 0.25
+
+# Standing codes, best first; STANDINGS maps them to labels
+DEANS_LIST, GOOD_STANDING, WARNING, PROBATION, NO_GRADES = range(5)
+STANDINGS = {
+    DEANS_LIST: "Dean's List",
+    GOOD_STANDING: 'Good Standing',
+    WARNING: 'Academic Warning',
+    PROBATION: 'Probation',
+    NO_GRADES: 'No Graded Units',
+}
+
+ROW_DTYPE = np.dtype([
+    ('student_id', np.int64),
+    ('course_id', np.int64),
+    ('year_level', np.int16),
+    ('semester_order', np.int16),
+    ('academic_year', 'U20'),
+    ('credits', np.float64),
+    ('grade', np.float64),
+])
+COLUMNS = ROW_DTYPE.names
+
+
+def default_snapshot_path():
+    return getattr(settings, 'GPA_SNAPSHOT_PATH', os.path.join(settings.BASE_DIR, 'var', 'gpa_snapshot.npz'))
+
+
+class GradeArrays:
+    """
+    Active, graded rows as parallel columns: student_id, course_id (the student's
+    course), year_level, semester_order, academic_year, credits and grade.
+    """
+    def __init__(self, student_id, course_id, year_level, semester_order, academic_year, credits, grade):
+        self.student_id = student_id
+        self.course_id = course_id
+        self.year_level = year_level
+        self.semester_order = semester_order
+        self.academic_year = academic_year
+        self.credits = credits
+        self.grade = grade
+
+    def __len__(self):
+        return len(self.student_id)
+
+    @staticmethod
+    def _rows(grades):
+        return grades.filter(is_active=True, grade_value__isnull=False).order_by().values_list(
+            'student_id',
+            Coalesce('student__course_id', Value(0)),
+            Coalesce('year_level', Value(0)),
+            'semester_order',
+            'academic_year',
+            'subject__credits',
+            # Decimal to float in SQL, so the driver hands back plain floats
+            Cast('grade_value', FloatField()),
+        )
+
+    @classmethod
+    def _from_rows(cls, rows):
+        # NULLs are coalesced in SQL, so the tuples convert to a structured array in C
+        table = np.array(list(rows), dtype=ROW_DTYPE)
+        return cls(**{column: table[column] for column in COLUMNS})
+
+    @classmethod
+    def from_queryset(cls, grades=None):
+        """Load the columns with one query; grades defaults to every active, graded Grade"""
+        if grades is None:
+            grades = Grade.objects.all()
+        return cls._from_rows(cls._rows(grades))
+
+    @classmethod
+    def from_history(cls, history=None):
+        """
+        Load live and archived grades (an archive.GradeHistory, default every grade) with
+        one UNION ALL query, so closed terms still count towards GWA and rankings.
+        """
+        if history is None:
+            history = GradeHistory()
+        return cls._from_rows(cls._rows(history.live).union(cls._rows(history.archived), all=True))
+
+    @classmethod
+    def load_snapshot(cls, path=None):
+        with np.load(path or default_snapshot_path()) as snapshot:
+            return cls(**{column: snapshot[column] for column in COLUMNS})
+
+    def save_snapshot(self, path=None):
+        path = path or default_snapshot_path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        np.savez_compressed(path, **{column: getattr(self, column) for column in COLUMNS})
+        return path
+
+    def filter(self, course_id=None, year_level=None, semester_order=None, academic_year=None):
+        """Rows of one cohort or term, selected with a boolean mask"""
+        mask = np.ones(len(self), dtype=bool)
+        if course_id is not None:
+            mask &= self.course_id == int(course_id)
+        if year_level is not None:
+            mask &= self.year_level == int(year_level)
+        if semester_order is not None:
+            mask &= self.semester_order == int(semester_order)
+        if academic_year is not None:
+            mask &= self.academic_year == str(academic_year)
+        return GradeArrays(**{column: getattr(self, column)[mask] for column in COLUMNS})
+
+
+class GpaResult:
+    """
+    Per-group averages, sorted by student. Groups are students, or student terms when
+    computed by term, in which case terms holds year_level, semester_order and academic_year columns.
+    """
+    def __init__(self, student_ids, gwa, credits, failed_credits, standing, terms=None):
+        self.student_ids = student_ids
+        self.gwa = gwa
+        self.credits = credits
+        self.failed_credits = failed_credits
+        self.standing = standing
+        self.terms = terms
+
+    def __len__(self):
+        return len(self.gwa)
+
+    def _row(self, index):
+        row = {
+            'student_id': int(self.student_ids[index]),
+            'gwa': None if np.isnan(self.gwa[index]) else round(float(self.gwa[index]), 4),
+            'credits': float(self.credits[index]),
+            'failed_credits': float(self.failed_credits[index]),
+            'standing': STANDINGS[int(self.standing[index])],
+        }
+        if self.terms is not None:
+            row.update({
+                'year_level': int(self.terms['year_level'][index]),
+                'semester_order': int(self.terms['semester_order'][index]),
+                'academic_year': str(self.terms['academic_year'][index]),
+            })
+        return row
+
+    def for_student(self, student_id):
+        """Result of one student (their first term when computed by term), or None"""
+        index = np.searchsorted(self.student_ids, student_id)
+        if index < len(self.student_ids) and self.student_ids[index] == student_id:
+            return self._row(index)
+        return None
+
+    def rows(self):
+        return [self._row(index) for index in range(len(self))]
+
+    def summary(self):
+        """Cohort statistics over the groups that have graded units"""
+        graded = ~np.isnan(self.gwa)
+        gwa = self.gwa[graded]
+        standing_counts = np.bincount(self.standing, minlength=len(STANDINGS))
+        return {
+            'groups': int(len(self)),
+            'mean_gwa': round(float(gwa.mean()), 4) if gwa.size else None,
+            'median_gwa': round(float(np.median(gwa)), 4) if gwa.size else None,
+            'best_gwa': round(float(gwa.min()), 4) if gwa.size else None,
+            'standings': {STANDINGS[code]: int(count) for code, count in enumerate(standing_counts)},
+        }
+
+
+def compute_gpa(arrays, by_term=False):
+    """
+    Credit-weighted averages and standings for every student (or every student term
+    with by_term=True, keyed by student_id, year_level, semester_order, academic_year).
+    """
+    terms = None
+    if by_term:
+        # Pack (student, year level, semester, academic year) into one int64 so the
+        # grouping is a 1-D sort instead of a row-wise unique
+        year_labels, year_codes = np.unique(arrays.academic_year, return_inverse=True)
+        years = max(len(year_labels), 1)
+        levels = int(arrays.year_level.max()) + 1 if len(arrays) else 1
+        semesters = int(arrays.semester_order.max()) + 1 if len(arrays) else 1
+        packed = arrays.student_id.astype(np.int64) * levels + arrays.year_level
+        packed = (packed * semesters + arrays.semester_order) * years + year_codes.reshape(-1)
+        unique_keys, group = np.unique(packed, return_inverse=True)
+        term_key, year_code = np.divmod(unique_keys, years)
+        term_key, semester = np.divmod(term_key, semesters)
+        student_ids, year_level = np.divmod(term_key, levels)
+        terms = {
+            'year_level': year_level,
+            'semester_order': semester,
+            'academic_year': year_labels[year_code],
+        }
+    else:
+        student_ids, group = np.unique(arrays.student_id, return_inverse=True)
+    group = group.reshape(-1)
+
+    groups = len(student_ids)
+    credits = np.clip(arrays.credits, 0, None)
+    failed = arrays.grade > PASSING_GRADE
+
+    total_credits = np.bincount(group, weights=credits, minlength=groups)
+    weighted = np.bincount(group, weights=credits * arrays.grade, minlength=groups)
+    failed_credits = np.bincount(group, weights=credits * failed, minlength=groups)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gwa = np.where(total_credits > 0, weighted / total_credits, np.nan)
+        failed_ratio = np.where(total_credits > 0, failed_credits / total_credits, 0.0)
+
+    standing = np.select(
+        [
+            total_credits <= 0,
+            (gwa <= DEANS_LIST_MAX_GWA) & (failed_credits == 0),
+            failed_credits == 0,
+            failed_ratio <= PROBATION_FAILED_CREDITS_RATIO,
+        ],
+        [NO_GRADES, DEANS_LIST, GOOD_STANDING, WARNING],
+        default=PROBATION,
+    ).astype(np.int64)
+    return GpaResult(student_ids, gwa, total_credits, failed_credits, standing, terms)
+
+
+def student_gpa(student_id):
+    """Overall GWA and standing of one student, computed from their live and archived grades only"""
+    arrays = GradeArrays.from_history(GradeHistory().filter(student_id=student_id))
+    return compute_gpa(arrays).for_student(student_id)
@@ -0,0 +1,117 @@
+"""
+Enrollment KPIs for the admin dashboard.
+
+One grouped values().annotate(Count) query over Student returns the head count
+of every (department, course, year level, gender, student type, status)
+combination; the per-dimension breakdowns are rolled up from those rows in
+Python. One more grouped query over Grade counts subject enrollments by status.
+Each part is cached with a short TTL and dropped by the Student and Grade
+signals, so open dashboards share one computation until something changes.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Student, Grade
+
+STUDENT_KPIS_KEY = 'kpis:students'
+GRADE_KPIS_KEY = 'kpis:grades'
+STATUSES = [value for value, _ in Student.STUDENT_STATUS_CHOICES]
+UNSPECIFIED = 'Unspecified'
+GRADE_STATUS_KEYS = {'Currently Taking': 'currently_taking', 'Done': 'done', 'Drop': 'dropped'}
+
+# Breakdown name -> (key column, label column or a dict of choice labels)
+DIMENSIONS = {
+    'department': ('department_name_id', 'department_name__name'),
+    'course': ('course_id', 'course__name'),
+    'year_level': ('year_level', dict(Student.YEAR_LEVEL_CHOICES)),
+    'gender': ('gender', dict(Student.GENDER_CHOICES)),
+    'student_type': ('student_type', dict(Student.STUDENT_TYPE_CHOICES)),
+}
+
+
+def kpi_cache_timeout():
+    return getattr(settings, 'KPI_CACHE_TIMEOUT', 60)
+
+
+def _empty_counts():
+    return dict.fromkeys(STATUSES + [UNSPECIFIED, 'total'], 0)
+
+
+def _add(counts, status, count):
+    counts[status if status in STATUSES else UNSPECIFIED] += count
+    counts['total'] += count
+
+
+def compute_student_kpis():
+    """Status counts overall and per dimension, from one grouped query"""
+    columns = {'student_status'}
+    for key, label in DIMENSIONS.values():
+        columns.add(key)
+        if isinstance(label, str):
+            columns.add(label)
+    rows = Student.objects.values(*sorted(columns)).annotate(count=Count('pk')).order_by()
+
+    totals = _empty_counts()
+    breakdowns = {name: {} for name in DIMENSIONS}
+    for row in rows:
+        _add(totals, row['student_status'], row['count'])
+        for name, (key, label) in DIMENSIONS.items():
+            value = row[key]
+            if value in (None, ''):
+                value, text = None, UNSPECIFIED
+            else:
+                text = row[label] if isinstance(label, str) else label.get(value, value)
+            entry = breakdowns[name].setdefault(value, {'key': value, 'label': text, **_empty_counts()})
+            _add(entry, row['student_status'], row['count'])
+
+    return {
+        'statuses': STATUSES + [UNSPECIFIED],
+        'totals': totals,
+        'breakdowns': {
+            name: sorted(entries.values(), key=lambda entry: (entry['key'] is None, str(entry['label'])))
+            for name, entries in breakdowns.items()
+        },
+        'generated_at': timezone.now(),
+    }
+
+
+def compute_grade_kpis():
+    """Subject enrollments by grade status (active grades only), from one grouped query"""
+    counts = dict.fromkeys(list(GRADE_STATUS_KEYS.values()) + ['total', 'graded'], 0)
+    for row in Grade.objects.filter(is_active=True).values('status').annotate(
+        count=Count('pk'), graded=Count('grade_value')
+    ).order_by():
+        key = GRADE_STATUS_KEYS.get(row['status'])
+        if key:
+            counts[key] += row['count']
+        counts['total'] += row['count']
+        counts['graded'] += row['graded']
+    counts['generated_at'] = timezone.now()
+    return counts
+
+
+def enrollment_kpis():
+    """{'students': ..., 'grades': ...}, each from cache or one query"""
+    from .metrics import record_cache_lookup
+
+    students = cache.get(STUDENT_KPIS_KEY)
+    record_cache_lookup('kpis_students', students is not None)
+    if students is None:
+        students = compute_student_kpis()
+        cache.set(STUDENT_KPIS_KEY, students, kpi_cache_timeout())
+    grades = cache.get(GRADE_KPIS_KEY)
+    record_cache_lookup('kpis_grades', grades is not None)
+    if grades is None:
+        grades = compute_grade_kpis()
+        cache.set(GRADE_KPIS_KEY, grades, kpi_cache_timeout())
+    return {'students': students, 'grades': grades}
+
+
+def invalidate_student_kpis():
+    cache.delete(STUDENT_KPIS_KEY)
+
+
+def invalidate_grade_kpis():
+    cache.delete(GRADE_KPIS_KEY)
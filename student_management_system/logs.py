@@ -0,0 +1,141 @@
+"""
+Structured, non-blocking logging.
+
+JsonFormatter writes one JSON object per record: time, level, logger, message,
+the request ID, where the call was made, the exception if any, and whatever was
+passed in extra= (the request profile of profiling.py, for instance).
+
+RequestIDMiddleware gives each request an ID, taken from a well formed
+X-Request-ID header or made up, and echoes it in the response. RequestIDFilter
+stamps it on every record logged while the request is handled.
+
+With LOG_QUEUE on, start_queue_logging() moves the root logger's handlers behind
+a QueueHandler: the request thread only builds the record and puts it on a queue,
+and a QueueListener thread formats and writes it.
+
+Call sites pass arguments instead of formatting the message themselves
+(logging.info("Saved %s", pk)) so messages below the logger's level are never
+built, and loops that only log check logging.root.isEnabledFor() first.
+"""
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import time
+import uuid
+
+from django.conf import settings
+
+# ID of the request being handled
+current_request_id = contextvars.ContextVar('request_id', default=None)
+
+_VALID_REQUEST_ID = re.compile(r'[A-Za-z0-9._:-]{1,64}')
+
+# Attributes every LogRecord has; the others came in through extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime', 'request_id'}
+
+_listener = None
+_queue = None
+
+
+def new_request_id(header=None):
+    """The incoming X-Request-ID if it is well formed, otherwise a new one"""
+    if header and _VALID_REQUEST_ID.fullmatch(header):
+        return header
+    return uuid.uuid4().hex
+
+
+class RequestIDFilter(logging.Filter):
+    """Add the current request ID (or None) to records as record.request_id"""
+    def filter(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; values JSON cannot encode are written with str()"""
+    def format(self, record):
+        data = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+            'module': record.module,
+            'function': record.funcName,
+            'line': record.lineno,
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                data[key] = value
+        return json.dumps(data, default=str)
+
+
+class QueueHandler(logging.handlers.QueueHandler):
+    """
+    Put records on the queue with their message built and request ID stamped, both of which
+    need the request thread; formatting and writing are left to the listener's handlers.
+    """
+    def prepare(self, record):
+        if not hasattr(record, 'request_id'):
+            record.request_id = current_request_id.get()
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks hold frames that must not outlive the request thread
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def start_queue_logging():
+    """
+    Move the root logger's handlers to a QueueListener thread, once per process; called when
+    the app is ready, after LOGGING is applied. Turned off by LOG_QUEUE = False.
+    """
+    global _listener, _queue
+    if _listener is not None or not getattr(settings, 'LOG_QUEUE', True):
+        return
+    root = logging.getLogger()
+    handlers = [handler for handler in root.handlers if not isinstance(handler, logging.handlers.QueueHandler)]
+    if not handlers:
+        return
+    _queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(_queue, *handlers, respect_handler_level=True)
+    for handler in handlers:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(_queue))
+    _listener.start()
+    atexit.register(stop_queue_logging)
+
+
+def stop_queue_logging():
+    """Write out the records still queued and give the handlers back to the root logger"""
+    global _listener, _queue
+    if _listener is None:
+        return
+    _listener.stop()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, QueueHandler):
+            root.removeHandler(handler)
+    for handler in _listener.handlers:
+        root.addHandler(handler)
+    _listener = _queue = None
+
+
+def queue_size():
+    """Records waiting to be written (0 without LOG_QUEUE)"""
+    return _queue.qsize() if _queue is not None else 0
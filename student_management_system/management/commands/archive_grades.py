@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_system.archive import archivable_grades, archive_grades, closed_academic_years
+
+
+class Command(BaseCommand):
+    help = (
+        "Move grades of closed academic years, and inactive grades untouched for GRADE_ARCHIVE_INACTIVE_DAYS, "
+        "from the live Grade table to GradeArchive in chunked transactions. Transcripts, GWA and rankings "
+        "read both tables, so nothing disappears from a student's record."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--academic-year', action='append', dest='academic_years',
+                            help='Archive this academic year; repeatable (default: every closed academic year).')
+        parser.add_argument('--no-closed', action='store_true', help='Do not archive whole academic years.')
+        parser.add_argument('--inactive-days', type=int,
+                            help='Archive inactive grades not updated for this many days (default GRADE_ARCHIVE_INACTIVE_DAYS).')
+        parser.add_argument('--no-inactive', action='store_true', help='Do not archive inactive grades.')
+        parser.add_argument('--chunk-size', type=int, default=1000, help='Grade rows moved per transaction.')
+        parser.add_argument('--dry-run', action='store_true', help='Count the grades that would be archived.')
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError('--chunk-size must be at least 1.')
+        if options['no_closed']:
+            academic_years = []
+        else:
+            academic_years = options['academic_years'] or closed_academic_years()
+        inactive_days = 0 if options['no_inactive'] else options['inactive_days']
+
+        self.stdout.write(f"Academic years: {', '.join(academic_years) or 'none'}")
+        started = time.perf_counter()
+        moved = archive_grades(
+            archivable_grades(academic_years, inactive_days),
+            chunk_size=options['chunk_size'],
+            dry_run=options['dry_run'],
+        )
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f"Dry run: {moved} grades would be archived."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Archived {moved} grades in {elapsed:.2f}s"))
@@ -0,0 +1,146 @@
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.test import Client, RequestFactory
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from student_management_system.db.pool import close_pools, pools
+from student_management_system.models import User
+
+POOLED_ENGINES = {
+    'mysql': 'student_management_system.db.mysql',
+    'sqlite': 'student_management_system.db.sqlite3',
+}
+
+# Mode -> settings of the default database
+MODES = {
+    'per-request': {'CONN_MAX_AGE': 0},
+    'persistent': {'CONN_MAX_AGE': 600, 'CONN_HEALTH_CHECKS': True},
+    'pooled': {'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': True, 'pool': True},
+}
+
+
+def run_mode(url, cookie, threads, requests):
+    """Send requests from each of threads threads through the full handler; returns timings in seconds"""
+    handler = WSGIHandler()
+    factory = RequestFactory()
+    timings = []
+    failures = []
+    lock = threading.Lock()
+    start = threading.Barrier(threads)
+
+    def start_response(status, headers):
+        if not status.startswith('2'):
+            failures.append(status)
+
+    def worker():
+        mine = []
+        start.wait()
+        for _ in range(requests):
+            environ = factory.get(url, HTTP_COOKIE=cookie).environ
+            started = time.perf_counter()
+            response = handler(environ, start_response)
+            b''.join(response)
+            response.close()
+            mine.append(time.perf_counter() - started)
+        connections.close_all()
+        with lock:
+            timings.extend(mine)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return timings, time.perf_counter() - started, failures
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what connection reuse saves per request: the same view is requested from concurrent "
+        "threads through the full request handler with a connection per request (CONN_MAX_AGE=0), "
+        "persistent connections with health checks, and the connection pool. Runs against the "
+        "configured database (MySQL, or SQLite as a stand-in)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', help='Path to request (default: the course list of the API).')
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent request threads.')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per thread.')
+        parser.add_argument('--pool-size', type=int, default=4, help='max_size of the pool in pooled mode.')
+        parser.add_argument('--modes', default=','.join(MODES), help='Comma separated modes to run.')
+
+    def handle(self, *args, **options):
+        modes = options['modes'].split(',')
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f"Unknown modes: {', '.join(sorted(unknown))}. Choose from {', '.join(MODES)}.")
+        if options['threads'] < 1 or options['requests'] < 1 or options['pool_size'] < 1:
+            raise CommandError('--threads, --requests and --pool-size must be at least 1.')
+
+        database = connections.settings[DEFAULT_DB_ALIAS]
+        vendor = connections[DEFAULT_DB_ALIAS].vendor
+        if 'pooled' in modes and vendor not in POOLED_ENGINES:
+            self.stdout.write(self.style.WARNING(f"No pooled backend for {vendor}; skipping pooled mode."))
+            modes.remove('pooled')
+        original = {key: database.get(key) for key in ('ENGINE', 'CONN_MAX_AGE', 'CONN_HEALTH_CHECKS')}
+        original_options = dict(database['OPTIONS'])
+
+        connects = []
+
+        def count_connection(sender, connection, **kwargs):
+            connects.append(connection.alias)
+
+        setup_test_environment()
+        admin = User.objects.create_superuser('bench-conn-admin', 'bench-conn-admin@example.com', 'bench-pass')
+        connection_created.connect(count_connection, dispatch_uid='benchmark_connections')
+        try:
+            client = Client()
+            client.force_login(admin)
+            cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+            url = options['url'] or reverse('course-list')
+            self.stdout.write(f"{vendor}, {options['threads']} threads x {options['requests']} requests of {url}")
+            self.stdout.write(f"{'mode':<12} {'median ms':>10} {'p95 ms':>9} {'req/s':>8} {'connections':>12}")
+
+            baseline = None
+            for mode in modes:
+                config = MODES[mode]
+                database['CONN_MAX_AGE'] = config['CONN_MAX_AGE']
+                database['CONN_HEALTH_CHECKS'] = config.get('CONN_HEALTH_CHECKS', False)
+                database['OPTIONS'] = dict(original_options)
+                database['ENGINE'] = original['ENGINE']
+                if config.get('pool'):
+                    database['ENGINE'] = POOLED_ENGINES[vendor]
+                    database['OPTIONS']['pool'] = {'max_size': options['pool_size']}
+                connects.clear()
+                timings, elapsed, failures = run_mode(url, cookie, options['threads'], options['requests'])
+                opened = len(connects)
+                if DEFAULT_DB_ALIAS in pools:
+                    # Every checkout "connects" the wrapper; count what the pool really opened
+                    opened = pools[DEFAULT_DB_ALIAS].stats()['opened_total']
+                close_pools()
+                if failures:
+                    raise CommandError(f"{mode}: {len(failures)} requests failed ({failures[0]})")
+                median = statistics.median(timings) * 1000
+                p95 = statistics.quantiles(timings, n=20)[-1] * 1000 if len(timings) > 1 else median
+                line = f"{mode:<12} {median:>10.2f} {p95:>9.2f} {len(timings) / elapsed:>8.0f} {opened:>12}"
+                if baseline is None:
+                    baseline = median
+                elif baseline:
+                    line += f"  {baseline - median:.2f} ms/request less than {modes[0]}"
+                self.stdout.write(line)
+        finally:
+            connection_created.disconnect(dispatch_uid='benchmark_connections')
+            database.update(original)
+            database['OPTIONS'] = original_options
+            connections[DEFAULT_DB_ALIAS].close()
+            User.objects.filter(pk=admin.pk).delete()
+            teardown_test_environment()
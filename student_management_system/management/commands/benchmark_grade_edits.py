@@ -0,0 +1,147 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import AsyncClient, Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+
+from student_management_system.models import Department, Course, Subject, Student, User
+
+
+def seed_grade_edit_data(subject_count):
+    """A student and the subjects whose grades the benchmark edits"""
+    department = Department.objects.create(name='Benchmark Department')
+    course = Course.objects.create(course_id='BENCH', name='Benchmark Course', credits='150',
+                                   department_name=department)
+    student = Student.objects.create(first_name='Benchmark', last_name='Student', course=course,
+                                     department_name=department, year_level=1, academic_year='2025')
+    subjects = [
+        Subject.objects.create(subject_id=f'BENCH{index}', subject_name=f'Benchmark {index}',
+                               subject_code=f'BENCH{index}', credits=3, department_name=department,
+                               semester_offered='1st', professor_name='Benchmark Professor',
+                               year_level=1, course_id=course)
+        for index in range(subject_count)
+    ]
+    return student, subjects
+
+
+def edit_payloads(student, subjects, total):
+    """Round-robin grade edits over the subjects, alternating between two grade values"""
+    return [
+        {
+            'student_id': student.pk,
+            'subject_id': subjects[index % len(subjects)].pk,
+            'semester': '1st',
+            'academic_year': '2025',
+            'year_level': '1',
+            'grade_value': '1.25' if index % 2 else '2.00',
+        }
+        for index in range(total)
+    ]
+
+
+def summarize(latencies, elapsed, failures):
+    latencies = sorted(latencies)
+    p95 = latencies[max(int(len(latencies) * 0.95) - 1, 0)] if latencies else 0
+    return {
+        'requests_per_second': len(latencies) / elapsed if elapsed else 0,
+        'p50_ms': statistics.median(latencies) * 1000 if latencies else 0,
+        'p95_ms': p95 * 1000,
+        'failures': failures,
+    }
+
+
+def run_threaded(url, payloads, threads, session):
+    """
+    The same async views through the WSGI handler, from a fixed number of threads. Each request
+    runs its view with async_to_sync, so this is what the async views cost under a WSGI
+    deployment, not a measurement of the sync views they replaced.
+    """
+    def edit(payload):
+        started = time.perf_counter()
+        client = Client()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session
+        response = client.post(url, payload)
+        connection.close()
+        return time.perf_counter() - started, response.status_code == 200 and response.json().get('success')
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(edit, payloads))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in results], elapsed, sum(1 for _, ok in results if not ok))
+
+
+async def run_asgi(url, payloads, concurrency, session):
+    """Async views on a single event loop, with up to `concurrency` requests in flight"""
+    client = AsyncClient()
+    client.cookies[settings.SESSION_COOKIE_NAME] = session
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def edit(payload):
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post(url, payload)
+            return time.perf_counter() - started, response.status_code == 200 and response.json().get('success')
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(edit(payload) for payload in payloads))
+    elapsed = time.perf_counter() - started
+    return summarize([latency for latency, _ in results], elapsed, sum(1 for _, ok in results if not ok))
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent grade edits through edit_grade_ajax: a single ASGI event loop against "
+        "the WSGI handler on a fixed thread pool (mode 'wsgi-a2s', where each request runs the async "
+        "view through async_to_sync). Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Grade edits per run.')
+        parser.add_argument('--concurrency', default='1,10,50',
+                            help='Comma separated numbers of concurrent clients to test.')
+        parser.add_argument('--wsgi-threads', type=int, default=4,
+                            help='Threads of the wsgi-a2s run.')
+        parser.add_argument('--subjects', type=int, default=20, help='Distinct subjects the edits touch.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the test database between runs.')
+
+    def handle(self, *args, **options):
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                "SQLite serializes writers, so concurrent edits mostly measure its lock. Run on MySQL for real numbers."
+            ))
+
+        levels = [int(level) for level in options['concurrency'].split(',') if level.strip()]
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            student, subjects = seed_grade_edit_data(options['subjects'])
+            payloads = edit_payloads(student, subjects, options['requests'])
+            url = reverse('edit_grade_ajax')
+            admin = User.objects.create_superuser('bench-grade-admin', 'bench-grade-admin@example.com', 'bench-pass')
+            client = Client()
+            client.force_login(admin)
+            session = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+            self.stdout.write(
+                f"{options['requests']} grade edits per run; wsgi-a2s runs the same async views through "
+                f"the WSGI handler on {options['wsgi_threads']} threads"
+            )
+            self.stdout.write(f"{'clients':>8} {'mode':>9} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'failed':>7}")
+            for level in levels:
+                asgi = asyncio.run(run_asgi(url, payloads, level, session))
+                threaded = run_threaded(url, payloads, min(level, options['wsgi_threads']), session)
+                for mode, result in (('asgi', asgi), ('wsgi-a2s', threaded)):
+                    self.stdout.write(
+                        f"{level:>8} {mode:>9} {result['requests_per_second']:>9.1f} "
+                        f"{result['p50_ms']:>9.1f} {result['p95_ms']:>9.1f} {result['failures']:>7}"
+                    )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
@@ -0,0 +1,349 @@
+import json
+import math
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.urls import reverse
+from django.utils import timezone
+
+from student_management_system.models import User, Staff, Student, Subject, Grade
+from student_management_system.seeding import CATALOG, seed_dataset
+
+# (department, staff board, subject roster, student view) of each staff area
+STAFF_VIEWS = [
+    ('College of Computer Studies', 'SMSstaffit', 'SMSstaffvstu', 'SMSstaffcstu'),
+    ('College of Hotel and Restaurant Management', 'SMSstaffhm', 'SMSstaffvstuhm', 'SMSstaffcstuhm'),
+    ('College of Business Administration', 'SMSstaffba', 'SMSstaffvstuba', 'SMSstaffcstuba'),
+    ('College of Business Administration', 'SMSstaffA', 'SMSstaffvstuA', 'SMSstaffcstuA'),
+    ('College of Education', 'SMSstaffE', 'SMSstaffvstuE', 'SMSstaffcstuE'),
+]
+
+
+class Scenario:
+    """One request to measure; setup runs before every request and is not timed"""
+    def __init__(self, name, client, method, url, data=None, setup=None, headers=None):
+        self.name = name
+        self.client = client
+        self.method = method
+        self.url = url
+        self.data = data
+        self.setup = setup
+        self.headers = headers or {}
+
+    def request(self, iteration):
+        data = self.data(iteration) if callable(self.data) else self.data
+        send = self.client.post if self.method == 'POST' else self.client.get
+        return send(self.url, data, headers=self.headers)
+
+
+def benchmark_users(student):
+    """An admin, a staff member and the account of the given student, with logged in clients"""
+    admin = User.objects.create_superuser('bench-admin', 'bench-admin@example.com', 'bench-pass')
+    staff_user = User.objects.create_user('bench-staff', 'bench-staff@example.com', 'bench-pass', role=User.Role.STAFF)
+    Staff.objects.create(user=staff_user)
+    student_user = User.objects.create_user('bench-student', 'bench-student@example.com', 'bench-pass',
+                                            role=User.Role.STUDENT)
+    Student.objects.filter(pk=student.pk).update(user=student_user)
+    clients = {}
+    for role, user in (('admin', admin), ('staff', staff_user), ('student', student_user)):
+        # A view that raises is recorded with its 500 status instead of aborting the run
+        clients[role] = Client(raise_request_exception=False)
+        clients[role].force_login(user)
+    return clients
+
+
+def build_scenarios(clients):
+    """
+    The measured requests, against the busiest student and subjects of the seeded data. Raises
+    CommandError when the dataset cannot back one of them, rather than leaving it out of the report.
+    """
+    student = Student.objects.filter(student_status='Enrolled').annotate(taken=Count('grades')).order_by('-taken', 'pk').first()
+    if student is None:
+        raise CommandError('The dataset has no enrolled student.')
+    grades = Grade.objects.filter(student=student).order_by('pk')
+    edited = grades.filter(grade_value__isnull=True).first() or grades.first()
+    deleted = grades.exclude(subject_id=getattr(edited, 'subject_id', None)).first()
+    # A subject the student does not take, from their own course if any is left, else from any course
+    untaken = Subject.objects.exclude(grades__student=student).order_by('pk')
+    spare = untaken.filter(course_id=student.course_id).first() or untaken.first()
+    if edited is None or deleted is None:
+        raise CommandError(f'The busiest enrolled student ({student.pk}) has fewer than two grades.')
+    if spare is None:
+        raise CommandError(f'Every subject is taken by the busiest enrolled student ({student.pk}).')
+    admin, staff, student_client = clients['admin'], clients['staff'], clients['student']
+
+    scenarios = [
+        Scenario('student_list', admin, 'GET', reverse('student_list')),
+        Scenario('student_list_search', admin, 'GET', reverse('student_list'), {'search': 'Santos'}),
+        Scenario('student_record', admin, 'GET', reverse('student_record', args=[student.pk])),
+        Scenario('SMS_grade', student_client, 'GET', reverse('SMS_grade')),
+        Scenario('SMSsubjectsave', admin, 'GET', reverse('SMSsubjectsave')),
+        Scenario('SMSsubjectsave_post', admin, 'POST', reverse('SMSsubjectsave'), lambda iteration: {
+            'subject_name': f'Benchmark Subject {iteration}', 'subject_code': f'BN{iteration}', 'credits': '3',
+            'department_name': student.department_name_id, 'semester_offered': '1st',
+            'professor_name': 'Benchmark Professor', 'year_level': '1', 'course_id': student.course_id,
+        }),
+    ]
+
+    for department, board, roster, student_view in STAFF_VIEWS:
+        subject = Subject.objects.filter(course_id__department_name__name=department).annotate(
+            enrolled=Count('grades')
+        ).order_by('-enrolled', 'pk').first()
+        enrolled = Student.objects.filter(course__department_name__name=department, student_status='Enrolled').order_by('pk').first()
+        if subject is None or enrolled is None:
+            raise CommandError(f'The dataset has no subject or no enrolled student in the {department}.')
+        # The hotel management roster URL takes the subject_id string, the others an integer
+        key = subject.subject_id if roster == 'SMSstaffvstuhm' else subject.pk
+        scenarios += [
+            Scenario(board, staff, 'GET', reverse(board)),
+            Scenario(roster, staff, 'GET', reverse(roster, args=[key])),
+            Scenario(student_view, staff, 'GET', reverse(student_view, args=[enrolled.pk])),
+        ]
+
+    scenarios.append(Scenario('edit_grade_ajax', admin, 'POST', reverse('edit_grade_ajax'), lambda iteration: {
+        'student_id': student.pk, 'subject_id': edited.subject_id, 'semester': edited.semester,
+        'academic_year': edited.academic_year, 'year_level': edited.year_level or '',
+        'grade_value': '1.25' if iteration % 2 else '2.00',
+    }))
+
+    # Delete one of the student's grades, re-created as it was before every request
+    term = {'semester': deleted.semester, 'academic_year': deleted.academic_year}
+    restored = {field: getattr(deleted, field) for field in ('grade_value', 'year_level', 'is_active', 'status')}
+
+    def recreate(iteration):
+        Grade.objects.get_or_create(student=student, subject_id=deleted.subject_id, **term, defaults=restored)
+
+    scenarios.append(Scenario('delete_grade_ajax', admin, 'POST', reverse('delete_grade_ajax'),
+                              {'student_id': student.pk, 'subject_id': deleted.subject_id, **term}, setup=recreate))
+
+    # Swap a subject out and back in, so every iteration has a grade to change
+    pair = (edited.subject_id, spare.pk)
+    scenarios.append(Scenario('change_subject_ajax', admin, 'POST', reverse('change_subject_ajax'), lambda iteration: {
+        'student_id': student.pk, 'old_subject_id': pair[iteration % 2], 'new_subject': pair[(iteration + 1) % 2],
+    }, headers={'x-requested-with': 'XMLHttpRequest'}))
+    return scenarios
+
+
+class QueryCounter:
+    """Counts the queries run on a connection; unlike connection.queries it survives request_started resets"""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(scenario, repeats, warmup=1):
+    """
+    Wall time of every repeat, the query count of the last one, and peak traced memory of one
+    more. A view that fails on the warmup request is reported with its status only.
+    """
+    iteration = 0
+
+    def run():
+        nonlocal iteration
+        if scenario.setup:
+            scenario.setup(iteration)
+        counter = QueryCounter()
+        started = time.perf_counter()
+        with connection.execute_wrapper(counter):
+            response = scenario.request(iteration)
+        elapsed = time.perf_counter() - started
+        iteration += 1
+        return response, elapsed, counter.count
+
+    for _ in range(warmup):
+        response, _, _ = run()
+    result = {'method': scenario.method, 'url': scenario.url, 'status': response.status_code}
+    if response.status_code >= 500:
+        return result
+
+    timings = []
+    for _ in range(repeats):
+        response, elapsed, queries = run()
+        timings.append(elapsed * 1000)
+
+    # Tracing slows allocation down, so memory is measured on a separate, untimed request
+    tracemalloc.start()
+    try:
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    timings.sort()
+    return {
+        **result,
+        'repeats': repeats,
+        'wall_ms': {
+            'min': round(timings[0], 3),
+            'median': round(statistics.median(timings), 3),
+            # Nearest-rank percentile: the smallest timing at or above 95% of the requests
+            'p95': round(timings[math.ceil(0.95 * len(timings)) - 1], 3),
+            'max': round(timings[-1], 3),
+        },
+        'queries': queries,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def compare_results(baseline, current, time_threshold=0.2, memory_threshold=0.2, noise_ms=2.0):
+    """
+    Per scenario present in both runs: (name, changes, regressions). A regression is a query count
+    increase, a median wall time more than time_threshold slower (and at least noise_ms), or peak
+    memory more than memory_threshold higher.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if 'wall_ms' not in result or 'wall_ms' not in before:
+            # One of the runs failed; only a newly failing view is a regression
+            failed = 'wall_ms' in before
+            rows.append((name, {}, [f"status {before['status']} -> {result['status']}"] if failed else []))
+            continue
+        regressions = []
+        old_ms, new_ms = before['wall_ms']['median'], result['wall_ms']['median']
+        if new_ms > old_ms * (1 + time_threshold) and new_ms - old_ms >= noise_ms:
+            regressions.append(f"median {old_ms:.1f} -> {new_ms:.1f} ms")
+        if result['queries'] > before['queries']:
+            regressions.append(f"queries {before['queries']} -> {result['queries']}")
+        if result['peak_memory_kb'] > before['peak_memory_kb'] * (1 + memory_threshold):
+            regressions.append(f"peak memory {before['peak_memory_kb']:.0f} -> {result['peak_memory_kb']:.0f} KB")
+        changes = {
+            'wall_ms': new_ms - old_ms,
+            'queries': result['queries'] - before['queries'],
+            'peak_memory_kb': result['peak_memory_kb'] - before['peak_memory_kb'],
+        }
+        rows.append((name, changes, regressions))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the main views through the Django test client on a seeded synthetic dataset: wall time, "
+        "query count and peak memory per view, written as JSON. --compare flags regressions against an "
+        "earlier run. Runs against a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=10000, help='Students to seed.')
+        # 14 courses x 8 terms: about 13 subjects per term, so curricula fit the 40 grades per student
+        parser.add_argument('--subjects', type=int, default=1500, help='Subjects to seed.')
+        parser.add_argument('--grades', type=int, default=400000, help='Grade rows to seed (a target).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed of the dataset.')
+        parser.add_argument('--repeats', type=int, default=5, help='Timed requests per view.')
+        parser.add_argument('--only', help='Comma separated scenario names to run.')
+        parser.add_argument('--output', help='Write the results to this JSON file.')
+        parser.add_argument('--compare', help='Compare with the results in this JSON file.')
+        parser.add_argument('--time-threshold', type=float, default=0.2,
+                            help='Relative median slowdown counted as a regression (default 0.2).')
+        parser.add_argument('--memory-threshold', type=float, default=0.2,
+                            help='Relative peak memory growth counted as a regression (default 0.2).')
+        parser.add_argument('--fail-on-regression', action='store_true', help='Exit with an error on any regression.')
+        parser.add_argument('--keepdb', action='store_true', help='Keep the seeded test database between runs.')
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {options['compare']}: {e}")
+        if options['repeats'] < 1:
+            raise CommandError('--repeats must be at least 1.')
+
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            started = time.perf_counter()
+            if Student.objects.exists():
+                self.stdout.write("Reusing the kept test database")
+                dataset = {'students': Student.objects.count(), 'subjects': Subject.objects.count(),
+                           'grades': Grade.objects.count()}
+            else:
+                dataset = seed_dataset(options['students'], options['subjects'], options['grades'], options['seed'])
+                self.stdout.write(
+                    f"Seeded {dataset['students']} students, {dataset['subjects']} subjects and "
+                    f"{dataset['grades']} grades in {time.perf_counter() - started:.1f}s"
+                )
+                if dataset['grades'] < options['grades'] * 0.9:
+                    self.stdout.write(self.style.WARNING(
+                        f"Only {dataset['grades']} of the {options['grades']} grades fit the curricula; "
+                        "seed more --subjects to reach the target."
+                    ))
+            User.objects.filter(username__startswith='bench-').delete()
+            student = Student.objects.filter(student_status='Enrolled', course__department_name__name__in=list(CATALOG)
+                                             ).order_by('pk').first()
+            scenarios = build_scenarios(benchmark_users(student))
+            if options['only']:
+                names = {name.strip() for name in options['only'].split(',')}
+                scenarios = [scenario for scenario in scenarios if scenario.name in names]
+
+            report = {
+                'meta': {
+                    'created_at': timezone.now().isoformat(),
+                    'dataset': {**dataset, 'seed': options['seed']},
+                    'database': connection.vendor,
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'repeats': options['repeats'],
+                },
+                'results': {},
+            }
+            self.stdout.write(f"{'view':<24} {'status':>6} {'median ms':>10} {'p95 ms':>9} {'queries':>8} {'peak KB':>9}")
+            for scenario in scenarios:
+                result = measure(scenario, options['repeats'])
+                report['results'][scenario.name] = result
+                if 'wall_ms' not in result:
+                    self.stdout.write(self.style.ERROR(f"{scenario.name:<24} {result['status']:>6} failed"))
+                    continue
+                self.stdout.write(
+                    f"{scenario.name:<24} {result['status']:>6} {result['wall_ms']['median']:>10.1f} "
+                    f"{result['wall_ms']['p95']:>9.1f} {result['queries']:>8} {result['peak_memory_kb']:>9.0f}"
+                )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        if options['output']:
+            directory = os.path.dirname(options['output'])
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if baseline is not None:
+            self._compare(baseline, report, options)
+
+    def _compare(self, baseline, report, options):
+        rows = compare_results(baseline, report, options['time_threshold'], options['memory_threshold'])
+        if baseline.get('meta', {}).get('dataset') != report['meta']['dataset']:
+            self.stdout.write(self.style.WARNING("The runs used different datasets; timings are not comparable."))
+        regressed = [row for row in rows if row[2]]
+        for name, changes, regressions in rows:
+            line = f"{name:<24} " + (
+                f"{changes['wall_ms']:>+9.1f} ms {changes['queries']:>+4} queries {changes['peak_memory_kb']:>+8.0f} KB"
+                if changes else 'failed in a run'
+            )
+            self.stdout.write(self.style.ERROR(f"{line}  REGRESSION: {'; '.join(regressions)}") if regressions else line)
+        if regressed:
+            message = f"{len(regressed)} of {len(rows)} views regressed against {options['compare']}"
+            if options['fail_on_regression']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"No regressions in {len(rows)} views"))
@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from student_management_system.models import StaleRankingCohort
+from student_management_system.rankings import recompute_all_rankings, recompute_stale_rankings
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute precomputed class rankings. By default only the cohorts marked stale by grade "
+        "changes are recomputed; run it from cron every few minutes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true',
+                            help='Rebuild every cohort, e.g. after the first deployment or a course change.')
+        parser.add_argument('--chunk-size', type=int, default=100, help='Stale cohorts loaded per query.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rankings inserted per statement.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        if options['all']:
+            rankings = recompute_all_rankings(batch_size=options['batch_size'])
+            self.stdout.write(f"Rebuilt {rankings} class rankings in {time.perf_counter() - started:.2f}s")
+            return
+
+        pending = StaleRankingCohort.objects.count()
+        if not pending:
+            self.stdout.write("No stale cohorts.")
+            return
+        cohorts, rankings = recompute_stale_rankings(
+            chunk_size=options['chunk_size'], batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f"Recomputed {rankings} class rankings in {cohorts} stale cohorts "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,108 @@
+from itertools import count
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from student_management_system.models import Student, Subject, Grade
+
+# Plan text SQLite shows instead of the expected index of queries filtering on is_active. Django
+# compares booleans as bare columns ("WHERE is_active"); MySQL is given is_active = 1, but SQLite
+# cannot match a bare column to an index column, so it only uses the columns before is_active.
+SQLITE_FALLBACKS = {
+    'grade_student_active_idx': 'USING INDEX grade_student_',
+    'grade_student_order_idx': 'USING INDEX grade_student_',
+    'grade_subj_active_status_idx': 'USING INDEX student_management_system_grade_subject_id_',
+}
+_explain_ids = count()
+
+
+def hot_queries():
+    """
+    The hot view queries and the index each one is expected to use.
+    Values come from existing rows when there are any, so the plans match real data.
+    """
+    grade = Grade.objects.order_by('pk').first()
+    student = Student.objects.order_by('pk').first()
+    student_id = grade.student_id if grade else (student.pk if student else 1)
+    subject_id = grade.subject_id if grade else 1
+    course_id = student.course_id if student and student.course_id else 1
+
+    return [
+        ('student.grades.filter(is_active=True)',
+         Grade.objects.filter(student_id=student_id, is_active=True),
+         'grade_student_active_idx'),
+        ('roster grades by subject',
+         Grade.objects.filter(subject_id=subject_id, is_active=True, status='Currently Taking'),
+         'grade_subj_active_status_idx'),
+        ('grades for the student term',
+         Grade.objects.filter(student_id=student_id, year_level=1, semester='1st', academic_year='2025'),
+         'grade_student_term_idx'),
+        ('students by status',
+         Student.objects.filter(student_status='Enrolled'),
+         'student_status_idx'),
+        ('students by email',
+         Student.objects.filter(email='student@example.com'),
+         'student_email_idx'),
+        ('enrolled students of a course',
+         Student.objects.filter(course_id=course_id, student_status='Enrolled'),
+         'student_course_status_idx'),
+        ('register_page name lookup',
+         Student.objects.filter(first_name='Juan', middle_Name='Santos', last_name='Dela Cruz'),
+         'student_name_idx'),
+        ('transcript grades in term order',
+         Grade.objects.filter(student_id=student_id, is_active=True).order_by('year_level', 'semester_order'),
+         'grade_student_order_idx'),
+        ('course catalog ordering',
+         Subject.objects.filter(course_id=course_id).order_by('year_level', 'semester_order'),
+         'subject_course_term_idx'),
+        ('subjects by name',
+         Subject.objects.filter(subject_name='Programming 1'),
+         'subject_name_idx'),
+    ]
+
+
+def explain(queryset):
+    """
+    The plan of a queryset. SQLite does not re-plan a prepared EXPLAIN after an index is created
+    or dropped, and the sqlite3 module reuses the statement of the same SQL text, so there each
+    EXPLAIN is made a new statement with a numbered comment.
+    """
+    if connection.vendor != 'sqlite':
+        return queryset.explain()
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql} /* {next(_explain_ids)} */', params)
+        return '\n'.join(' '.join(map(str, row)) for row in cursor.fetchall())
+
+
+class Command(BaseCommand):
+    help = "Run EXPLAIN on the hot view queries and check that each one uses its index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true',
+                            help='Exit with an error when a query does not use its index.')
+        parser.add_argument('--verbose-plans', action='store_true',
+                            help='Print the full EXPLAIN output of every query.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'mysql':
+            self.stdout.write(self.style.WARNING(
+                f"Database vendor is {connection.vendor}; plans are only authoritative on MySQL."
+            ))
+
+        missing = []
+        for label, queryset, index_name in hot_queries():
+            plan = explain(queryset)
+            fallback = SQLITE_FALLBACKS.get(index_name) if connection.vendor == 'sqlite' else None
+            if index_name in plan:
+                self.stdout.write(self.style.SUCCESS(f"OK       {label}: uses {index_name}"))
+            elif fallback and fallback in plan:
+                self.stdout.write(self.style.SUCCESS(f"OK       {label}: uses the SQLite fallback of {index_name}"))
+            else:
+                missing.append(label)
+                self.stdout.write(self.style.ERROR(f"MISSING  {label}: expected {index_name}"))
+            if options['verbose_plans'] or label in missing:
+                self.stdout.write(plan)
+
+        if missing and options['strict']:
+            raise CommandError(f"{len(missing)} hot queries do not use their index: {', '.join(missing)}")
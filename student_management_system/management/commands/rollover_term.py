@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from student_management_system.models import Student
+from student_management_system.rollover import ROLLOVER_STATUSES, rollover_students
+
+
+class Command(BaseCommand):
+    help = (
+        "Advance cohorts of students to their next term: 1st semester -> 2nd semester, 2nd semester -> "
+        "1st semester of the next year level and academic year, last term -> Graduated. Creates the next "
+        "term's Grade rows and marks graded subjects Done, one transaction per cohort."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=int, help='Only this course (primary key).')
+        parser.add_argument('--year-level', type=int, help='Only this year level.')
+        parser.add_argument('--semester', help="Only this semester, e.g. '1st'.")
+        parser.add_argument('--academic-year', help='Only this academic year.')
+        parser.add_argument('--status', action='append', dest='statuses',
+                            help=f"Student status to roll over; repeatable (default: {', '.join(ROLLOVER_STATUSES)}).")
+        parser.add_argument('--dry-run', action='store_true', help='Report what would change and roll it back.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Grade rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        students = Student.objects.all()
+        for option, lookup in (('course', 'course_id'), ('year_level', 'year_level'),
+                               ('semester', 'semester'), ('academic_year', 'academic_year')):
+            if options[option] is not None:
+                students = students.filter(**{lookup: options[option]})
+
+        started = time.perf_counter()
+        reports = rollover_students(
+            students,
+            dry_run=options['dry_run'],
+            statuses=options['statuses'] or ROLLOVER_STATUSES,
+            batch_size=options['batch_size'],
+        )
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: nothing was saved."))
+        self.stdout.write(
+            f"{'course':<30} {'from':<20} {'to':<28} {'students':>8} {'done':>6} {'created':>8}"
+        )
+        for report in reports:
+            self.stdout.write(
+                f"{(report.course_name or '')[:30]:<30} {report.source_label:<20} {report.target_label:<28} "
+                f"{report.students:>8} {report.grades_done:>6} {report.grades_created:>8}"
+            )
+        self.stdout.write(
+            f"{len(reports)} cohorts, {sum(report.promoted for report in reports)} students promoted, "
+            f"{sum(report.graduated for report in reports)} graduated, "
+            f"{sum(report.grades_created for report in reports)} grade rows created in {elapsed:.2f}s"
+        )
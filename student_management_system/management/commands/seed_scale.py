@@ -0,0 +1,61 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from student_management_system.models import User, Student
+from student_management_system.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the database with a large synthetic dataset for load testing: the staff boards' departments "
+        "and courses, subjects with professors, students with accounts, staff accounts and grade histories. "
+        "Rows are bulk inserted without save() or signals, in one transaction, and the same sizes and seed "
+        "always produce the same rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50000, help='Students to create.')
+        parser.add_argument('--subjects', type=int, default=1200, help='Subjects to create, spread over the courses.')
+        parser.add_argument('--grades', type=int, default=1000000,
+                            help='Target number of grade rows; each history is capped by its curriculum.')
+        parser.add_argument('--staff', type=int, default=20, help='Staff accounts to create.')
+        parser.add_argument('--no-users', action='store_true', help='Do not create student accounts.')
+        parser.add_argument('--password', help='Password of every seeded account (default: accounts cannot log in).')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; also names the seeded rows.')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows inserted per statement.')
+
+    def handle(self, *args, **options):
+        for option in ('students', 'subjects', 'grades', 'staff'):
+            if options[option] < 0:
+                raise CommandError(f"--{option} cannot be negative.")
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        prefix = f"SEED{options['seed']}"
+        if (Student.objects.filter(student_number__startswith=f'{prefix}-').exists()
+                or User.objects.filter(username__startswith=f'{prefix.lower()}-').exists()):
+            raise CommandError(f"Seed {options['seed']} is already in the database; use another --seed.")
+
+        started = time.perf_counter()
+        counts = seed_dataset(
+            students=options['students'],
+            subjects=options['subjects'],
+            grades=options['grades'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            users=not options['no_users'],
+            staff=options['staff'],
+            password=options['password'],
+        )
+        elapsed = time.perf_counter() - started
+
+        # Nothing went through the signals, so drop what they would have invalidated
+        from student_management_system.analytics import bump_grade_version
+        from student_management_system.kpis import invalidate_grade_kpis, invalidate_student_kpis
+        bump_grade_version()
+        invalidate_grade_kpis()
+        invalidate_student_kpis()
+
+        self.stdout.write(', '.join(f"{count} {name}" for name, count in counts.items()))
+        self.stdout.write(self.style.SUCCESS(f"Seeded in {elapsed:.2f}s"))
+        self.stdout.write("Run compute_rankings to rank the seeded students.")
@@ -0,0 +1,312 @@
+"""
+Request, database, cache and queue metrics in the Prometheus text format.
+
+MetricsMiddleware counts every request by URL name, method and status, observes
+its latency in a histogram, and adds up the queries it ran and their time (with
+the query recorder of profiling.py). Cache lookups of the KPI and analytics
+caches, checkouts from database connection pools and activation emails are
+counted where they happen. Queue depths, pool usage and worker details are
+gauges read when the endpoint is scraped.
+
+Counters and histograms live in a per-process registry. Under a prefork server
+each worker only sees its own requests, so set METRICS_MULTIPROCESS_DIR to a
+directory shared by the workers (and emptied when the server starts): every
+worker then writes its registry there, at most every METRICS_WRITE_INTERVAL
+seconds after a request and at exit, and the endpoint adds all of them up. A
+write skipped for being too soon is made by a timer when the interval ends, so
+an idle worker's last requests are written too. A worker killed without running
+its exit handlers (SIGKILL, the OOM killer) loses at most the last
+METRICS_WRITE_INTERVAL seconds of counts. Gauges of workers that have exited
+are left out.
+"""
+import atexit
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from collections import defaultdict
+
+import django
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Name -> (type, help)
+METRICS = {
+    'sms_http_requests_total': ('counter', 'Requests handled, by URL name, method and status.'),
+    'sms_http_request_duration_seconds': ('histogram', 'Time to produce a response, by URL name.'),
+    'sms_db_queries_total': ('counter', 'SQL queries run while handling requests, by URL name.'),
+    'sms_db_query_duration_seconds_total': ('counter', 'Time spent in SQL queries while handling requests, by URL name.'),
+    'sms_db_pool_checkouts_total': ('counter', 'Connections taken from a pool, by database alias and result (reused, opened or timeout).'),
+    'sms_db_pool_wait_seconds': ('histogram', 'Time to take a connection from a pool, by database alias.'),
+    'sms_db_pool_connections': ('gauge', 'Open pooled connections, by database alias and state (idle or in_use).'),
+    'sms_db_pool_max_connections': ('gauge', 'Size limit of each connection pool.'),
+    'sms_db_pool_waiting_threads': ('gauge', 'Threads waiting for a pooled connection.'),
+    'sms_cache_requests_total': ('counter', 'Cache lookups, by cache and result (hit or miss).'),
+    'sms_emails_total': ('counter', 'Emails sent synchronously, by kind and result.'),
+    'sms_audit_buffer_entries': ('gauge', 'Grade audit entries waiting to be written.'),
+    'sms_event_subscribers': ('gauge', 'Connected grade event (SSE) subscribers.'),
+    'sms_event_queued_messages': ('gauge', 'Grade events queued for delivery to SSE subscribers.'),
+    'sms_event_dropped_messages': ('gauge', 'Grade events dropped because an SSE subscriber queue was full.'),
+    'sms_log_queue_records': ('gauge', 'Log records waiting for the logging thread.'),
+    'sms_worker_info': ('gauge', 'Worker process, Python and Django versions.'),
+    'sms_worker_start_time_seconds': ('gauge', 'Start time of the worker process, in seconds since the epoch.'),
+    'sms_worker_max_resident_memory_bytes': ('gauge', 'Peak resident memory of the worker process.'),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class Registry:
+    """Counters and histograms of this process, keyed by (name, sorted label pairs)"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.pid = os.getpid()
+        self.started = time.time()
+        self.counters = defaultdict(float)
+        # -> [count per bucket (not cumulative), count above the last bucket, sum]
+        self.histograms = {}
+
+    def _check_fork(self):
+        # A forked worker starts with its parent's numbers; it only reports its own
+        if os.getpid() != self.pid:
+            self._reset()
+
+    def inc(self, name, labels, amount=1):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._check_fork()
+            self.counters[key] += amount
+
+    def observe(self, name, labels, value, buckets=DEFAULT_BUCKETS):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._check_fork()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * (len(buckets) + 1) + [0.0]
+            for index, bound in enumerate(buckets):
+                if value <= bound:
+                    histogram[index] += 1
+                    break
+            else:
+                histogram[len(buckets)] += 1
+            histogram[-1] += value
+
+    def snapshot(self):
+        """JSON-serializable copy: counters, histograms, and the gauges of this process"""
+        with self._lock:
+            self._check_fork()
+            return {
+                'pid': self.pid,
+                'counters': [[name, list(labels), value] for (name, labels), value in self.counters.items()],
+                'histograms': [[name, list(labels), list(values)] for (name, labels), values in self.histograms.items()],
+                'gauges': [[name, sorted(labels.items()), value] for name, labels, value in process_gauges(self)],
+            }
+
+
+registry = Registry()
+_write_lock = threading.Lock()
+_last_write = 0.0
+_write_timer = None
+
+
+def multiprocess_dir():
+    return getattr(settings, 'METRICS_MULTIPROCESS_DIR', None)
+
+
+def write_snapshot(force=False):
+    """
+    Write this process's registry to METRICS_MULTIPROCESS_DIR, if set. Unless forced, at most
+    every METRICS_WRITE_INTERVAL seconds; a write skipped for that is made by a timer instead.
+    """
+    global _last_write, _write_timer
+    directory = multiprocess_dir()
+    if not directory:
+        return
+    with _write_lock:
+        wait = _last_write + getattr(settings, 'METRICS_WRITE_INTERVAL', 1.0) - time.monotonic()
+        if not force and wait > 0:
+            # A timer started before a fork does not run in the child
+            if _write_timer is None or not _write_timer.is_alive():
+                _write_timer = threading.Timer(wait, _write_on_timer)
+                _write_timer.daemon = True
+                _write_timer.start()
+            return
+        _last_write = time.monotonic()
+    snapshot = registry.snapshot()
+    path = os.path.join(directory, f"{snapshot['pid']}.json")
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(snapshot, f)
+        # Readers never see a half written file
+        os.replace(f'{path}.tmp', path)
+    except OSError as e:
+        logging.error("Could not write metrics to %s: %s", path, e)
+
+
+def _write_on_timer():
+    global _write_timer
+    with _write_lock:
+        # Requests counted from now on start a new timer
+        _write_timer = None
+    write_snapshot(force=True)
+
+
+atexit.register(write_snapshot, force=True)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def snapshots():
+    """This process's snapshot, or in multiprocess mode every worker's (written just now for this one)"""
+    directory = multiprocess_dir()
+    if not directory:
+        return [registry.snapshot()]
+    write_snapshot(force=True)
+    result = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning("Skipping unreadable metrics file %s: %s", filename, e)
+            continue
+        if not _alive(snapshot['pid']):
+            snapshot['gauges'] = []
+        result.append(snapshot)
+    return result
+
+
+def process_gauges(registry):
+    """(name, labels, value) of the live values of this process"""
+    from .audit import buffer
+    from .db.pool import pools
+    from .events import broker
+    from .logs import queue_size
+
+    pid = str(registry.pid)
+    queued, dropped = broker.queue_stats()
+    gauges = [
+        ('sms_audit_buffer_entries', {'pid': pid}, len(buffer)),
+        ('sms_event_subscribers', {'pid': pid}, broker.subscriber_count()),
+        ('sms_event_queued_messages', {'pid': pid}, queued),
+        ('sms_event_dropped_messages', {'pid': pid}, dropped),
+        ('sms_log_queue_records', {'pid': pid}, queue_size()),
+        ('sms_worker_info', {'pid': pid, 'python': platform.python_version(), 'django': django.get_version()}, 1),
+        ('sms_worker_start_time_seconds', {'pid': pid}, registry.started),
+    ]
+    for alias, pool in list(pools.items()):
+        stats = pool.stats()
+        gauges += [
+            ('sms_db_pool_connections', {'pid': pid, 'alias': alias, 'state': 'idle'}, stats['idle']),
+            ('sms_db_pool_connections', {'pid': pid, 'alias': alias, 'state': 'in_use'}, stats['in_use']),
+            ('sms_db_pool_max_connections', {'pid': pid, 'alias': alias}, stats['max_size']),
+            ('sms_db_pool_waiting_threads', {'pid': pid, 'alias': alias}, stats['waiting']),
+        ]
+    try:
+        import resource
+    except ImportError:
+        return gauges
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1 if platform.system() == 'Darwin' else 1024
+    gauges.append(('sms_worker_max_resident_memory_bytes', {'pid': pid},
+                   resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale))
+    return gauges
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(buckets=DEFAULT_BUCKETS):
+    """Every metric, merged over the snapshots, in the Prometheus text exposition format"""
+    counters = defaultdict(float)
+    histograms = {}
+    gauges = {}
+    for snapshot in snapshots():
+        for name, labels, value in snapshot['counters']:
+            counters[name, tuple(map(tuple, labels))] += value
+        for name, labels, values in snapshot['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            merged = histograms.setdefault(key, [0] * len(values))
+            for index, value in enumerate(values):
+                merged[index] += value
+        for name, labels, value in snapshot['gauges']:
+            gauges[name, tuple(map(tuple, labels))] = value
+
+    # Name -> [(labels, lines of that series)]; a histogram series keeps its buckets in order
+    series = defaultdict(list)
+    for (name, labels), value in counters.items():
+        series[name].append((labels, [f'{name}{_format_labels(labels)} {_format_value(value)}']))
+    for (name, labels), values in histograms.items():
+        cumulative = 0
+        lines = []
+        for bound, count in zip(buckets + (float('inf'),), values[:-1]):
+            cumulative += count
+            bucket_labels = labels + (('le', _format_value(float(bound))),)
+            lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(values[-1])}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        series[name].append((labels, lines))
+    for (name, labels), value in gauges.items():
+        series[name].append((labels, [f'{name}{_format_labels(labels)} {_format_value(value)}']))
+
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        if not series.get(name):
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, series_lines in sorted(series[name]):
+            lines.extend(series_lines)
+    return '\n'.join(lines) + '\n'
+
+
+def record_request(request, response, duration, tally):
+    """Count one finished request"""
+    match = getattr(request, 'resolver_match', None)
+    view = (match.view_name if match else None) or 'unresolved'
+    registry.inc('sms_http_requests_total', {'view': view, 'method': request.method, 'status': str(response.status_code)})
+    registry.observe('sms_http_request_duration_seconds', {'view': view}, duration)
+    registry.inc('sms_db_queries_total', {'view': view}, tally.queries)
+    registry.inc('sms_db_query_duration_seconds_total', {'view': view}, tally.sql_time)
+    write_snapshot()
+
+
+def record_cache_lookup(cache_name, hit):
+    registry.inc('sms_cache_requests_total', {'cache': cache_name, 'result': 'hit' if hit else 'miss'})
+
+
+def record_email(kind, sent):
+    registry.inc('sms_emails_total', {'kind': kind, 'result': 'sent' if sent else 'failed'})
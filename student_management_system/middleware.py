@@ -0,0 +1,306 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.utils.functional import SimpleLazyObject
+
+from .models import User, Student, Staff
+
+PROFILE_SESSION_KEY = '_sms_profile'
+
+
+def resolve_role(user):
+    """Return the User.Role of an authenticated user, or None for anonymous users."""
+    if not user.is_authenticated:
+        return None
+    if user.is_superuser:
+        return User.Role.ADMIN
+    if getattr(user, 'is_staff_member', False):
+        return User.Role.STAFF
+    return User.Role.STUDENT
+
+
+def _load_profile(request, model, cache_key):
+    """
+    Load the student or staff profile of the current user.
+    The profile pk is remembered in the session so later requests fetch it by pk.
+    """
+    cached = request.session.get(PROFILE_SESSION_KEY, {})
+    queryset = model.objects.all()
+    if model is Student:
+        queryset = queryset.select_related('course', 'department_name')
+
+    profile = None
+    profile_pk = cached.get(cache_key)
+    if profile_pk is not None:
+        profile = queryset.filter(pk=profile_pk, user=request.user).first()
+    if profile is None:
+        profile = queryset.filter(user=request.user).first()
+        if profile is not None:
+            cached[cache_key] = profile.pk
+            request.session[PROFILE_SESSION_KEY] = cached
+
+    if profile is not None:
+        # Reuse the already loaded user so str(profile) does not query it again
+        profile.user = request.user
+    return profile
+
+
+class RoleMiddleware:
+    """
+    Resolve the role and profile of the logged in user once per request.
+
+    Sets request.role to a User.Role value (or None for anonymous users),
+    and request.student / request.staff to the matching profile, loaded lazily
+    on first access. Must be placed after AuthenticationMiddleware.
+
+    Works in both sync and async middleware chains, so async views under ASGI
+    are not pushed onto a thread just to resolve the role.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        role = resolve_role(request.user)
+        session_profile = self._session_profile(request, role, request.session.get(PROFILE_SESSION_KEY))
+        if session_profile is not None:
+            request.session[PROFILE_SESSION_KEY] = session_profile
+        self._attach(request, role)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        user = await request.auser()
+        # Keep the resolved user so request.user does not trigger a sync query from async code
+        request.user = user
+        role = resolve_role(user)
+        session_profile = self._session_profile(request, role, await request.session.aget(PROFILE_SESSION_KEY))
+        if session_profile is not None:
+            await request.session.aset(PROFILE_SESSION_KEY, session_profile)
+        self._attach(request, role)
+        return await self.get_response(request)
+
+    @staticmethod
+    def _session_profile(request, role, cached):
+        """Return a fresh session profile when the cached one is missing or belongs to another user or role."""
+        if cached and (cached.get('user_id') != request.user.pk or cached.get('role') != role):
+            cached = None
+        if cached is None and role is not None:
+            return {'user_id': request.user.pk, 'role': role}
+        return None
+
+    @staticmethod
+    def _attach(request, role):
+        request.role = role
+        if role == User.Role.STUDENT:
+            request.student = SimpleLazyObject(lambda: _load_profile(request, Student, 'student_id'))
+        else:
+            request.student = None
+        if role == User.Role.STAFF:
+            request.staff = SimpleLazyObject(lambda: _load_profile(request, Staff, 'staff_id'))
+        else:
+            request.staff = None
+
+
+class AuditMiddleware:
+    """
+    Make the logged in user the actor of the grade audit entries recorded while handling the
+    request (audit.current_actor), and write the audit buffer once it is due after the response.
+    Must be placed after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        from .audit import buffer, current_actor
+        token = current_actor.set(request.user.pk if request.user.is_authenticated else None)
+        try:
+            return self.get_response(request)
+        finally:
+            current_actor.reset(token)
+            buffer.flush_if_due()
+
+    async def __acall__(self, request):
+        from .audit import buffer, current_actor
+        user = await request.auser()
+        token = current_actor.set(user.pk if user.is_authenticated else None)
+        try:
+            return await self.get_response(request)
+        finally:
+            current_actor.reset(token)
+            if buffer.is_due():
+                await sync_to_async(buffer.flush)()
+
+
+class ProfilingMiddleware:
+    """
+    Profile a sample of requests (REQUEST_PROFILING_SAMPLE_RATE, see profiling.py): SQL query
+    count and time, repeated query shapes and template render time, reported in a Server-Timing
+    header and a log line. Place it first so the figures cover the whole middleware chain.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        from . import profiling
+        if not profiling.should_profile():
+            return self.get_response(request)
+        profiling.install_template_timing()
+        with profiling.profile_queries(profiling.RequestProfile()) as profile:
+            response = self.get_response(request)
+        profile.finish()
+        profiling.report(request, response, profile)
+        return response
+
+    async def __acall__(self, request):
+        from . import profiling
+        if not profiling.should_profile():
+            return await self.get_response(request)
+        profiling.install_template_timing()
+        with profiling.profile_queries(profiling.RequestProfile()) as profile:
+            response = await self.get_response(request)
+        profile.finish()
+        if hasattr(request, 'auser'):
+            # Resolved (and cached) without a sync query, so report() can read request.user
+            request.user = await request.auser()
+        profiling.report(request, response, profile)
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Count every request for the metrics endpoint (see metrics.py): status, latency and the
+    queries it ran, by URL name. Place it right after ProfilingMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        from . import metrics, profiling
+        started = time.perf_counter()
+        # A sampled request already has a profile, which counts queries too
+        tally = profiling.current_profile.get() or profiling.QueryTally()
+        with profiling.profile_queries(tally):
+            response = self.get_response(request)
+        metrics.record_request(request, response, time.perf_counter() - started, tally)
+        return response
+
+    async def __acall__(self, request):
+        from . import metrics, profiling
+        started = time.perf_counter()
+        tally = profiling.current_profile.get() or profiling.QueryTally()
+        with profiling.profile_queries(tally):
+            response = await self.get_response(request)
+        # Snapshots may write a file; keep that off the event loop
+        await sync_to_async(metrics.record_request)(request, response, time.perf_counter() - started, tally)
+        return response
+
+
+class RequestIDMiddleware:
+    """
+    Give each request an ID (see logs.py): request.request_id, stamped on every log record
+    of the request and returned in the X-Request-ID response header. Place it first.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        from .logs import current_request_id, new_request_id
+        request.request_id = new_request_id(request.headers.get('X-Request-ID'))
+        token = current_request_id.set(request.request_id)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_request_id.reset(token)
+        response.headers['X-Request-ID'] = request.request_id
+        return response
+
+    async def __acall__(self, request):
+        from .logs import current_request_id, new_request_id
+        request.request_id = new_request_id(request.headers.get('X-Request-ID'))
+        token = current_request_id.set(request.request_id)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_request_id.reset(token)
+        response.headers['X-Request-ID'] = request.request_id
+        return response
+
+
+class ReplicaMiddleware:
+    """
+    Send the reads of views marked with @replica_reads to a read replica, and keep a session on
+    the primary for a while after it writes (see replicas.py). Place it after SessionMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        from .replicas import request_scope
+        with request_scope(request):
+            response = self.get_response(request)
+        return self._stream_from_replica(request, response)
+
+    async def __acall__(self, request):
+        from .replicas import request_scope
+        with request_scope(request):
+            response = await self.get_response(request)
+        return self._stream_from_replica(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        from .replicas import route_view
+        route_view(request, view_func)
+
+    def _stream_from_replica(self, request, response):
+        # A streamed body is produced after this middleware returns; keep it on the same replica
+        alias = getattr(request, 'replica_alias', None)
+        if alias and response.streaming and not response.is_async:
+            from .replicas import stream_from_replica
+            response.streaming_content = stream_from_replica(response.streaming_content, alias)
+        return response
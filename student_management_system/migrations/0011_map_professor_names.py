@@ -0,0 +1,41 @@
+from django.db import migrations
+
+
+def map_professor_names(apps, schema_editor):
+    """Create a Professor for every distinct Subject.professor_name and link the subjects to it"""
+    Professor = apps.get_model('student_management_system', 'Professor')
+    Staff = apps.get_model('student_management_system', 'Staff')
+    Subject = apps.get_model('student_management_system', 'Subject')
+
+    # Match professors to staff accounts by full name or username
+    staff_by_name = {}
+    for staff in Staff.objects.select_related('user'):
+        full_name = f"{staff.user.first_name} {staff.user.last_name}".strip().lower()
+        if full_name:
+            staff_by_name.setdefault(full_name, staff)
+        staff_by_name.setdefault(staff.user.username.lower(), staff)
+
+    names = Subject.objects.exclude(professor_name='').values_list('professor_name', flat=True).distinct()
+    linked_staff = set()
+    for raw_name in names:
+        name = raw_name.strip()
+        if not name:
+            continue
+        professor, created = Professor.objects.get_or_create(name=name)
+        staff = staff_by_name.get(name.lower())
+        if created and staff and staff.pk not in linked_staff:
+            professor.staff = staff
+            professor.save(update_fields=['staff'])
+            linked_staff.add(staff.pk)
+        Subject.objects.filter(professor_name=raw_name).update(professor=professor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_system', '0010_professor'),
+    ]
+
+    operations = [
+        migrations.RunPython(map_professor_names, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:46
+
+import re
+
+from django.db import migrations, models
+
+# Student.YEAR_LEVEL_CHOICES at the time of this migration
+YEAR_LEVELS = {1, 2, 3, 4}
+SEMESTER_ORDER = {'1st': 1, '2nd': 2, '3rd': 3}
+UNASSIGNED_SEMESTER_ORDER = 99
+
+
+def normalize_year_levels(apps, schema_editor):
+    """
+    Turn year level strings into their leading number ('2nd Year' -> '2') before the type change;
+    blanks and numbers that are not a year level ('0', '10') become NULL.
+    """
+    for model_name in ('Student', 'Grade'):
+        model = apps.get_model('student_management_system', model_name)
+        values = model.objects.exclude(year_level__isnull=True).values_list('year_level', flat=True).distinct()
+        for value in list(values):
+            number = re.search(r'\d+', str(value))
+            normalized = str(int(number.group())) if number and int(number.group()) in YEAR_LEVELS else None
+            if normalized != value:
+                model.objects.filter(year_level=value).update(year_level=normalized)
+
+
+def fill_semester_order(apps, schema_editor):
+    for model_name, field in (('Grade', 'semester'), ('Subject', 'semester_offered')):
+        model = apps.get_model('student_management_system', model_name)
+        model.objects.update(semester_order=UNASSIGNED_SEMESTER_ORDER)
+        for semester, order in SEMESTER_ORDER.items():
+            model.objects.filter(**{f'{field}__iexact': semester}).update(semester_order=order)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_system', '0011_map_professor_names'),
+    ]
+
+    operations = [
+        # Year levels become small integers on Student, Grade and Subject
+        migrations.AlterField(
+            model_name='student',
+            name='year_level',
+            field=models.CharField(blank=True, max_length=50, null=True),
+        ),
+        migrations.RunPython(normalize_year_levels, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='grade',
+            name='year_level',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='student',
+            name='year_level',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(1, '1st Year'), (2, '2nd Year'), (3, '3rd Year'), (4, '4th Year')], null=True),
+        ),
+        migrations.AlterField(
+            model_name='subject',
+            name='year_level',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        # Ordinal semester columns
+        migrations.AddField(
+            model_name='grade',
+            name='semester_order',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='semester_order',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(fill_semester_order, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='subject',
+            name='subject_course_year_sem_idx',
+        ),
+        migrations.AddIndex(
+            model_name='grade',
+            index=models.Index(fields=['student', 'is_active', 'year_level', 'semester_order'], name='grade_student_order_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='subject',
+            index=models.Index(fields=['course_id', 'year_level', 'semester_order'], name='subject_course_term_idx'),
+        ),
+    ]
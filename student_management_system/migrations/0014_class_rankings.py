@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_system', '0013_row_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassRanking',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_level', models.PositiveSmallIntegerField()),
+                ('semester_order', models.PositiveSmallIntegerField()),
+                ('academic_year', models.CharField(max_length=20)),
+                ('rank', models.PositiveIntegerField()),
+                ('cohort_size', models.PositiveIntegerField()),
+                ('gwa', models.DecimalField(decimal_places=4, max_digits=6)),
+                ('credits', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('failed_credits', models.DecimalField(decimal_places=2, max_digits=7)),
+                ('standing', models.CharField(max_length=30)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='student_management_system.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rankings', to='student_management_system.student')),
+            ],
+            options={
+                'verbose_name': 'Class Ranking',
+                'verbose_name_plural': 'Class Rankings',
+                'indexes': [models.Index(fields=['course', 'year_level', 'semester_order', 'academic_year', 'rank'], name='ranking_cohort_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('student', 'course', 'year_level', 'semester_order', 'academic_year'), name='ranking_student_term_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StaleRankingCohort',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year_level', models.PositiveSmallIntegerField()),
+                ('semester_order', models.PositiveSmallIntegerField()),
+                ('academic_year', models.CharField(max_length=20)),
+                ('marked_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='student_management_system.course')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('course', 'year_level', 'semester_order', 'academic_year'), name='stale_ranking_cohort_uniq')],
+            },
+        ),
+    ]
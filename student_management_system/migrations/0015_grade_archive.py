@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_system', '0014_class_rankings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('grade_value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('semester', models.CharField(max_length=10)),
+                ('semester_order', models.PositiveSmallIntegerField(default=1)),
+                ('academic_year', models.CharField(max_length=20)),
+                ('year_level', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('is_active', models.BooleanField(default=True)),
+                ('status', models.CharField(choices=[('Currently Taking', 'Currently Taking'), ('Drop', 'Drop'), ('Done', 'Done')], max_length=20)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_grades', to='student_management_system.student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_grades', to='student_management_system.subject')),
+            ],
+            options={
+                'verbose_name': 'Archived Grade',
+                'verbose_name_plural': 'Archived Grades',
+                'indexes': [models.Index(fields=['student', 'is_active', 'year_level', 'semester_order'], name='archive_student_order_idx'), models.Index(fields=['academic_year'], name='archive_academic_year_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 03:17
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('student_management_system', '0015_grade_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradeAuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=20)),
+                ('semester_order', models.PositiveSmallIntegerField(default=1)),
+                ('grade_id', models.BigIntegerField()),
+                ('action', models.CharField(choices=[('C', 'Created'), ('U', 'Updated'), ('D', 'Deleted')], max_length=1)),
+                ('old_value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('new_value', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('changes', models.JSONField(blank=True, default=dict)),
+                ('recorded_at', models.DateTimeField()),
+                ('actor', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('student', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='student_management_system.student')),
+                ('subject', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='student_management_system.subject')),
+            ],
+            options={
+                'verbose_name': 'Grade Audit Entry',
+                'verbose_name_plural': 'Grade Audit Entries',
+                'indexes': [models.Index(fields=['academic_year', 'semester_order', 'recorded_at'], name='audit_term_idx'), models.Index(fields=['grade_id', 'recorded_at'], name='audit_grade_idx'), models.Index(fields=['student', 'subject', 'recorded_at'], name='audit_student_subject_idx')],
+            },
+        ),
+    ]
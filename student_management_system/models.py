@@ -3,9 +3,24 @@ from django.db import models
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager, Group, Permission
 from django.utils.translation import gettext_lazy as _
+from django.utils import timezone
 
 # Create your models here.
 
+# Ordinal of each semester, stored next to the semester strings so terms sort in SQL
+SEMESTER_ORDER = {'1st': 1, '2nd': 2, '3rd': 3}
+UNASSIGNED_SEMESTER_ORDER = 99
+
+def semester_order(semester):
+    """Return the ordinal of a semester string such as '1st', or UNASSIGNED_SEMESTER_ORDER"""
+    if not semester:
+        return UNASSIGNED_SEMESTER_ORDER
+    return SEMESTER_ORDER.get(str(semester).strip().lower(), UNASSIGNED_SEMESTER_ORDER)
+
+# Grading scale: HIGHEST_GRADE is the best grade, anything above gpa.PASSING_GRADE up to LOWEST_GRADE fails
+HIGHEST_GRADE = 1.00
+LOWEST_GRADE = 5.00
+
 class StudentManager(models.Manager):
     """Custom manager for Student model"""
     def get_queryset(self):
@@ -41,6 +56,9 @@ class User(AbstractUser):
     class Meta:
         verbose_name = _('user')
         verbose_name_plural = _('users')
+        indexes = [
+            models.Index(fields=['email'], name='user_email_idx'),  # Email logins
+        ]
 
     def save(self, *args, **kwargs):
         if not self.pk:
@@ -72,6 +90,20 @@ class Staff(models.Model):
     def __str__(self):
         return f"{self.user.username}"
 
+class Professor(models.Model):
+    """A professor teaching subjects, optionally linked to a staff account"""
+    name = models.CharField(max_length=255, unique=True)
+    staff = models.OneToOneField(Staff, on_delete=models.SET_NULL, null=True, blank=True, related_name='professor')
+    created_at = models.DateTimeField(auto_now_add=True)
+    objects = models.Manager()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Professor'
+        verbose_name_plural = 'Professors'
+
 class Course(models.Model):
     id = models.AutoField(primary_key=True)
     #course_name = models.CharField(max_length=100)
@@ -80,6 +112,7 @@ class Course(models.Model):
     credits = models.CharField(max_length=10)
     department_name = models.ForeignKey('Department', on_delete=models.SET_DEFAULT, default=1)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Row version for conditional GET
     objects = models.Manager()
 
     def save(self, *args, **kwargs):
@@ -108,8 +141,10 @@ class Subject(models.Model):
     credits = models.IntegerField(default=0)                    
     department_name = models.ForeignKey('Department', on_delete=models.SET_DEFAULT, default=1)   
     semester_offered = models.CharField(max_length=10, default='1st') 
+    semester_order = models.PositiveSmallIntegerField(default=1, editable=False)  # Ordinal of semester_offered, set on save
     professor_name = models.CharField(max_length=255)  
-    year_level = models.IntegerField(default=1)    
+    professor = models.ForeignKey(Professor, on_delete=models.SET_NULL, null=True, blank=True, related_name='subjects')  # Kept in sync with professor_name
+    year_level = models.PositiveSmallIntegerField(default=1)    
     lecture_hour = models.IntegerField(default=0)  # Renamed from number_of_hours to lecture_hour
     laboratory_hour = models.IntegerField(default=0)  # New field for laboratory hours
     STATUS_CHOICES = [
@@ -120,18 +155,34 @@ class Subject(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Currently Taking')  # Fixed default value
     course_id = models.ForeignKey(Course, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Row version for conditional GET
     objects = models.Manager()             
 
+    def save(self, *args, **kwargs):
+        self.semester_order = semester_order(self.semester_offered)
+        # Link the Professor matching professor_name, creating it if needed
+        professor_name = (self.professor_name or '').strip()
+        if not professor_name:
+            self.professor = None
+        elif self.professor is None or self.professor.name != professor_name:
+            self.professor, created = Professor.objects.get_or_create(name=professor_name)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.subject_name} ({self.subject_code})"
 
     class Meta:
         verbose_name = "Subject"
         verbose_name_plural = "Subjects"
+        indexes = [
+            models.Index(fields=['course_id', 'year_level', 'semester_order'], name='subject_course_term_idx'),  # Catalog ordering
+            models.Index(fields=['subject_name'], name='subject_name_idx'),  # Staff rosters match by subject name
+        ]
 
 
 class Department(models.Model):
     name = models.CharField(max_length=255, unique=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Row version for conditional GET
 
     def __str__(self):
         return self.name
@@ -154,12 +205,12 @@ class Student(models.Model):
     address = models.CharField(max_length=255, default='Unknown')
     phone = models.CharField(max_length=20, blank=True, default='')
     YEAR_LEVEL_CHOICES = [
-        ('1', '1st Year'),
-        ('2', '2nd Year'),
-        ('3', '3rd Year'),
-        ('4', '4th Year'),
+        (1, '1st Year'),
+        (2, '2nd Year'),
+        (3, '3rd Year'),
+        (4, '4th Year'),
     ]
-    year_level = models.CharField(max_length=50, choices=YEAR_LEVEL_CHOICES, blank=True)  # Changed to year_level for consistency
+    year_level = models.PositiveSmallIntegerField(choices=YEAR_LEVEL_CHOICES, null=True, blank=True)  # Same type as Subject.year_level and Grade.year_level
     course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='students', null=True, blank=True)
     department_name = models.ForeignKey(Department, on_delete=models.SET_NULL, null=True, blank=True)  # Changed to ForeignKey
     
@@ -212,6 +263,7 @@ class Student(models.Model):
     junior_high_name_year_graduated = models.CharField(max_length=255, default='Unknown')  # Changed to CharField
     senior_high_name_year_graduated = models.CharField(max_length=255, default='Unknown')  # Changed to CharField
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # Row version for conditional GET
     objects = StudentManager()
 
     def __str__(self):
@@ -223,6 +275,12 @@ class Student(models.Model):
         # Removed default ordering by 'created_at' to avoid ordering by creation date
         verbose_name = 'Student'
         verbose_name_plural = 'Students'
+        indexes = [
+            models.Index(fields=['student_status'], name='student_status_idx'),
+            models.Index(fields=['email'], name='student_email_idx'),
+            models.Index(fields=['course', 'student_status'], name='student_course_status_idx'),  # Staff rosters
+            models.Index(fields=['first_name', 'middle_Name', 'last_name'], name='student_name_idx'),  # register_page lookup
+        ]
 
     def save(self, *args, **kwargs):
         if self.user and self.email and self.user.email != self.email:
@@ -237,8 +295,9 @@ class Grade(models.Model):
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='grades')
     grade_value = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
     semester = models.CharField(max_length=10, default='1st', blank=False, null=False)
+    semester_order = models.PositiveSmallIntegerField(default=1, editable=False)  # Ordinal of semester, set on save
     academic_year = models.CharField(max_length=20, blank=False, null=False)
-    year_level = models.CharField(max_length=50, blank=True, null=True)  # Added year_level field
+    year_level = models.PositiveSmallIntegerField(blank=True, null=True)  # Added year_level field
     is_active = models.BooleanField(default=True)  # New field to mark active/inactive grades
 
     STATUS_CHOICES = [
@@ -258,6 +317,8 @@ class Grade(models.Model):
         if (not self.academic_year or self.academic_year.strip() == '') and self.student and self.student.academic_year:
             self.academic_year = self.student.academic_year
 
+        self.semester_order = semester_order(self.semester)
+
         # Set status based on grade_value first
         if self.grade_value is not None and str(self.grade_value).strip() != '':
             self.status = "Done"
@@ -266,6 +327,13 @@ class Grade(models.Model):
 
         super().save(*args, **kwargs)
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The values as loaded, so the audit log can record what a save changed without re-reading the row
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
     def __str__(self):
         return f"{self.student} - {self.subject}: {self.grade_value}"
 
@@ -273,6 +341,142 @@ class Grade(models.Model):
         verbose_name = 'Grade'
         verbose_name_plural = 'Grades'
         unique_together = ('student', 'subject', 'semester', 'academic_year')
+        indexes = [
+            models.Index(fields=['student', 'is_active'], name='grade_student_active_idx'),  # student.grades.filter(is_active=...)
+            models.Index(fields=['subject', 'is_active', 'status'], name='grade_subj_active_status_idx'),  # Staff rosters
+            models.Index(fields=['student', 'year_level', 'semester', 'academic_year'], name='grade_student_term_idx'),  # Term activation
+            models.Index(fields=['student', 'is_active', 'year_level', 'semester_order'], name='grade_student_order_idx'),  # Transcripts in term order
+        ]
+
+class GradeArchive(models.Model):
+    """
+    Cold storage for Grade rows of closed academic years and long-inactive rows, moved
+    by the archive_grades command (see archive.py). Rows keep the primary key they had
+    in Grade, so live and archived grades can be read together with a UNION.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='archived_grades')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='archived_grades')
+    grade_value = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    semester = models.CharField(max_length=10)
+    semester_order = models.PositiveSmallIntegerField(default=1)
+    academic_year = models.CharField(max_length=20)
+    year_level = models.PositiveSmallIntegerField(blank=True, null=True)
+    is_active = models.BooleanField(default=True)
+    status = models.CharField(max_length=20, choices=Grade.STATUS_CHOICES)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.student} - {self.subject}: {self.grade_value} (archived)"
+
+    class Meta:
+        verbose_name = 'Archived Grade'
+        verbose_name_plural = 'Archived Grades'
+        indexes = [
+            models.Index(fields=['student', 'is_active', 'year_level', 'semester_order'], name='archive_student_order_idx'),  # Transcripts
+            models.Index(fields=['academic_year'], name='archive_academic_year_idx'),
+        ]
+
+
+class GradeAuditEntry(models.Model):
+    """
+    Append-only record of one grade change (see audit.py). Entries are never updated or
+    deleted with the grade, so foreign keys carry no database constraint and the grade is a
+    plain id (it may since have been deleted or archived). academic_year and semester_order
+    are the partition key: a term's entries are one index range, and with no foreign key
+    or unique constraints the table can be partitioned by term and purged one term at a time.
+    """
+    CREATED, UPDATED, DELETED = 'C', 'U', 'D'
+    ACTION_CHOICES = [
+        (CREATED, 'Created'),
+        (UPDATED, 'Updated'),
+        (DELETED, 'Deleted'),
+    ]
+    academic_year = models.CharField(max_length=20)
+    semester_order = models.PositiveSmallIntegerField(default=1)
+    grade_id = models.BigIntegerField()
+    student = models.ForeignKey(Student, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    subject = models.ForeignKey(Subject, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    action = models.CharField(max_length=1, choices=ACTION_CHOICES)
+    old_value = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    new_value = models.DecimalField(max_digits=5, decimal_places=2, null=True, blank=True)
+    changes = models.JSONField(default=dict, blank=True)  # Other audited fields: {field: [old, new]}
+    actor = models.ForeignKey('User', on_delete=models.DO_NOTHING, db_constraint=False, null=True, blank=True,
+                              related_name='+')
+    recorded_at = models.DateTimeField()  # When the change was made, not when the entry was flushed
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"Grade {self.grade_id} {self.get_action_display()}: {self.old_value} -> {self.new_value}"
+
+    class Meta:
+        verbose_name = 'Grade Audit Entry'
+        verbose_name_plural = 'Grade Audit Entries'
+        indexes = [
+            models.Index(fields=['academic_year', 'semester_order', 'recorded_at'], name='audit_term_idx'),  # A term's changes
+            models.Index(fields=['grade_id', 'recorded_at'], name='audit_grade_idx'),  # One grade's history
+            models.Index(fields=['student', 'subject', 'recorded_at'], name='audit_student_subject_idx'),  # Across re-enrollments
+        ]
+
+
+class ClassRanking(models.Model):
+    """
+    Precomputed rank of a student within their (course, year_level, semester, academic_year)
+    cohort, written by the compute_rankings command (see rankings.py). Rank 1 is the best
+    (lowest) GWA; tied averages share a rank.
+    """
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='rankings')
+    student = models.ForeignKey(Student, on_delete=models.CASCADE, related_name='rankings')
+    year_level = models.PositiveSmallIntegerField()  # 0 for grades without a year level
+    semester_order = models.PositiveSmallIntegerField()
+    academic_year = models.CharField(max_length=20)
+    rank = models.PositiveIntegerField()
+    cohort_size = models.PositiveIntegerField()
+    gwa = models.DecimalField(max_digits=6, decimal_places=4)
+    credits = models.DecimalField(max_digits=7, decimal_places=2)
+    failed_credits = models.DecimalField(max_digits=7, decimal_places=2)
+    standing = models.CharField(max_length=30)
+    updated_at = models.DateTimeField(auto_now=True)
+    objects = models.Manager()
+
+    def __str__(self):
+        return f"{self.student} - rank {self.rank} of {self.cohort_size}"
+
+    class Meta:
+        verbose_name = 'Class Ranking'
+        verbose_name_plural = 'Class Rankings'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['student', 'course', 'year_level', 'semester_order', 'academic_year'],
+                name='ranking_student_term_uniq',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['course', 'year_level', 'semester_order', 'academic_year', 'rank'],
+                         name='ranking_cohort_rank_idx'),  # Cohort lists in rank order
+        ]
+
+
+class StaleRankingCohort(models.Model):
+    """A cohort whose rankings must be recomputed; marked by the Grade signals"""
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='+')
+    year_level = models.PositiveSmallIntegerField()
+    semester_order = models.PositiveSmallIntegerField()
+    academic_year = models.CharField(max_length=20)
+    marked_at = models.DateTimeField(default=timezone.now)
+    objects = models.Manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['course', 'year_level', 'semester_order', 'academic_year'],
+                name='stale_ranking_cohort_uniq',
+            ),
+        ]
+
 
 class EmailVerificationCode(models.Model):
     """Model for storing email verification codes"""
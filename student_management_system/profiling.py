@@ -0,0 +1,195 @@
+"""
+Sampled per-request profiling.
+
+ProfilingMiddleware profiles a REQUEST_PROFILING_SAMPLE_RATE share of requests
+(0, the default, turns it off; 1 profiles every request). For a profiled request
+it records the number of SQL queries and the time spent in them (through an
+execute wrapper kept on every database connection), how often each query shape ran,
+and the time spent rendering templates. The figures go out as a Server-Timing
+header, which browser dev tools show next to the request, and as one log line.
+A query shape that runs REQUEST_PROFILING_DUPLICATE_THRESHOLD times or more in
+one request is usually an N+1 and is logged as a warning with its SQL.
+
+Requests that are not sampled cost one random() call; once installed, the query
+and template wrappers cost one context variable lookup per query or render.
+"""
+import contextvars
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+# QueryTally (or RequestProfile, if sampled) of the request being handled
+current_profile = contextvars.ContextVar('request_profile', default=None)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+def sample_rate():
+    return getattr(settings, 'REQUEST_PROFILING_SAMPLE_RATE', 0.0)
+
+
+def duplicate_threshold():
+    return getattr(settings, 'REQUEST_PROFILING_DUPLICATE_THRESHOLD', 5)
+
+
+def fingerprint(sql):
+    """The shape of a query: literals and IN lists of any length collapse, so an N+1's queries match"""
+    shape = _LITERALS.sub('?', sql)
+    shape = _IN_LISTS.sub('(...)', shape)
+    return _SPACES.sub(' ', shape).strip()
+
+
+class QueryTally:
+    """Number of queries of a request, the time spent in them and in rendering templates"""
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, sql, elapsed, many):
+        self.queries += 1
+        self.sql_time += elapsed
+
+
+class RequestProfile(QueryTally):
+    """What one request spent its time on"""
+    def __init__(self):
+        super().__init__()
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def record_query(self, sql, elapsed, many):
+        super().record_query(sql, elapsed, many)
+        self.shapes[fingerprint(sql) + (' [many]' if many else '')] += 1
+
+    def duplicates(self, threshold=None):
+        """Query shapes that ran at least threshold times, most repeated first"""
+        threshold = duplicate_threshold() if threshold is None else threshold
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= threshold]
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+
+    def server_timing(self):
+        repeated = self.duplicates()
+        metrics = [
+            f'sql;dur={self.sql_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f};desc="templates"',
+            f'total;dur={self.duration * 1000:.1f}',
+        ]
+        if repeated:
+            metrics.append(f'dup;desc="{len(repeated)} repeated query shapes, up to {repeated[0][1]}x"')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'duration_ms': round(self.duration * 1000, 1),
+            'queries': self.queries,
+            'sql_ms': round(self.sql_time * 1000, 1),
+            'template_ms': round(self.template_time * 1000, 1),
+            'duplicate_queries': {shape: count for shape, count in self.duplicates()},
+        }
+
+
+def _record(execute, sql, params, many, context):
+    profile = current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.record_query(sql, time.perf_counter() - started, many)
+
+
+def _install(connection):
+    # First in the list, so execute_wrapper() blocks entered earlier still pop their own wrapper
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, _record)
+
+
+def _connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+def install_query_recording():
+    """
+    Put the query recorder on this thread's database connections and on every connection opened
+    from now on; called when the app is ready, before any connection is opened. The recorder
+    only records while a profile is current.
+    """
+    connection_created.connect(_connection_created, dispatch_uid='request_profiling')
+    for alias in connections:
+        _install(connections[alias])
+
+
+@contextmanager
+def profile_queries(profile):
+    """Record the queries run while the block runs into profile (see install_query_recording)"""
+    token = current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        current_profile.reset(token)
+
+
+def install_template_timing():
+    """
+    Time top-level template renders. render() and render_to_string() go through the Django
+    backend's Template.render once per page (includes and {% extends %} do not), so wrapping
+    it measures each page once without double counting. Installed once per process.
+    """
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, 'profiled', False):
+        return
+    render = Template.render
+
+    def profiled_render(self, context=None, request=None):
+        profile = current_profile.get()
+        if profile is None:
+            return render(self, context, request)
+        started = time.perf_counter()
+        try:
+            return render(self, context, request)
+        finally:
+            profile.template_time += time.perf_counter() - started
+
+    profiled_render.profiled = True
+    Template.render = profiled_render
+
+
+def report(request, response, profile):
+    """Add the Server-Timing header and log the profile of a finished request"""
+    response.headers['Server-Timing'] = profile.server_timing()
+    user = getattr(request, 'user', None)
+    data = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'user_id': user.pk if user is not None and user.is_authenticated else None,
+        **profile.as_dict(),
+    }
+    logging.info(
+        "Request profile: %s %s %s %sms, %s queries in %sms, templates %sms",
+        data['method'], data['path'], data['status'], data['duration_ms'],
+        data['queries'], data['sql_ms'], data['template_ms'],
+        extra={'request_profile': data},
+    )
+    for shape, count in profile.duplicates():
+        logging.warning("Possible N+1 on %s %s: %sx %s", request.method, request.path, count, shape[:500])
+
+
+def should_profile():
+    rate = sample_rate()
+    return rate > 0 and (rate >= 1 or random.random() < rate)
@@ -0,0 +1,167 @@
+"""
+Precomputed class rankings per (course, year_level, semester, academic_year) cohort.
+
+Grade signals mark the cohort of every changed grade in StaleRankingCohort, and
+the compute_rankings command recomputes only those cohorts: one query loads
+their grade rows, the GPA engine averages every student term, and the ranks are
+assigned with a sort over the whole batch. Pages then read a student's rank with
+a single indexed lookup on ClassRanking.
+"""
+import logging
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .archive import GradeHistory
+from .gpa import NO_GRADES, STANDINGS, GradeArrays, compute_gpa
+from .models import ClassRanking, StaleRankingCohort, Student, semester_order
+
+
+def grade_cohort_q(cohorts):
+    """Grades of the students currently in each (course_id, year_level, semester_order, academic_year) cohort"""
+    query = Q()
+    for course_id, year_level, order, academic_year in cohorts:
+        # Grades without a year level are ranked as year level 0 (see GradeArrays)
+        level = Q(year_level=year_level) if year_level else Q(year_level__isnull=True) | Q(year_level=0)
+        query |= level & Q(student__course_id=course_id, semester_order=order, academic_year=academic_year)
+    return query
+
+
+def ranking_cohort_q(cohorts):
+    query = Q()
+    for course_id, year_level, order, academic_year in cohorts:
+        query |= Q(course_id=course_id, year_level=year_level, semester_order=order, academic_year=academic_year)
+    return query
+
+
+def rank_cohorts(arrays):
+    """Unsaved ClassRanking rows for every cohort present in the grade arrays"""
+    result = compute_gpa(arrays, by_term=True)
+    if not len(result):
+        return []
+
+    # A student's course is the same on all of their rows; take it from their first one
+    students, first_row = np.unique(arrays.student_id, return_index=True)
+    course = arrays.course_id[first_row][np.searchsorted(students, result.student_ids)]
+    keep = (result.standing != NO_GRADES) & (course > 0)
+
+    year_labels, year_code = np.unique(result.terms['academic_year'], return_inverse=True)
+    year_code = year_code.reshape(-1)
+    cohort_columns = (course, result.terms['year_level'], result.terms['semester_order'], year_code)
+
+    # Sort by cohort, then by GWA (lower is better), then by student for a stable order
+    order = np.lexsort((result.student_ids, result.gwa) + cohort_columns[::-1])
+    order = order[keep[order]]
+    count = len(order)
+    if not count:
+        return []
+    positions = np.arange(count)
+    cohort_start = np.zeros(count, dtype=bool)
+    cohort_start[0] = True
+    for column in cohort_columns:
+        cohort_start[1:] |= column[order][1:] != column[order][:-1]
+    value_start = cohort_start.copy()
+    value_start[1:] |= result.gwa[order][1:] != result.gwa[order][:-1]
+
+    # Tied averages share the rank of the first of them (1, 2, 2, 4)
+    first_of_cohort = np.maximum.accumulate(np.where(cohort_start, positions, 0))
+    first_of_value = np.maximum.accumulate(np.where(value_start, positions, 0))
+    rank = first_of_value - first_of_cohort + 1
+    cohort_id = np.cumsum(cohort_start) - 1
+    cohort_size = np.bincount(cohort_id)[cohort_id]
+
+    # Plain Python columns; per-element NumPy scalar access is far slower
+    columns = {
+        'course_id': course[order].tolist(),
+        'student_id': result.student_ids[order].tolist(),
+        'year_level': result.terms['year_level'][order].tolist(),
+        'semester_order': result.terms['semester_order'][order].tolist(),
+        'academic_year': year_labels[year_code[order]].tolist(),
+        'rank': rank.tolist(),
+        'cohort_size': cohort_size.tolist(),
+        'gwa': np.round(result.gwa[order], 4).tolist(),
+        'credits': np.round(result.credits[order], 2).tolist(),
+        'failed_credits': np.round(result.failed_credits[order], 2).tolist(),
+        'standing': [STANDINGS[code] for code in result.standing[order].tolist()],
+    }
+    return [ClassRanking(**dict(zip(columns, row))) for row in zip(*columns.values())]
+
+
+def recompute_all_rankings(batch_size=1000):
+    """Rebuild the whole ranking table from every active, graded row"""
+    started = timezone.now()
+    rankings = rank_cohorts(GradeArrays.from_history())
+    with transaction.atomic():
+        ClassRanking.objects.all().delete()
+        ClassRanking.objects.bulk_create(rankings, batch_size=batch_size)
+        StaleRankingCohort.objects.filter(marked_at__lte=started).delete()
+    logging.info("Recomputed %s class rankings", len(rankings))
+    return len(rankings)
+
+
+def recompute_stale_rankings(chunk_size=100, batch_size=1000):
+    """
+    Recompute the cohorts marked stale, chunk_size cohorts per query. Returns the
+    number of (cohorts, rankings) written. A cohort marked again while its chunk is
+    being computed stays marked for the next run.
+    """
+    cohorts_done = rankings_done = 0
+    last_pk = 0
+    while True:
+        stale = list(StaleRankingCohort.objects.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+        if not stale:
+            break
+        last_pk = stale[-1].pk
+        cohorts = [(row.course_id, row.year_level, row.semester_order, row.academic_year) for row in stale]
+        rankings = rank_cohorts(GradeArrays.from_history(GradeHistory().filter(grade_cohort_q(cohorts))))
+        with transaction.atomic():
+            ClassRanking.objects.filter(ranking_cohort_q(cohorts)).delete()
+            ClassRanking.objects.bulk_create(rankings, batch_size=batch_size)
+            for row in stale:
+                StaleRankingCohort.objects.filter(pk=row.pk, marked_at=row.marked_at).delete()
+        cohorts_done += len(stale)
+        rankings_done += len(rankings)
+    logging.info("Recomputed %s class rankings in %s stale cohorts", rankings_done, cohorts_done)
+    return cohorts_done, rankings_done
+
+
+def mark_cohort_stale(course_id, year_level, order, academic_year):
+    """Mark one cohort for recomputation with a single upsert"""
+    if not course_id or not academic_year:
+        return
+    options = {'update_conflicts': True, 'update_fields': ['marked_at']}
+    if connection.features.supports_update_conflicts_with_target:
+        options['unique_fields'] = ['course', 'year_level', 'semester_order', 'academic_year']
+    StaleRankingCohort.objects.bulk_create([StaleRankingCohort(
+        course_id=course_id,
+        year_level=year_level or 0,
+        semester_order=order,
+        academic_year=academic_year,
+        marked_at=timezone.now(),
+    )], **options)
+
+
+def mark_grade_cohort_stale(student_id, year_level, order, academic_year):
+    """Mark the cohort of a saved or deleted grade; looks up the student's course, skipping deleted students"""
+    course_id = Student.objects.filter(pk=student_id).values_list('course_id', flat=True).first()
+    mark_cohort_stale(course_id, year_level, order, academic_year)
+
+
+def mark_student_term_stale(student):
+    """Mark the cohort of the student's current term, for grade changes made with queryset updates"""
+    mark_cohort_stale(student.course_id, student.year_level, semester_order(student.semester), student.academic_year)
+
+
+def current_ranking(student):
+    """The student's precomputed rank for their current term, or None; one indexed lookup"""
+    if student is None or not student.course_id:
+        return None
+    return ClassRanking.objects.filter(
+        student=student,
+        course_id=student.course_id,
+        year_level=student.year_level or 0,
+        semester_order=semester_order(student.semester),
+        academic_year=student.academic_year,
+    ).first()
@@ -0,0 +1,133 @@
+"""
+Read replicas for reporting and roster pages.
+
+DATABASE_REPLICAS lists the aliases in DATABASES that hold copies of
+'default'. ReplicaMiddleware sends the reads of GET and HEAD requests to views
+marked with @replica_reads (or API view classes with replica_reads = True) to
+one of them, picked per request; everything else, and every write, goes to
+'default'. Reads outside requests use the read_from_replica() block.
+
+Replicas lag behind the primary, so after a user writes (any POST, or a GET
+that wrote) their session reads from the primary for REPLICA_STICKY_SECONDS,
+and they see what they just saved. Within one request, the first write also
+moves the remaining reads to the primary.
+
+Locally, two SQLite files stand in for primary and replica: copy db.sqlite3
+to replica.sqlite3 and add it as DATABASES['replica'] (with
+DATABASE_REPLICAS = ['replica']). Migrations only run on the primary.
+"""
+import contextvars
+import random
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_SESSION_KEY = '_sms_primary_until'
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Replica alias the reads of the current request or block go to, if any
+_replica = contextvars.ContextVar('replica_alias', default=None)
+# Whether the current request or block has written, so its reads stay on the primary
+_pinned = contextvars.ContextVar('primary_pinned', default=False)
+
+
+def replica_aliases():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def sticky_seconds():
+    return getattr(settings, 'REPLICA_STICKY_SECONDS', 10)
+
+
+def replica_reads(view):
+    """Mark a read-only view whose GET requests may read from a replica"""
+    view.replica_reads = True
+    return view
+
+
+@contextmanager
+def read_from_replica(alias=None):
+    """Send the reads of the block to alias (default: a random replica) until the block writes"""
+    aliases = replica_aliases()
+    if alias is None and aliases:
+        alias = random.choice(aliases)
+    replica_token = _replica.set(alias)
+    pinned_token = _pinned.set(False)
+    try:
+        yield alias
+    finally:
+        _pinned.reset(pinned_token)
+        _replica.reset(replica_token)
+
+
+@contextmanager
+def request_scope(request):
+    """Keep the routing of one request to that request, and make its session sticky after a write"""
+    replica_token = _replica.set(None)
+    pinned_token = _pinned.set(False)
+    try:
+        yield
+        wrote = _pinned.get()
+    finally:
+        _pinned.reset(pinned_token)
+        _replica.reset(replica_token)
+    if (wrote or request.method not in SAFE_METHODS) and replica_aliases() and hasattr(request, 'session'):
+        request.session[STICKY_SESSION_KEY] = time.time() + sticky_seconds()
+
+
+def route_view(request, view_func):
+    """Pick a replica for the reads of this view, if it is marked and the session is not sticky"""
+    if request.method not in SAFE_METHODS:
+        return
+    if not (getattr(view_func, 'replica_reads', False)
+            or getattr(getattr(view_func, 'cls', None), 'replica_reads', False)):
+        return
+    aliases = replica_aliases()
+    if not aliases:
+        return
+    session = getattr(request, 'session', None)
+    if session is not None and session.get(STICKY_SESSION_KEY, 0) > time.time():
+        return
+    request.replica_alias = random.choice(aliases)
+    _replica.set(request.replica_alias)
+
+
+def stream_from_replica(chunks, alias):
+    """Produce each chunk of a streamed response on the replica its view read from"""
+    iterator = iter(chunks)
+    while True:
+        with read_from_replica(alias):
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+        yield chunk
+
+
+class ReplicaRouter:
+    """Database router for DATABASE_ROUTERS; see the module docstring"""
+    def db_for_read(self, model, **hints):
+        if _pinned.get():
+            return None
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        _pinned.set(True)
+        instance = hints.get('instance')
+        # An object read from a replica is still saved to the primary
+        if instance is not None and instance._state.db in replica_aliases():
+            return DEFAULT_DB_ALIAS
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in replica_aliases():
+            return False
+        return None
@@ -0,0 +1,180 @@
+"""
+Term rollover: advance whole cohorts of students to their next term.
+
+A cohort is the students sharing (course, year_level, semester, academic_year).
+Each cohort is rolled over in one transaction with set-based statements:
+graded subjects of the finished term are marked Done, the students are moved
+to the next term (or marked Graduated after the last term) with one UPDATE,
+and the Grade rows of the next term's curriculum are created with bulk_create.
+Nothing per student goes through save() or the per-row signals; the hooks that
+depend on them run once per cohort after commit.
+"""
+import logging
+import re
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Student, Subject, Grade, semester_order
+
+MAX_YEAR_LEVEL = max(level for level, _ in Student.YEAR_LEVEL_CHOICES)
+ROLLOVER_STATUSES = ('Enrolled',)
+GRADUATED = 'graduated'
+
+
+def next_academic_year(academic_year):
+    """'2024-2025' -> '2025-2026' and '2025' -> '2026'; None when the format is not recognised"""
+    value = (academic_year or '').strip()
+    span = re.fullmatch(r'(\d{4})\s*-\s*(\d{4})', value)
+    if span:
+        start, end = int(span.group(1)), int(span.group(2))
+        return f'{start + 1}-{end + 1}'
+    if re.fullmatch(r'\d{4}', value):
+        return str(int(value) + 1)
+    return None
+
+
+def next_term(year_level, semester, academic_year):
+    """
+    (year_level, semester, academic_year) after the given term, GRADUATED after the
+    last term, or None when the term cannot be advanced (unknown semester or academic year format).
+    """
+    if not year_level:
+        return None
+    order = semester_order(semester)
+    if order == 1:
+        return year_level, '2nd', academic_year
+    if order == 2:
+        if year_level >= MAX_YEAR_LEVEL:
+            return GRADUATED
+        following = next_academic_year(academic_year)
+        if following is None:
+            return None
+        return year_level + 1, '1st', following
+    return None
+
+
+class CohortReport:
+    """What rolling over one cohort did (or, in a dry run, would do)"""
+    def __init__(self, course_id, course_name, year_level, semester, academic_year, students):
+        self.course_id = course_id
+        self.course_name = course_name
+        self.year_level = year_level
+        self.semester = semester
+        self.academic_year = academic_year
+        self.students = students
+        self.target = None
+        self.graduated = 0
+        self.promoted = 0
+        self.grades_done = 0
+        self.grades_created = 0
+        self.skipped = ''
+
+    @property
+    def source_label(self):
+        return f"Y{self.year_level} {self.semester} {self.academic_year}"
+
+    @property
+    def target_label(self):
+        if self.skipped:
+            return f"skipped: {self.skipped}"
+        if self.target == GRADUATED:
+            return 'Graduated'
+        year_level, semester, academic_year = self.target
+        return f"Y{year_level} {semester} {academic_year}"
+
+
+def cohorts_of(students):
+    """Cohorts present in a Student queryset, with their sizes; one grouped query"""
+    return list(
+        students.values('course_id', 'course__name', 'year_level', 'semester', 'academic_year')
+        .annotate(students=Count('pk'))
+        .order_by('course__name', 'year_level', 'academic_year', 'semester')
+    )
+
+
+def _rollover_cohort(cohort_students, report, batch_size):
+    now = timezone.now()
+    student_ids = list(cohort_students.values_list('pk', flat=True))
+
+    # Graded subjects of the finished term are complete
+    report.grades_done = Grade.objects.filter(
+        student__in=cohort_students.values('pk'),
+        semester=report.semester,
+        academic_year=report.academic_year,
+        grade_value__isnull=False,
+    ).exclude(status='Done').update(status='Done', updated_at=now)
+
+    if report.target == GRADUATED:
+        report.graduated = cohort_students.update(
+            student_status='Graduated', updated_at=now
+        )
+        return
+
+    year_level, semester, academic_year = report.target
+    report.promoted = cohort_students.update(
+        year_level=year_level, semester=semester, academic_year=academic_year, updated_at=now
+    )
+
+    # The next term's curriculum, skipping subjects a student is already enrolled in for that term
+    order = semester_order(semester)
+    subject_ids = list(Subject.objects.filter(
+        course_id=report.course_id, year_level=year_level, semester_order=order
+    ).values_list('pk', flat=True))
+    if not subject_ids:
+        return
+    existing = set(Grade.objects.filter(
+        student_id__in=student_ids, subject_id__in=subject_ids, semester=semester, academic_year=academic_year
+    ).values_list('student_id', 'subject_id'))
+    # bulk_create skips Grade.save(), so set what it would derive
+    new_grades = [
+        Grade(student_id=student_id, subject_id=subject_id, semester=semester, semester_order=order,
+              academic_year=academic_year, year_level=year_level, status='Currently Taking', is_active=True)
+        for student_id in student_ids
+        for subject_id in subject_ids
+        if (student_id, subject_id) not in existing
+    ]
+    Grade.objects.bulk_create(new_grades, batch_size=batch_size, ignore_conflicts=True)
+    report.grades_created = len(new_grades)
+
+
+def rollover_students(students, dry_run=False, statuses=ROLLOVER_STATUSES, batch_size=1000):
+    """
+    Advance every cohort of the given students (restricted to the given student_status values)
+    to its next term, one transaction per cohort. With dry_run=True the same statements run and
+    are rolled back, so the report counts exactly what a real run would change.
+    Returns a list of CohortReport.
+    """
+    from .analytics import bump_grade_version
+    from .kpis import invalidate_grade_kpis, invalidate_student_kpis
+
+    students = students.filter(student_status__in=statuses, course__isnull=False)
+    reports = []
+    for cohort in cohorts_of(students):
+        report = CohortReport(cohort['course_id'], cohort['course__name'], cohort['year_level'],
+                              cohort['semester'], cohort['academic_year'], cohort['students'])
+        reports.append(report)
+        report.target = next_term(report.year_level, report.semester, report.academic_year)
+        if report.target is None:
+            report.skipped = 'no year level, or unknown semester or academic year format'
+            continue
+
+        cohort_students = students.filter(
+            course_id=report.course_id, year_level=report.year_level,
+            semester=report.semester, academic_year=report.academic_year,
+        )
+        with transaction.atomic():
+            _rollover_cohort(cohort_students, report, batch_size)
+            if dry_run:
+                transaction.set_rollback(True)
+            else:
+                transaction.on_commit(invalidate_student_kpis)
+                transaction.on_commit(invalidate_grade_kpis)
+                transaction.on_commit(bump_grade_version)
+        logging.info(
+            "%sRolled over %s %s -> %s: %s promoted, %s graduated, %s grades done, %s grades created",
+            'Dry run: ' if dry_run else '', report.course_name, report.source_label, report.target_label,
+            report.promoted, report.graduated, report.grades_done, report.grades_created,
+        )
+    return reports
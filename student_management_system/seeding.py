@@ -0,0 +1,308 @@
+"""
+Deterministic synthetic datasets for benchmarks and load tests.
+
+Departments and courses come from the catalog the staff boards filter on, so
+every board and roster has data. Users, subjects, professors and students are
+written with bulk_create in batches, and grades with batched executemany INSERTs
+(Grade rows are the bulk of a dataset and bulk_create spends most of its time
+preparing field values). Neither path calls save() or sends signals, so the
+fields those would derive (semester_order, status, the professor link) are set
+here. The same sizes and seed always produce the same rows.
+"""
+import logging
+import random
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import User, Staff, Department, Course, Professor, Subject, Student, Grade, semester_order
+
+# Department -> courses, as named by the staff boards and rosters
+CATALOG = {
+    'College of Computer Studies': [
+        'Bachelor of Science in Computer Science',
+        'Bachelor of Science in Computer Engineering',
+        'Bachelor of Science in Information Technology',
+    ],
+    'College of Hotel and Restaurant Management': [
+        'Bachelor of Science in Hospitality Management',
+        'Associate in Hospitality Management',
+    ],
+    'College of Business Administration': [
+        'Bachelor of Science in Business Administration HDRM',
+        'Bachelor of Science in Business Administration Marketing',
+        'Bachelor of Science in Accountancy',
+    ],
+    'College of Education': [
+        'Bachelor of Elementary Education',
+        'Bachelor of Secondary Education Specialization Science',
+        'Bachelor of Secondary Education Specialization English',
+        'Bachelor of Secondary Education Specialization Filipino',
+        'Bachelor of Secondary Education Specialization Mathematics',
+        'Bachelor of Secondary Education Specialization Social Studies',
+    ],
+}
+CURRENT_ACADEMIC_YEAR_START = 2025
+# (year_level, semester) of the eight terms of a curriculum, in order
+TERMS = [(year_level, semester) for year_level in (1, 2, 3, 4) for semester in ('1st', '2nd')]
+# Passing grades and how often they are given; the rest of a term's graded subjects fail with 5.00
+GRADE_WEIGHTS = {
+    '1.00': 4, '1.25': 8, '1.50': 13, '1.75': 16, '2.00': 17,
+    '2.25': 14, '2.50': 11, '2.75': 7, '3.00': 4, '5.00': 6,
+}
+DROP_RATE = 0.02
+# Share of the students in each department, split evenly between its courses
+ENROLMENT_WEIGHTS = {
+    'College of Computer Studies': 35,
+    'College of Hotel and Restaurant Management': 15,
+    'College of Business Administration': 30,
+    'College of Education': 20,
+}
+# How many students are in each term of TERMS: each year level loses some to dropping out
+TERM_WEIGHTS = [16, 15, 14, 13, 12, 11, 10, 9]
+STATUS_WEIGHTS = {'Enrolled': 85, 'Pending': 7, 'Dropped': 5, 'Graduated': 3}
+FIRST_NAMES = ['Juan', 'Maria', 'Jose', 'Ana', 'Mark', 'Angel', 'John', 'Kristine', 'Paolo', 'Nicole',
+               'Carlo', 'Bea', 'Miguel', 'Camille', 'Rafael', 'Andrea', 'Luis', 'Patricia', 'Gabriel', 'Joy']
+LAST_NAMES = ['Santos', 'Reyes', 'Cruz', 'Bautista', 'Ocampo', 'Garcia', 'Mendoza', 'Torres', 'Tomas',
+              'Andrada', 'Castillo', 'Flores', 'Villanueva', 'Ramos', 'Aquino', 'Navarro', 'Dela Cruz', 'Lopez']
+
+
+def academic_year(start):
+    return f'{start}-{start + 1}'
+
+
+def course_code(name):
+    return ''.join(word[0] for word in name.split() if word[0].isupper())
+
+
+def _weighted(rng, weights, count):
+    return rng.choices(list(weights), cum_weights=list(accumulate(weights.values())), k=count)
+
+
+def course_weights(courses):
+    """Course -> weight, from ENROLMENT_WEIGHTS"""
+    per_department = {}
+    for course in courses:
+        per_department.setdefault(course.department_name_id, []).append(course)
+    names = dict(Department.objects.filter(pk__in=per_department).values_list('pk', 'name'))
+    return {
+        course: ENROLMENT_WEIGHTS.get(names[department_id], 1) / len(department_courses)
+        for department_id, department_courses in per_department.items()
+        for course in department_courses
+    }
+
+
+def seed_catalog():
+    """The departments and courses of CATALOG (get_or_create, so re-seeding reuses them); returns the courses"""
+    courses = []
+    for department_name, course_names in CATALOG.items():
+        department, _ = Department.objects.get_or_create(name=department_name)
+        for name in course_names:
+            course = Course.objects.filter(name=name).first()
+            if course is None:
+                course = Course.objects.create(course_id=course_code(name), name=name, credits='150',
+                                               department_name=department)
+            courses.append(course)
+    return courses
+
+
+def _bulk_create(model, objects, batch_size, key):
+    """bulk_create, then read the primary keys back by a unique key on backends that do not return them"""
+    model.objects.bulk_create(objects, batch_size=batch_size)
+    missing = [obj for obj in objects if obj.pk is None]
+    if missing:
+        pks = {}
+        values = [getattr(obj, key) for obj in missing]
+        for start in range(0, len(values), batch_size):
+            pks.update(model.objects.filter(**{f'{key}__in': values[start:start + batch_size]}).values_list(key, 'pk'))
+        for obj in missing:
+            obj.pk = pks[getattr(obj, key)]
+    return objects
+
+
+def insert_rows(model, fields, rows, batch_size):
+    """
+    INSERT the given tuples of database-ready values (one per field) with executemany, batch_size
+    rows per call; returns how many. Much faster than bulk_create for millions of narrow rows.
+    """
+    columns = [model._meta.get_field(field).column for field in fields]
+    sql = (f"INSERT INTO {connection.ops.quote_name(model._meta.db_table)} "
+           f"({', '.join(map(connection.ops.quote_name, columns))}) VALUES ({', '.join(['%s'] * len(columns))})")
+    count = 0
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            cursor.executemany(sql, batch)
+            count += len(batch)
+    return count
+
+
+def seed_users(usernames, emails, role, password, batch_size):
+    """
+    One active user per username. Every user shares one password hash (hashing per user would
+    take longer than the rest of the dataset); without a password the accounts cannot log in.
+    """
+    password_hash = make_password(password)
+    now = timezone.now()
+    users = [
+        User(username=username, email=email, password=password_hash, role=role, date_joined=now)
+        for username, email in zip(usernames, emails)
+    ]
+    return _bulk_create(User, users, batch_size, 'username')
+
+
+def seed_staff(count, password, prefix, batch_size):
+    """count staff accounts with their Staff profiles"""
+    usernames = [f'{prefix.lower()}-staff-{index:04d}' for index in range(count)]
+    users = seed_users(usernames, [f'{username}@example.com' for username in usernames], User.Role.STAFF,
+                       password, batch_size)
+    Staff.objects.bulk_create([Staff(user=user) for user in users], batch_size=batch_size)
+    return users
+
+
+def seed_subjects(courses, count, rng, prefix, batch_size):
+    """count subjects spread evenly over the courses and their eight terms, each with a professor"""
+    professor_names = [f'Prof. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {prefix}{index}'
+                       for index in range(max(count // 6, 1))]
+    professors = _bulk_create(Professor, [Professor(name=name) for name in professor_names], batch_size, 'name')
+
+    subjects = []
+    for index in range(count):
+        course = courses[index % len(courses)]
+        year_level, semester = TERMS[(index // len(courses)) % len(TERMS)]
+        professor = professors[rng.randrange(len(professors))]
+        code = f'{course_code(course.name)[:4]}{index % 1000:03d}'
+        subjects.append(Subject(
+            subject_id=f'{prefix}-{index:06d}',
+            subject_name=f'{course_code(course.name)} Subject {index}',
+            subject_code=code[:10],
+            credits=rng.choice((2, 3, 3, 3, 4, 5)),
+            department_name_id=course.department_name_id,
+            semester_offered=semester,
+            semester_order=semester_order(semester),
+            professor_name=professor.name,
+            professor=professor,
+            year_level=year_level,
+            lecture_hour=rng.choice((2, 3)),
+            laboratory_hour=rng.choice((0, 0, 3)),
+            course_id=course,
+        ))
+    return _bulk_create(Subject, subjects, batch_size, 'subject_id')
+
+
+def curricula(subjects):
+    """Course pk -> one list of subjects per term of TERMS"""
+    by_course = {}
+    for subject in sorted(subjects, key=lambda subject: subject.pk):
+        terms = by_course.setdefault(subject.course_id_id, [[] for _ in TERMS])
+        terms[TERMS.index((subject.year_level, subject.semester_offered))].append(subject)
+    return by_course
+
+
+def seed_students(courses, by_course, count, grades, rng, prefix, batch_size, users=False, password=None):
+    """
+    count students, about grades/count grades each on average. A student's current term is drawn
+    by TERM_WEIGHTS; in it and in every earlier term they take about the same number of subjects
+    (the first ones of their course's curriculum), sized so the average holds. The current term is ungraded;
+    earlier terms are graded, in earlier academic years. Courses are drawn by ENROLMENT_WEIGHTS.
+    With users=True each student gets a student account named after their student number.
+    """
+    terms_taken = sum((term + 1) * weight for term, weight in enumerate(TERM_WEIGHTS)) / sum(TERM_WEIGHTS)
+    per_term = grades / count / terms_taken if count else 0
+    students, histories = [], []
+    statuses = _weighted(rng, STATUS_WEIGHTS, count)
+    enrolled_in = _weighted(rng, course_weights(courses), count)
+    for index in range(count):
+        course = enrolled_in[index]
+        terms = by_course.get(course.pk, [[] for _ in TERMS])
+        offered = {term: weight for term, weight in enumerate(TERM_WEIGHTS) if terms[term]}
+        history = []
+        term_index = 0
+        if offered:
+            term_index = _weighted(rng, offered, 1)[0]
+            for term in range(term_index + 1):
+                taken = int(per_term * rng.uniform(0.8, 1.2) + rng.random())
+                history.extend(terms[term][:max(taken, 1)])
+        year_level, semester = TERMS[term_index]
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        students.append(Student(
+            student_number=f'{prefix}-{index:07d}',
+            first_name=first_name,
+            middle_Name=rng.choice(LAST_NAMES),
+            last_name=last_name,
+            email=f'{first_name}.{last_name}.{prefix}{index}@example.com'.lower().replace(' ', ''),
+            gender=rng.choice(('male', 'female')),
+            year_level=year_level,
+            semester=semester,
+            academic_year=academic_year(CURRENT_ACADEMIC_YEAR_START),
+            course=course,
+            department_name_id=course.department_name_id,
+            student_type=rng.choice(('new', 'old', 'old', 'transferee')),
+            student_status=statuses[index],
+            is_verified=True,
+        ))
+        histories.append((history, term_index))
+    if users:
+        accounts = seed_users([student.student_number.lower() for student in students],
+                              [student.email for student in students], User.Role.STUDENT, password, batch_size)
+        for student, account in zip(students, accounts):
+            student.user_id = account.pk
+    _bulk_create(Student, students, batch_size, 'student_number')
+    return students, histories
+
+
+def seed_grades(students, histories, rng, batch_size):
+    """The grade rows of every student's history, inserted batch by batch; returns how many"""
+    fields = ('student', 'subject', 'grade_value', 'semester', 'semester_order', 'academic_year', 'year_level',
+              'is_active', 'status', 'created_at', 'updated_at')
+    grade_value = Grade._meta.get_field('grade_value')
+    values = [grade_value.get_db_prep_save(value, connection) for value in _weighted(rng, GRADE_WEIGHTS, 4096)]
+    now = Grade._meta.get_field('created_at').get_db_prep_save(timezone.now(), connection)
+    created = 0
+    batch = []
+    for student, (history, current_term) in zip(students, histories):
+        current_start = CURRENT_ACADEMIC_YEAR_START - current_term // 2
+        for subject in history:
+            term = TERMS.index((subject.year_level, subject.semester_offered))
+            current = term == current_term
+            dropped = not current and rng.random() < DROP_RATE
+            value = None if current or dropped else values[rng.randrange(len(values))]
+            batch.append((
+                student.pk, subject.pk, value, subject.semester_offered, subject.semester_order,
+                academic_year(current_start + term // 2), subject.year_level, True,
+                'Drop' if dropped else ('Done' if value is not None else 'Currently Taking'), now, now,
+            ))
+            if len(batch) >= batch_size:
+                created += insert_rows(Grade, fields, batch, batch_size)
+                batch = []
+    return created + insert_rows(Grade, fields, batch, batch_size)
+
+
+def seed_dataset(students=10000, subjects=1500, grades=400000, seed=0, batch_size=5000, users=False, staff=0,
+                 password=None):
+    """
+    Seed a synthetic dataset of the given sizes (grades is a target; each student's history
+    is capped by their curriculum), in one transaction. users=True gives every student an
+    account; staff is the number of staff accounts; password is the password of all of them.
+    Returns {'departments', 'courses', 'subjects', 'students', 'users', 'grades'}.
+    """
+    rng = random.Random(seed)
+    prefix = f'SEED{seed}'
+    with transaction.atomic():
+        courses = seed_catalog()
+        staff_rows = seed_staff(staff, password, prefix, batch_size) if staff else []
+        subject_rows = seed_subjects(courses, subjects, rng, prefix, batch_size)
+        student_rows, histories = seed_students(courses, curricula(subject_rows), students, grades, rng, prefix,
+                                                batch_size, users=users, password=password)
+        grade_count = seed_grades(student_rows, histories, rng, batch_size)
+    logging.info("Seeded %s subjects, %s students and %s grades", len(subject_rows), len(student_rows), grade_count)
+    return {
+        'departments': len(CATALOG),
+        'courses': len(courses),
+        'subjects': len(subject_rows),
+        'students': len(student_rows),
+        'users': len(staff_rows) + (len(student_rows) if users else 0),
+        'grades': grade_count,
+    }
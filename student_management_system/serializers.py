@@ -0,0 +1,109 @@
+from rest_framework import serializers
+
+from .models import Student, Course, Subject, Grade, GradeArchive, ClassRanking, GradeAuditEntry
+
+
+class SparseFieldsetsMixin:
+    """
+    Serializer mixin for sparse fieldsets: ?fields=id,first_name only returns the listed fields.
+    Unknown field names are ignored.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None:
+            return
+        requested = request.query_params.get('fields')
+        if not requested:
+            return
+        keep = {name.strip() for name in requested.split(',') if name.strip()}
+        for name in set(self.fields) - keep:
+            self.fields.pop(name)
+
+
+class StudentSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    course = serializers.IntegerField(source='course_id', read_only=True)
+    course_name = serializers.CharField(source='course.name', read_only=True, default=None)
+    department = serializers.CharField(source='department_name.name', read_only=True, default=None)
+
+    class Meta:
+        model = Student
+        fields = [
+            'id', 'student_number', 'first_name', 'middle_Name', 'last_name', 'email', 'gender',
+            'year_level', 'semester', 'academic_year', 'student_status', 'student_type',
+            'course', 'course_name', 'department',
+        ]
+
+
+class CourseSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    department = serializers.CharField(source='department_name.name', read_only=True, default=None)
+
+    class Meta:
+        model = Course
+        fields = ['id', 'course_id', 'name', 'credits', 'department']
+
+
+class SubjectSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    course = serializers.IntegerField(source='course_id_id', read_only=True)
+    department = serializers.CharField(source='department_name.name', read_only=True, default=None)
+    professor = serializers.IntegerField(source='professor_id', read_only=True)
+
+    class Meta:
+        model = Subject
+        fields = [
+            'id', 'subject_id', 'subject_name', 'subject_code', 'credits', 'year_level',
+            'semester_offered', 'semester_order', 'lecture_hour', 'laboratory_hour',
+            'professor', 'professor_name', 'course', 'department',
+        ]
+
+
+class GradeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    student = serializers.IntegerField(source='student_id', read_only=True)
+    subject = serializers.IntegerField(source='subject_id', read_only=True)
+    subject_code = serializers.CharField(source='subject.subject_code', read_only=True)
+    subject_name = serializers.CharField(source='subject.subject_name', read_only=True)
+    credits = serializers.IntegerField(source='subject.credits', read_only=True)
+    archived = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Grade
+        fields = [
+            'id', 'student', 'subject', 'subject_code', 'subject_name', 'credits', 'grade_value',
+            'year_level', 'semester', 'semester_order', 'academic_year', 'status', 'is_active', 'updated_at',
+            'archived',
+        ]
+
+    def get_archived(self, grade):
+        return isinstance(grade, GradeArchive)
+
+
+class ClassRankingSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    student = serializers.IntegerField(source='student_id', read_only=True)
+    course = serializers.IntegerField(source='course_id', read_only=True)
+    student_name = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ClassRanking
+        fields = [
+            'id', 'student', 'student_name', 'course', 'year_level', 'semester_order', 'academic_year',
+            'rank', 'cohort_size', 'gwa', 'credits', 'failed_credits', 'standing', 'updated_at',
+        ]
+
+    def get_student_name(self, ranking):
+        return f"{ranking.student.first_name} {ranking.student.last_name}".strip()
+
+
+class GradeAuditEntrySerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    grade = serializers.IntegerField(source='grade_id', read_only=True)
+    student = serializers.IntegerField(source='student_id', read_only=True)
+    subject = serializers.IntegerField(source='subject_id', read_only=True)
+    action = serializers.CharField(source='get_action_display', read_only=True)
+    actor = serializers.IntegerField(source='actor_id', read_only=True)
+    actor_username = serializers.CharField(source='actor.username', read_only=True, default=None)
+
+    class Meta:
+        model = GradeAuditEntry
+        fields = [
+            'id', 'grade', 'student', 'subject', 'academic_year', 'semester_order', 'action',
+            'old_value', 'new_value', 'changes', 'actor', 'actor_username', 'recorded_at',
+        ]
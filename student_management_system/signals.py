@@ -1,10 +1,13 @@
-from django.db.models.signals import post_save, pre_delete, pre_save
+from functools import partial
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 from django.core.files.storage import default_storage
 import os
 import logging
-from .models import Student, Subject, Grade
+from .models import Student, Subject, Grade, Course, Department
+from .events import grade_event_data, publish_grade_event
 
 @receiver(post_save, sender=Student)
 def assign_subjects_on_course_change(sender, instance, created, **kwargs):
@@ -53,15 +56,15 @@ def delete_file(file_field):
     if file_field and default_storage.exists(file_field.name):
         try:
             default_storage.delete(file_field.name)
-            logging.info(f"Deleted file: {file_field.name}")
+            logging.info("Deleted file: %s", file_field.name)
         except Exception as e:
-            logging.error(f"Error deleting file {file_field.name}: {str(e)}")
+            logging.error("Error deleting file %s: %s", file_field.name, e)
     else:
-        logging.info(f"File not found or already deleted: {file_field.name if file_field else 'None'}")
+        logging.info("File not found or already deleted: %s", file_field.name if file_field else 'None')
 
 @receiver(pre_delete, sender=Student)
 def delete_student_files(sender, instance, **kwargs):
-    logging.info(f"Pre-delete signal triggered for Student id={instance.id}")
+    logging.info("Pre-delete signal triggered for Student id=%s", instance.id)
     """Delete all files associated with the Student instance when it is deleted."""
     delete_file(instance.f137)
     delete_file(instance.psa_photocopy)
@@ -74,7 +77,7 @@ def delete_student_files(sender, instance, **kwargs):
 
 @receiver(pre_save, sender=Student)
 def delete_old_files_on_update(sender, instance, **kwargs):
-    logging.info(f"Pre-save signal triggered for Student id={instance.id if instance.id else 'new instance'}")
+    logging.info("Pre-save signal triggered for Student id=%s", instance.id if instance.id else 'new instance')
     """
     Delete old files from storage when a file field is updated with a new file or set to None.
     """
@@ -103,3 +106,86 @@ def delete_old_files_on_update(sender, instance, **kwargs):
         new_file = getattr(instance, field)
         if old_file and old_file != new_file:
             delete_file(old_file)
+
+@receiver(post_save, sender=Grade)
+def publish_grade_saved(sender, instance, created, **kwargs):
+    """
+    Push grade changes to the SSE streams of the student and the subject once the transaction commits.
+    A new grade row is an enrollment; later saves carry the grade value, status and is_active flag.
+    """
+    data = grade_event_data(instance)
+    if created:
+        data['action'] = 'added'
+        transaction.on_commit(partial(publish_grade_event, 'enrollment', data))
+    else:
+        transaction.on_commit(partial(publish_grade_event, 'grade', data))
+
+@receiver(post_delete, sender=Grade)
+def publish_grade_deleted(sender, instance, **kwargs):
+    data = grade_event_data(instance)
+    data['action'] = 'deleted'
+    transaction.on_commit(partial(publish_grade_event, 'enrollment', data))
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def mark_ranking_cohort_stale(sender, instance, **kwargs):
+    """
+    Queue the grade's cohort for the next incremental compute_rankings run. Marked after
+    commit, when a cascade that deleted the student (or their course) has nothing left to mark.
+    """
+    from .rankings import mark_grade_cohort_stale
+    transaction.on_commit(partial(
+        mark_grade_cohort_stale, instance.student_id, instance.year_level, instance.semester_order, instance.academic_year
+    ))
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def bump_analytics_version(sender, instance, **kwargs):
+    """Invalidate the cached grade distributions once the change commits"""
+    from .analytics import bump_grade_version
+    transaction.on_commit(bump_grade_version)
+
+def grades_updated_in_bulk(student):
+    """
+    Run the Grade change hooks for the student's current-term grades after a queryset
+    update, which sends no signals: re-rank their cohort and invalidate the analytics.
+    """
+    from .analytics import bump_grade_version
+    from .kpis import invalidate_grade_kpis
+    from .rankings import mark_student_term_stale
+    transaction.on_commit(partial(mark_student_term_stale, student))
+    transaction.on_commit(bump_grade_version)
+    transaction.on_commit(invalidate_grade_kpis)
+
+@receiver(post_save, sender=Grade)
+@receiver(post_delete, sender=Grade)
+def invalidate_grade_kpis_on_change(sender, instance, **kwargs):
+    from .kpis import invalidate_grade_kpis
+    transaction.on_commit(invalidate_grade_kpis)
+
+@receiver(post_save, sender=Student)
+@receiver(post_delete, sender=Student)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def invalidate_student_kpis_on_change(sender, instance, **kwargs):
+    """Drop the cached enrollment KPIs once a student (or a course or department label) change commits"""
+    from .kpis import invalidate_student_kpis
+    transaction.on_commit(invalidate_student_kpis)
+
+@receiver(pre_save, sender=Grade)
+def remember_grade_before_save(sender, instance, **kwargs):
+    from .audit import remember_loaded_values
+    remember_loaded_values(instance)
+
+@receiver(post_save, sender=Grade)
+def audit_grade_saved(sender, instance, created, **kwargs):
+    """Buffer an audit entry of the change; it is written in a batch after the transaction commits"""
+    from .audit import record_save
+    record_save(instance, created)
+
+@receiver(post_delete, sender=Grade)
+def audit_grade_deleted(sender, instance, **kwargs):
+    from .audit import record_delete
+    record_delete(instance)
@@ -0,0 +1,61 @@
+// Patches grade rows in place from the Server-Sent Events stream instead of reloading the page.
+// Include with data-stream-url="<events url>" and data-columns='{"grade_value": 2, ...}',
+// mapping event fields to the 1-based cell index of rows marked with data-student-id / data-subject-id.
+(function () {
+    const script = document.currentScript;
+    const streamUrl = script.dataset.streamUrl;
+    const columns = JSON.parse(script.dataset.columns || '{}');
+    if (!streamUrl || !window.EventSource) {
+        return;
+    }
+
+    function findRow(data) {
+        return document.querySelector(`tr[data-student-id="${data.student_id}"][data-subject-id="${data.subject_id}"]`);
+    }
+
+    function patchRow(row, data) {
+        Object.entries(columns).forEach(function ([field, index]) {
+            const cell = row.querySelector(`td:nth-child(${index})`);
+            if (cell) {
+                const value = data[field];
+                cell.textContent = value === null || value === undefined || value === '' ? '-' : value;
+            }
+        });
+        row.classList.toggle('text-muted', data.is_active === false);
+    }
+
+    function showReloadNotice() {
+        if (document.getElementById('live-grades-notice')) {
+            return;
+        }
+        const notice = document.createElement('div');
+        notice.id = 'live-grades-notice';
+        notice.className = 'alert alert-info alert-dismissible fade show position-fixed bottom-0 end-0 m-3';
+        notice.setAttribute('role', 'alert');
+        notice.innerHTML = 'Subjects were added or removed. <a href="" class="alert-link">Reload</a> to see them.' +
+            '<button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>';
+        document.body.appendChild(notice);
+    }
+
+    const source = new EventSource(streamUrl);
+
+    source.addEventListener('grade', function (event) {
+        const data = JSON.parse(event.data);
+        const row = findRow(data);
+        if (row) {
+            patchRow(row, data);
+        }
+    });
+
+    source.addEventListener('enrollment', function (event) {
+        const data = JSON.parse(event.data);
+        const row = findRow(data);
+        if (data.action === 'deleted' && row) {
+            patchRow(row, {student_id: data.student_id, subject_id: data.subject_id, is_active: true});
+        } else if (!row) {
+            showReloadNotice();
+        } else {
+            patchRow(row, data);
+        }
+    });
+})();
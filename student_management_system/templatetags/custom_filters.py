@@ -18,9 +18,9 @@ def getattr_filter(obj, attr_name):
 
 @register.filter
 def split(value, delimiter=" "):
-
+    """
     Usage: {{ value|split:"delimiter" }}
-    
+    """
     if not isinstance(value, str):
         return value
     return value.split(delimiter)
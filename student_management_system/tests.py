@@ -1,10 +1,86 @@
-from django.test import TestCase, override_settings
-from rest_framework.test import APIClient
-from rest_framework import status
-from django.urls import reverse
-from .models import EmailVerificationCode
 import datetime
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import F
+from django.db.utils import ConnectionHandler, OperationalError
+from django.test import Client, TestCase, override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, reverse
 from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from .analytics import grade_distribution
+from .archive import archivable_grades, archive_grades, closed_academic_years
+from .audit import AuditBuffer, buffer, grade_history
+from .db.pool import ConnectionPool, pools
+from .events import EventBroker
+from .forms import GradeForm, SubjectForm
+from .gpa import GradeArrays, compute_gpa, student_gpa
+from .kpis import enrollment_kpis
+from .logs import JsonFormatter, QueueHandler, current_request_id
+from .management.commands.benchmark_views import benchmark_users, build_scenarios, compare_results
+from .metrics import registry, render, write_snapshot
+from .middleware import PROFILE_SESSION_KEY
+from .models import (
+    ClassRanking, Course, Department, EmailVerificationCode, Grade, GradeArchive, GradeAuditEntry, Professor,
+    StaleRankingCohort, Staff, Student, Subject, User,
+)
+from .profiling import RequestProfile, fingerprint, profile_queries
+from .rankings import current_ranking, recompute_all_rankings, recompute_stale_rankings
+from .replicas import read_from_replica
+from .rollover import GRADUATED, next_term, rollover_students
+from .seeding import seed_dataset
+from .transcripts import TranscriptLoader, transcript_dict
+
+
+def create_admin():
+    return User.objects.create_superuser('admin1', 'admin1@example.com', 'pass12345')
+
+
+def create_student_user():
+    return User.objects.create_user('student1', 'student1@example.com', 'pass12345')
+
+
+def create_staff_user():
+    user = User.objects.create_user('staff1', 'staff1@example.com', 'pass12345', role=User.Role.STAFF)
+    Staff.objects.create(user=user)
+    return user
+
+
+class CatalogFixture:
+    """A department and a course in setUp, and students and subjects of them"""
+    def setUp(self):
+        super().setUp()
+        self.department = Department.objects.create(name='College of Computer Studies')
+        self.course = Course.objects.create(course_id='BSIT', name='Bachelor of Science in Information Technology',
+                                            credits='150', department_name=self.department)
+
+    def create_student(self, **fields):
+        return Student.objects.create(**{'course': self.course, 'department_name': self.department, **fields})
+
+    def create_subject(self, subject_id='IT101', **fields):
+        defaults = {'subject_name': 'Programming 1', 'subject_code': subject_id, 'credits': 3,
+                    'department_name': self.department, 'semester_offered': '1st', 'professor_name': 'Prof',
+                    'year_level': 1, 'course_id': self.course}
+        return Subject.objects.create(subject_id=subject_id, **{**defaults, **fields})
+
 
 class EmailVerificationTests(TestCase):
     def setUp(self):
@@ -86,3 +162,1448 @@ class EmailVerificationTests(TestCase):
         
         self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
         self.assertEqual(response.data['error'], 'No verification request found for this email')
+
+
+class RoleMiddlewareTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student_user = create_student_user()
+        self.student = self.create_student(user=self.student_user, email='student1@example.com')
+        self.staff_user = create_staff_user()
+
+    def test_student_profile_resolved_once(self):
+        """request.student is the student's profile and is cached by pk in the session"""
+        self.client.force_login(self.student_user)
+        response = self.client.get(reverse('student_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['student'].pk, self.student.pk)
+        self.assertEqual(self.client.session[PROFILE_SESSION_KEY]['student_id'], self.student.pk)
+
+    def test_role_decorators_use_request_role(self):
+        """Staff users are rejected from student pages and students from staff pages"""
+        self.client.force_login(self.staff_user)
+        self.assertEqual(self.client.get(reverse('student_dashboard')).status_code, 403)
+        self.client.force_login(self.student_user)
+        self.assertEqual(self.client.get(reverse('staff_dashboard')).status_code, 403)
+
+
+class UsernameOrEmailBackendTests(TestCase):
+    def setUp(self):
+        self.staff_user = create_staff_user()
+
+    def test_login_with_username_or_email(self):
+        """Both the username and the email authenticate, including for staff"""
+        self.assertEqual(authenticate(username='staff1', password='pass12345'), self.staff_user)
+        self.assertEqual(authenticate(username='STAFF1@example.com', password='pass12345'), self.staff_user)
+        self.assertIsNone(authenticate(username='staff1@example.com', password='wrong'))
+
+    def test_single_user_query(self):
+        """The user is resolved with one query whether or not the login succeeds"""
+        with self.assertNumQueries(1):
+            authenticate(username='staff1@example.com', password='pass12345')
+        with self.assertNumQueries(1):
+            authenticate(username='nobody@example.com', password='pass12345')
+
+    def test_login_view_accepts_email(self):
+        response = self.client.post(reverse('login'), {'username': 'staff1@example.com', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('staff_dashboard'), fetch_redirect_response=False)
+
+
+class ProfessorTests(CatalogFixture, TestCase):
+    def test_subject_links_professor_by_name(self):
+        """Subjects sharing a professor_name share one Professor row"""
+        first = self.create_subject('CS101-1', subject_code='CS101', professor_name='Ada Lovelace')
+        second = self.create_subject('CS101-2', subject_code='CS101', professor_name='Ada Lovelace ')
+        self.assertIsNotNone(first.professor)
+        self.assertEqual(first.professor, second.professor)
+        self.assertEqual(list(first.professor.subjects.order_by('id')), [first, second])
+
+        first.professor_name = 'Alan Turing'
+        first.save()
+        self.assertEqual(first.professor.name, 'Alan Turing')
+
+
+class TermOrderingTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = create_admin()
+        self.student_user = create_student_user()
+        self.student = self.create_student(user=self.student_user, email='student1@example.com', year_level=1,
+                                           semester='1st', academic_year='2025')
+        for index, (year_level, semester) in enumerate([(2, '2nd'), (1, '2nd'), (2, '1st'), (1, '1st')]):
+            subject = self.create_subject(f'IT{index}', subject_name=f'Subject {index}', semester_offered=semester,
+                                          year_level=year_level)
+            Grade.objects.get_or_create(student=self.student, subject=subject, semester=semester,
+                                        academic_year='2025', defaults={'year_level': year_level})
+
+    def test_semester_order_is_set_on_save(self):
+        self.assertEqual(sorted(set(Grade.objects.values_list('semester', 'semester_order'))), [('1st', 1), ('2nd', 2)])
+
+    def test_student_record_groups_in_term_order(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('student_record', args=[self.student.pk]))
+        self.assertEqual(response.status_code, 200)
+        grouped = response.context['grouped_grades']
+        self.assertEqual(list(grouped), [1, 2])
+        self.assertEqual([list(semesters) for semesters in grouped.values()], [['1st', '2nd'], ['1st', '2nd']])
+
+    def test_sms_grade_groups_in_term_order(self):
+        self.client.force_login(self.student_user)
+        response = self.client.get(reverse('SMS_grade'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['grouped_grades'][1]), ['1st', '2nd'])
+
+
+class GradeFormTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.create_student(year_level=1, semester='1st', academic_year='2025')
+        self.grade = Grade.objects.create(student=self.student, subject=self.create_subject(), semester='1st',
+                                          academic_year='2025', year_level=1)
+
+    def test_grade_form_saves_year_level_as_number_or_none(self):
+        for value, expected in (('2', 2), ('', None)):
+            data = {'student': self.student.pk, 'subject': self.grade.subject_id, 'grade_value': '1.50',
+                    'year_level': value}
+            form = GradeForm(data, instance=self.grade)
+            self.assertTrue(form.is_valid(), form.errors)
+            form.save()
+            self.grade.refresh_from_db()
+            self.assertEqual(self.grade.year_level, expected)
+
+    def test_grade_form_rejects_grades_off_the_scale(self):
+        for grade_value, valid in (('85', False), ('0.75', False), ('5.00', True), ('1.00', True)):
+            data = {'student': self.student.pk, 'subject': self.grade.subject_id, 'grade_value': grade_value}
+            self.assertEqual(GradeForm(data, instance=self.grade).is_valid(), valid, grade_value)
+
+    def test_subject_form_cleans_year_level_to_number(self):
+        self.assertEqual(SubjectForm().fields['year_level'].clean('3'), 3)
+
+
+class ReadApiTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            self.create_student(first_name=f'Student{index}', year_level=1, student_status='Enrolled')
+        self.admin = create_admin()
+        self.client = APIClient()
+
+    def test_requires_admin_or_staff(self):
+        self.assertEqual(self.client.get('/api/v1/students/').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_students_cursor_pagination_and_sparse_fields(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/v1/students/', {'page_size': 2, 'fields': 'id,first_name,course_name'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(set(response.data['results'][0]), {'id', 'first_name', 'course_name'})
+        self.assertEqual(response.data['results'][0]['course_name'], self.course.name)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_students_query_budget(self):
+        """The list costs one query per page however many rows it returns"""
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            self.client.get('/api/v1/students/')
+
+    def test_invalid_filter_value(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/v1/students/', {'year_level': 'first'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_roster_of_unknown_subject(self):
+        self.client.force_authenticate(self.admin)
+        self.assertEqual(self.client.get('/api/v1/subjects/abc/roster/').status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(self.client.get('/api/v1/subjects/999/roster/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class BatchTranscriptTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        # Students are created before the subjects so the enrollment signal assigns nothing
+        self.students = [
+            self.create_student(first_name=f'Student{index}', year_level=1, student_status='Enrolled')
+            for index in range(6)
+        ]
+        self.subjects = [
+            self.create_subject(f'IT{index}', subject_name=f'Subject {index}', semester_offered=semester)
+            for index, semester in enumerate(['2nd', '1st'])
+        ]
+        for student in self.students:
+            for subject in self.subjects:
+                Grade.objects.create(student=student, subject=subject, semester=subject.semester_offered,
+                                     academic_year='2025', year_level=1, grade_value='1.50')
+        self.admin = create_admin()
+        self.client.force_login(self.admin)
+
+    def _transcripts(self, response):
+        self.assertEqual(response.status_code, 200)
+        return json.loads(b''.join(response.streaming_content))['transcripts']
+
+    def test_transcripts_by_ids_in_term_order(self):
+        ids = [self.students[1].pk, self.students[0].pk]
+        transcripts = self._transcripts(self.client.get(reverse('transcripts_batch'),
+                                                        {'student_ids': ','.join(map(str, ids))}))
+        self.assertEqual([t['student']['id'] for t in transcripts], sorted(ids))
+        self.assertEqual([term['semester'] for term in transcripts[0]['terms']], ['1st', '2nd'])
+        self.assertEqual(transcripts[0]['terms'][0]['subjects'][0]['subject_code'], 'IT1')
+
+    def test_transcripts_by_course_filter(self):
+        transcripts = self._transcripts(self.client.get(reverse('transcripts_batch'), {'course': self.course.pk}))
+        self.assertEqual(len(transcripts), 6)
+
+    def test_query_count_does_not_grow_with_batch_size(self):
+        """Two students and six students cost the same queries: session, user, subjects, grades, students"""
+        # The first request caches the role profile in the session
+        self.client.get(reverse('transcripts_batch'), {'student_ids': self.students[0].pk})
+        for students in (self.students[:2], self.students):
+            with self.assertNumQueries(5):
+                transcripts = self._transcripts(self.client.post(reverse('transcripts_batch'),
+                                                                 {'student_ids': [s.pk for s in students]},
+                                                                 content_type='application/json'))
+            self.assertEqual(len(transcripts), len(students))
+
+    def test_requires_ids_or_filter(self):
+        self.assertEqual(self.client.get(reverse('transcripts_batch')).status_code, 400)
+        self.assertEqual(self.client.get(reverse('transcripts_batch'), {'student_ids': 'a,b'}).status_code, 400)
+
+
+class AsyncAjaxTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student = self.create_student(first_name='Juan', year_level=1, academic_year='2025')
+        self.subject = self.create_subject()
+        self.admin = create_admin()
+        self.student_user = create_student_user()
+
+    async def test_edit_grade_ajax_creates_grade(self):
+        await self.async_client.aforce_login(self.admin)
+        response = await self.async_client.post(reverse('edit_grade_ajax'), {
+            'student_id': self.student.pk, 'subject_id': self.subject.pk, 'semester': '1st',
+            'academic_year': '2025', 'year_level': '1', 'grade_value': '1.50',
+        })
+        self.assertTrue(response.json()['success'])
+        grade = await Grade.objects.aget(student=self.student, subject=self.subject, academic_year='2025')
+        self.assertEqual(str(grade.grade_value), '1.50')
+        self.assertEqual((await Subject.objects.aget(pk=self.subject.pk)).status, 'Done')
+
+    async def test_edit_grade_ajax_rejects_grades_off_the_scale(self):
+        await self.async_client.aforce_login(self.admin)
+        for grade_value in ('85', '0.50', 'NaN', 'abc'):
+            response = await self.async_client.post(reverse('edit_grade_ajax'), {
+                'student_id': self.student.pk, 'subject_id': self.subject.pk, 'semester': '1st',
+                'academic_year': '2025', 'grade_value': grade_value,
+            })
+            self.assertFalse(response.json()['success'], grade_value)
+        self.assertFalse(await Grade.objects.filter(student=self.student).aexists())
+
+    async def test_remove_and_restore_subject(self):
+        await Grade.objects.acreate(student=self.student, subject=self.subject, semester='1st', academic_year='2025')
+        await self.async_client.aforce_login(self.admin)
+        payload = {'student_id': self.student.pk, 'subject_id': self.subject.pk}
+        response = await self.async_client.post(reverse('remove_student_subject_ajax'), payload,
+                                                headers={'x-requested-with': 'XMLHttpRequest'})
+        self.assertTrue(response.json()['success'])
+        self.assertFalse(await Grade.objects.filter(student=self.student, is_active=True).aexists())
+        response = await self.async_client.post(reverse('restore_student_subject_ajax'), payload,
+                                                headers={'x-requested-with': 'XMLHttpRequest'})
+        self.assertTrue(response.json()['success'])
+        self.assertTrue(await Grade.objects.filter(student=self.student, is_active=True).aexists())
+
+    async def test_async_admin_required_rejects_other_roles(self):
+        await self.async_client.aforce_login(self.student_user)
+        response = await self.async_client.post(reverse('remove_student_subject_ajax'), {},
+                                                headers={'x-requested-with': 'XMLHttpRequest'})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_grade_ajax_requires_admin(self):
+        payload = {'student_id': self.student.pk, 'subject_id': self.subject.pk, 'semester': '1st',
+                   'academic_year': '2025', 'grade_value': '1.50'}
+        response = await self.async_client.post(reverse('edit_grade_ajax'), payload)
+        self.assertEqual(response.status_code, 302)
+        await self.async_client.aforce_login(self.student_user)
+        for name in ('edit_grade_ajax', 'delete_grade_ajax'):
+            self.assertEqual((await self.async_client.post(reverse(name), payload)).status_code, 403)
+
+    def test_sync_client_still_works(self):
+        """The async views keep working under WSGI"""
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('edit_grade_ajax'), {
+            'student_id': self.student.pk, 'subject_id': self.subject.pk, 'semester': '1st', 'academic_year': '2025',
+        })
+        self.assertTrue(response.json()['success'])
+
+
+class GradeEventTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student_user = create_student_user()
+        self.student = self.create_student(user=self.student_user, first_name='Juan', year_level=1)
+        self.other_student = self.create_student(first_name='Maria')
+        self.subject = self.create_subject()
+
+    async def test_broker_delivers_to_channel_subscribers(self):
+        broker = EventBroker()
+        async with broker.subscribe(['student:1']) as subscription:
+            broker.publish(['subject:9'], 'grade', {'subject_id': 9})
+            event_id = broker.publish(['student:1', 'subject:9'], 'grade', {'student_id': 1})
+            message = await subscription.get()
+            self.assertTrue(message.startswith(f'id: {event_id}\nevent: grade\n'))
+            self.assertTrue(subscription.queue.empty())
+        self.assertEqual(broker.subscriber_count(), 0)
+
+    async def test_broker_replays_missed_events(self):
+        broker = EventBroker()
+        first = broker.publish(['student:1'], 'grade', {'n': 1})
+        broker.publish(['student:1'], 'grade', {'n': 2})
+        async with broker.subscribe(['student:1'], last_event_id=first) as subscription:
+            self.assertIn('"n": 2', await subscription.get())
+            self.assertTrue(subscription.queue.empty())
+
+    def test_grade_changes_publish_after_commit(self):
+        with mock.patch('student_management_system.signals.publish_grade_event') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                grade = Grade.objects.create(student=self.student, subject=self.subject, semester='1st',
+                                             academic_year='2025')
+            with self.captureOnCommitCallbacks(execute=True):
+                grade.grade_value = '1.75'
+                grade.save()
+        self.assertEqual([call.args[0] for call in publish.call_args_list], ['enrollment', 'grade'])
+        data = publish.call_args_list[1].args[1]
+        self.assertEqual((data['student_id'], data['subject_id'], data['status']),
+                         (self.student.pk, self.subject.pk, 'Done'))
+
+    @override_settings(SSE_ENABLED=True)
+    async def test_student_stream_is_limited_to_own_record(self):
+        await self.async_client.aforce_login(self.student_user)
+        response = await self.async_client.get(reverse('student_grade_events', args=[self.other_student.pk]))
+        self.assertEqual(response.status_code, 403)
+        response = await self.async_client.get(reverse('subject_grade_events', args=[self.subject.pk]))
+        self.assertEqual(response.status_code, 403)
+
+        response = await self.async_client.get(reverse('student_grade_events', args=[self.student.pk]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 5000\n\n')
+        await stream.aclose()
+
+    @override_settings(SSE_ENABLED=True, SSE_MAX_STREAM_SECONDS=0.05)
+    async def test_stream_ends_after_max_seconds(self):
+        await self.async_client.aforce_login(self.student_user)
+        response = await self.async_client.get(reverse('student_grade_events', args=[self.student.pk]))
+        chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(chunks[0], b'retry: 5000\n\n')
+
+    def test_streams_off_unless_enabled_under_asgi(self):
+        self.client.force_login(self.student_user)
+        url = reverse('student_grade_events', args=[self.student.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        # Enabled, but this is a WSGI request
+        with override_settings(SSE_ENABLED=True):
+            self.assertEqual(self.client.get(url).status_code, 404)
+        self.assertNotContains(self.client.get(reverse('SMS_grade')), 'live-grades.js')
+
+    def test_idle_channel_history_is_evicted(self):
+        broker = EventBroker(history_ttl=60)
+        with mock.patch('student_management_system.events.time.monotonic', return_value=1000):
+            broker.publish(['student:1'], 'grade', {})
+            broker.publish(['student:2'], 'grade', {})
+        with mock.patch('student_management_system.events.time.monotonic', return_value=1030):
+            broker.publish(['student:2'], 'grade', {})
+        self.assertEqual(broker.history_channels(), 2)
+        with mock.patch('student_management_system.events.time.monotonic', return_value=1070):
+            broker.publish(['student:3'], 'grade', {})
+        self.assertEqual(broker.history_channels(), 2)
+        self.assertEqual(broker._history.get('student:1'), None)
+
+
+class ConditionalGetTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.student_user = create_student_user()
+        self.student = self.create_student(user=self.student_user, first_name='Juan', year_level=1, semester='1st',
+                                           academic_year='2025')
+        self.subject = self.create_subject()
+        self.grade = Grade.objects.create(student=self.student, subject=self.subject, semester='1st',
+                                          academic_year='2025', year_level=1)
+        self.admin = create_admin()
+
+    def _revalidate(self, url, etag):
+        return self.client.get(url, headers={'if-none-match': etag})
+
+    def _etag(self, url):
+        # The first render issues the CSRF cookie, which the validators depend on
+        self.client.get(url)
+        return self.client.get(url)['ETag']
+
+    def test_student_record_not_modified_after_one_query(self):
+        self.client.force_login(self.admin)
+        url = reverse('student_record', args=[self.student.pk])
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        # Session, user and the fingerprint query
+        with self.assertNumQueries(3):
+            response = self._revalidate(url, etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_grade_change_invalidates_student_record(self):
+        self.client.force_login(self.admin)
+        url = reverse('student_record', args=[self.student.pk])
+        etag = self._etag(url)
+        self.grade.grade_value = '1.25'
+        self.grade.save()
+        self.assertEqual(self._revalidate(url, etag).status_code, 200)
+
+    def test_rendering_does_not_bump_grades(self):
+        """Rendering a normalized record writes nothing, so its validators stay stable"""
+        self.client.force_login(self.admin)
+        url = reverse('student_record', args=[self.student.pk])
+        before = Grade.objects.get(pk=self.grade.pk).updated_at
+        first = self._etag(url)
+        self.assertEqual(Grade.objects.get(pk=self.grade.pk).updated_at, before)
+        self.assertEqual(self.client.get(url)['ETag'], first)
+
+    def test_pending_normalization_renders_then_validates(self):
+        self.client.force_login(self.admin)
+        url = reverse('student_record', args=[self.student.pk])
+        self.client.get(url)
+        Grade.objects.filter(pk=self.grade.pk).update(status='Drop')
+        response = self.client.get(url)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual(Grade.objects.get(pk=self.grade.pk).status, 'Currently Taking')
+        self.assertTrue(self.client.get(url).has_header('ETag'))
+
+    def test_own_grades_page(self):
+        self.client.force_login(self.student_user)
+        url = reverse('SMS_grade')
+        etag = self._etag(url)
+        self.assertEqual(self._revalidate(url, etag).status_code, 304)
+
+    def test_catalog_change_invalidates_subject_list(self):
+        self.client.force_login(self.admin)
+        url = reverse('subject_list')
+        etag = self._etag(url)
+        self.assertEqual(self._revalidate(url, etag).status_code, 304)
+        self.subject.subject_name = 'Programming I'
+        self.subject.save()
+        self.assertEqual(self._revalidate(url, etag).status_code, 200)
+
+
+class GpaEngineTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.honor = self.create_student(first_name='Honor', year_level=1, semester='1st', academic_year='2025')
+        self.failing = self.create_student(first_name='Failing', year_level=1, semester='1st', academic_year='2025')
+        subjects = [
+            self.create_subject(f'IT10{index}', subject_name=f'Subject {index}', credits=credits)
+            for index, credits in enumerate((3, 1))
+        ]
+        for student, values in ((self.honor, ('1.00', '2.00')), (self.failing, ('5.00', '2.00'))):
+            for subject, value in zip(subjects, values):
+                Grade.objects.create(student=student, subject=subject, grade_value=value, semester='1st',
+                                     academic_year='2025', year_level=1)
+        self.admin = create_admin()
+
+    def test_credit_weighted_average_and_standing(self):
+        honor = student_gpa(self.honor.pk)
+        self.assertAlmostEqual(honor['gwa'], 1.25)
+        self.assertEqual(honor['credits'], 4.0)
+        self.assertEqual(honor['standing'], "Dean's List")
+        failing = student_gpa(self.failing.pk)
+        self.assertAlmostEqual(failing['gwa'], 4.25)
+        self.assertEqual(failing['failed_credits'], 3.0)
+        self.assertEqual(failing['standing'], 'Probation')
+
+    def test_by_term_and_snapshot_round_trip(self):
+        arrays = GradeArrays.from_queryset()
+        with tempfile.TemporaryDirectory() as directory:
+            path = arrays.save_snapshot(os.path.join(directory, 'gpa.npz'))
+            loaded = GradeArrays.load_snapshot(path)
+        result = compute_gpa(loaded.filter(course_id=self.course.pk, semester_order=1), by_term=True)
+        self.assertEqual(len(result), 2)
+        term = result.for_student(self.honor.pk)
+        self.assertEqual((term['year_level'], term['semester_order'], term['academic_year']), (1, 1, '2025'))
+        self.assertAlmostEqual(term['gwa'], 1.25)
+
+    def test_cohort_api(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        with self.assertNumQueries(1):
+            response = client.get('/api/v1/gpa/', {'course': self.course.pk, 'semester': '1st'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['summary']['standings']['Probation'], 1)
+        response = client.get(f'/api/v1/gpa/{self.failing.pk}/')
+        self.assertEqual(response.data['overall']['standing'], 'Probation')
+        self.assertEqual(len(response.data['terms']), 1)
+        self.assertEqual(client.get('/api/v1/gpa/0/').status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ClassRankingTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.students = [
+            self.create_student(first_name=f'Student{index}', year_level=1, semester='1st', academic_year='2025')
+            for index in range(3)
+        ]
+        self.subject = self.create_subject()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grades = [
+                Grade.objects.create(student=student, subject=self.subject, grade_value=value, semester='1st',
+                                     academic_year='2025', year_level=1)
+                for student, value in zip(self.students, ('2.00', '1.25', '2.00'))
+            ]
+        self.admin = create_admin()
+
+    def test_grade_changes_mark_their_cohort_stale(self):
+        stale = StaleRankingCohort.objects.get()
+        self.assertEqual((stale.course_id, stale.year_level, stale.semester_order, stale.academic_year),
+                         (self.course.pk, 1, 1, '2025'))
+
+    def test_incremental_recompute_ranks_with_ties(self):
+        self.assertEqual(recompute_stale_rankings(), (1, 3))
+        self.assertFalse(StaleRankingCohort.objects.exists())
+        ranks = dict(ClassRanking.objects.values_list('student_id', 'rank'))
+        self.assertEqual(ranks, {self.students[1].pk: 1, self.students[0].pk: 2, self.students[2].pk: 2})
+        self.assertEqual(ClassRanking.objects.get(student=self.students[1]).standing, "Dean's List")
+
+        # Nothing is stale, so a second run does no work
+        self.assertEqual(recompute_stale_rankings(), (0, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grades[0].grade_value = '1.00'
+            self.grades[0].save()
+        recompute_stale_rankings()
+        self.assertEqual(ClassRanking.objects.get(student=self.students[0]).rank, 1)
+
+    def test_current_ranking_and_deans_list_api(self):
+        recompute_all_rankings()
+        with self.assertNumQueries(1):
+            ranking = current_ranking(self.students[1])
+        self.assertEqual((ranking.rank, ranking.cohort_size), (1, 3))
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get('/api/v1/rankings/', {'course': self.course.pk, 'semester': '1st',
+                                                    'academic_year': '2025', 'standing': "Dean's List"})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['student'] for row in response.data['results']], [self.students[1].pk])
+
+
+class GradeAnalyticsTests(CatalogFixture, TestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        students = [
+            self.create_student(first_name=f'Student{index}', year_level=1, semester='1st', academic_year='2025')
+            for index in range(5)
+        ]
+        self.subject = self.create_subject()
+        values = ('1.00', '1.50', '2.00', '5.00', None)
+        self.grades = [
+            Grade.objects.create(student=student, subject=self.subject, grade_value=value, semester='1st',
+                                 academic_year='2025', year_level=1)
+            for student, value in zip(students, values)
+        ]
+        self.staff_user = create_staff_user()
+
+    def test_distribution_from_bucketed_aggregates(self):
+        with self.assertNumQueries(1):
+            group = grade_distribution(['subject'])['groups'][0]
+        self.assertEqual((group['enrolled'], group['graded'], group['failed']), (5, 4, 1))
+        self.assertAlmostEqual(group['mean'], 2.375)
+        self.assertEqual(group['pass_rate'], 0.75)
+        self.assertEqual(group['percentiles']['p50'], 1.5)
+        histogram = {bucket['bucket']: bucket['count'] for bucket in group['histogram']}
+        self.assertEqual((histogram['1.00'], histogram['1.50'], histogram['2.00'], histogram['Failed']), (1, 1, 1, 1))
+
+    def test_cached_until_a_grade_changes(self):
+        first = grade_distribution(['subject', 'term'])
+        with self.assertNumQueries(0):
+            self.assertEqual(grade_distribution(['subject', 'term']), first)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grades[4].grade_value = '3.00'
+            self.grades[4].save()
+        group = grade_distribution(['subject', 'term'])['groups'][0]
+        self.assertEqual((group['graded'], group['semester'], group['academic_year']), (5, '1st', '2025'))
+
+    def test_page_and_api_for_staff(self):
+        self.client.force_login(self.staff_user)
+        response = self.client.get(reverse('grade_analytics'), {'group_by': 'professor'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Grade Distribution')
+        client = APIClient()
+        client.force_authenticate(self.staff_user)
+        response = client.get('/api/v1/analytics/grades/', {'group_by': 'subject', 'semester': '1st'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['groups'][0]['subject_id'], self.subject.pk)
+        self.assertEqual(client.get('/api/v1/analytics/grades/', {'group_by': 'room'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class EnrollmentKpiTests(CatalogFixture, TestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        for status_, gender in (('Enrolled', 'male'), ('Enrolled', 'female'), ('Pending', 'female'), ('Graduated', '')):
+            self.create_student(first_name='Student', year_level=1, gender=gender, student_status=status_,
+                                student_type='new')
+        self.admin = create_admin()
+
+    def test_breakdowns_from_one_student_query(self):
+        with self.assertNumQueries(2):
+            kpis = enrollment_kpis()['students']
+        self.assertEqual((kpis['totals']['Enrolled'], kpis['totals']['Pending'], kpis['totals']['total']), (2, 1, 4))
+        genders = {entry['label']: entry for entry in kpis['breakdowns']['gender']}
+        self.assertEqual((genders['Female']['total'], genders['Female']['Pending']), (2, 1))
+        self.assertEqual(genders['Unspecified']['Graduated'], 1)
+        self.assertEqual(kpis['breakdowns']['course'][0]['label'], self.course.name)
+
+    def test_cached_until_a_student_changes(self):
+        enrollment_kpis()
+        with self.assertNumQueries(0):
+            enrollment_kpis()
+        with self.captureOnCommitCallbacks(execute=True):
+            Student.objects.create(first_name='New', course=self.course, student_status='Dropped')
+        self.assertEqual(enrollment_kpis()['students']['totals']['Dropped'], 1)
+
+    def test_admin_dashboard_shows_kpis(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, 'Enrollment Overview')
+        self.assertEqual(response.context['kpis']['students']['totals']['total'], 4)
+
+
+class TermRolloverTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.students = [
+            self.create_student(first_name=f'Student{index}', year_level=1, semester='1st',
+                                academic_year='2025-2026', student_status='Enrolled')
+            for index in range(3)
+        ]
+        self.senior = self.create_student(first_name='Senior', year_level=4, semester='2nd',
+                                          academic_year='2025-2026', student_status='Enrolled')
+        current = self.create_subject()
+        for index in range(2):
+            self.create_subject(f'IT10{index + 2}', subject_name=f'Programming {index + 2}', semester_offered='2nd')
+        self.graded = Grade.objects.create(student=self.students[0], subject=current, grade_value='1.50',
+                                           semester='1st', academic_year='2025-2026', year_level=1)
+        Grade.objects.filter(pk=self.graded.pk).update(status='Currently Taking')
+
+    def test_next_term(self):
+        self.assertEqual(next_term(1, '1st', '2025-2026'), (1, '2nd', '2025-2026'))
+        self.assertEqual(next_term(1, '2nd', '2025-2026'), (2, '1st', '2026-2027'))
+        self.assertEqual(next_term(2, '2nd', '2025'), (3, '1st', '2026'))
+        self.assertEqual(next_term(4, '2nd', '2025'), GRADUATED)
+        self.assertIsNone(next_term(None, '1st', '2025'))
+
+    def test_dry_run_reports_and_saves_nothing(self):
+        reports = rollover_students(Student.objects.all(), dry_run=True)
+        first_years = next(report for report in reports if report.year_level == 1)
+        self.assertEqual((first_years.promoted, first_years.grades_done, first_years.grades_created), (3, 1, 6))
+        self.assertEqual(Student.objects.get(pk=self.students[0].pk).semester, '1st')
+        self.assertEqual(Grade.objects.count(), 1)
+
+    def test_rollover_promotes_graduates_and_enrolls(self):
+        rollover_students(Student.objects.all())
+        student = Student.objects.get(pk=self.students[0].pk)
+        self.assertEqual((student.year_level, student.semester, student.academic_year), (1, '2nd', '2025-2026'))
+        self.assertEqual(Student.objects.get(pk=self.senior.pk).student_status, 'Graduated')
+        self.assertEqual(Grade.objects.get(pk=self.graded.pk).status, 'Done')
+        new_grades = Grade.objects.filter(semester='2nd', academic_year='2025-2026')
+        self.assertEqual(new_grades.count(), 6)
+        self.assertEqual(set(new_grades.values_list('semester_order', 'status')), {(2, 'Currently Taking')})
+
+        # A second run advances to the next year; the created rows are not duplicated
+        self.assertEqual(rollover_students(Student.objects.filter(year_level=1))[0].target_label, 'Y2 1st 2026-2027')
+
+
+class GradeArchiveTests(CatalogFixture, TestCase):
+    def setUp(self):
+        cache.clear()
+        super().setUp()
+        # Students are created before the subjects so the enrollment signal assigns nothing
+        self.student = self.create_student(first_name='Student', year_level=2, semester='1st',
+                                           academic_year='2025-2026', student_status='Enrolled')
+        subjects = [
+            self.create_subject(f'IT10{index}', subject_name=f'Programming {index}')
+            for index in range(3)
+        ]
+        self.old = Grade.objects.create(student=self.student, subject=subjects[0], grade_value='1.50',
+                                        semester='1st', academic_year='2024-2025', year_level=1)
+        Grade.objects.create(student=self.student, subject=subjects[1], grade_value='2.50',
+                             semester='2nd', academic_year='2024-2025', year_level=1)
+        self.current = Grade.objects.create(student=self.student, subject=subjects[2], grade_value='1.00',
+                                            semester='1st', academic_year='2025-2026', year_level=2)
+
+    def test_closed_academic_years(self):
+        self.assertEqual(closed_academic_years(), ['2024-2025'])
+
+    def test_dry_run_moves_nothing(self):
+        self.assertEqual(archive_grades(archivable_grades(), dry_run=True), 2)
+        self.assertEqual((Grade.objects.count(), GradeArchive.objects.count()), (3, 0))
+
+    def test_archive_moves_rows_in_chunks(self):
+        self.assertEqual(archive_grades(archivable_grades(), chunk_size=1), 2)
+        self.assertEqual(list(Grade.objects.values_list('pk', flat=True)), [self.current.pk])
+        archived = GradeArchive.objects.get(pk=self.old.pk)
+        self.assertEqual((str(archived.grade_value), archived.semester_order, archived.status), ('1.50', 1, 'Done'))
+
+        self.client.force_login(create_admin())
+        response = self.client.get(reverse('student_record', args=[self.student.pk]))
+        self.assertContains(response, 'Archived Terms')
+        self.assertEqual(len(response.context['archived_grades']), 2)
+
+    def test_sms_grade_shows_archived_terms(self):
+        student_user = create_student_user()
+        Student.objects.filter(pk=self.student.pk).update(user=student_user)
+        archive_grades(archivable_grades())
+
+        self.client.force_login(student_user)
+        response = self.client.get(reverse('SMS_grade'))
+        self.assertEqual(response.status_code, 200)
+        items = [item for semesters in response.context['grouped_grades'].values()
+                 for subjects in semesters.values() for item in subjects]
+        grades = {item['subject'].subject_code: item['grade'] for item in items}
+        self.assertEqual({code: str(grade.grade_value) for code, grade in grades.items() if grade},
+                         {'IT100': '1.50', 'IT101': '2.50', 'IT102': '1.00'})
+        self.assertIsInstance(grades['IT100'], GradeArchive)
+
+    def test_grades_api_lists_archived_grades(self):
+        archive_grades(archivable_grades())
+        client = APIClient()
+        client.force_authenticate(create_admin())
+
+        response = client.get('/api/v1/grades/', {'student': self.student.pk, 'page_size': 2})
+        self.assertEqual([(grade['id'], grade['archived']) for grade in response.data['results']],
+                         [(self.old.pk, True), (self.old.pk + 1, True)])
+        self.assertEqual(response.data['results'][0]['subject_code'], 'IT100')
+        response = client.get(response.data['next'])
+        self.assertEqual([(grade['id'], grade['archived']) for grade in response.data['results']],
+                         [(self.current.pk, False)])
+
+        response = client.get(f'/api/v1/grades/{self.old.pk}/')
+        self.assertEqual((response.data['grade_value'], response.data['archived']), ('1.50', True))
+        self.assertEqual(client.get('/api/v1/grades/0/').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_inactive_grades_archived_after_retention(self):
+        Grade.objects.filter(pk=self.current.pk).update(
+            is_active=False, updated_at=timezone.now() - datetime.timedelta(days=400)
+        )
+        self.assertEqual(list(archivable_grades([], 365).values_list('pk', flat=True)), [self.current.pk])
+        self.assertFalse(archivable_grades([], 500).exists())
+
+    def test_transcripts_and_gwa_read_both_tables(self):
+        before = student_gpa(self.student.pk)
+        archive_grades(archivable_grades())
+
+        loader = TranscriptLoader()
+        loader.load(self.student.pk)
+        with self.assertNumQueries(3):
+            student, subjects_by_id, grades = next(loader.dispatch())
+        transcript = transcript_dict(student, subjects_by_id, grades)
+        self.assertEqual([len(term['subjects']) for term in transcript['terms']], [1, 1, 1])
+        self.assertEqual([term['subjects'][0]['archived'] for term in transcript['terms']], [True, True, False])
+        self.assertEqual(student_gpa(self.student.pk), before)
+
+
+@override_settings(AUDIT_FLUSH_INTERVAL=3600, AUDIT_BUFFER_SIZE=200)
+class GradeAuditTests(CatalogFixture, TestCase):
+    def setUp(self):
+        buffer.clear()
+        super().setUp()
+        self.student = self.create_student(first_name='Student', year_level=1, semester='1st',
+                                           academic_year='2025-2026')
+        self.subject = self.create_subject()
+        self.admin = create_admin()
+
+    def test_changes_buffered_and_written_in_one_batch(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            grade = Grade.objects.create(student=self.student, subject=self.subject, semester='1st',
+                                         academic_year='2025-2026', year_level=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            grade = Grade.objects.get(pk=grade.pk)
+            grade.grade_value = '1.75'
+            grade.save()
+            # Saving again without a change records nothing
+            grade.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            grade.delete()
+        self.assertEqual((len(buffer), GradeAuditEntry.objects.count()), (3, 0))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(buffer.flush(), 3)
+        with self.assertNumQueries(1):
+            history = list(grade_history(student_id=self.student.pk, subject_id=self.subject.pk))
+        self.assertEqual([entry.action for entry in history], ['C', 'U', 'D'])
+        self.assertEqual([str(entry.new_value) for entry in history], ['None', '1.75', 'None'])
+        self.assertEqual(str(history[2].old_value), '1.75')
+        self.assertEqual(history[1].changes, {'status': ['Currently Taking', 'Done']})
+        self.assertEqual({(entry.academic_year, entry.semester_order) for entry in history}, {('2025-2026', 1)})
+
+    def test_rolled_back_change_not_recorded(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Grade.objects.create(student=self.student, subject=self.subject, semester='1st',
+                                         academic_year='2025-2026')
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(len(buffer), 0)
+
+    @override_settings(AUDIT_FLUSH_INTERVAL=0.05)
+    def test_timer_flushes_an_idle_buffer(self):
+        audit_buffer = AuditBuffer()
+        flushed = threading.Event()
+        with mock.patch.object(audit_buffer, 'flush', side_effect=lambda: flushed.set()):
+            audit_buffer.add(GradeAuditEntry(action=GradeAuditEntry.CREATED, student_id=self.student.pk))
+            # Not due yet, so only the timer can flush it
+            self.assertEqual(len(audit_buffer), 1)
+            self.assertTrue(flushed.wait(5))
+        audit_buffer.clear()
+
+    def test_actor_from_request_and_history_api(self):
+        self.client.force_login(self.admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('edit_grade_ajax'), {
+                'student_id': self.student.pk, 'subject_id': self.subject.pk, 'semester': '1st',
+                'academic_year': '2025-2026', 'grade_value': '2.00', 'year_level': '1',
+            })
+        self.assertTrue(response.json()['success'])
+
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        # Reading the history does not write the pending entry
+        response = client.get('/api/v1/grade-history/', {'student': self.student.pk})
+        self.assertEqual((response.data['results'], len(buffer)), ([], 1))
+        buffer.flush()
+        response = client.get('/api/v1/grade-history/', {'student': self.student.pk, 'semester': '1st'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        entry = response.data['results'][-1]
+        self.assertEqual((entry['new_value'], entry['actor'], entry['actor_username']), ('2.00', self.admin.pk, 'admin1'))
+
+
+class HotQueryIndexTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        student = self.create_student(year_level=1, semester='1st', academic_year='2025')
+        Grade.objects.create(student=student, subject=self.create_subject(), semester='1st', academic_year='2025',
+                             year_level=1)
+
+    def test_hot_queries_use_their_indexes(self):
+        out = StringIO()
+        call_command('explain_hot_queries', '--strict', stdout=out)
+        self.assertNotIn('MISSING', out.getvalue())
+
+    @skipUnlessDBFeature('can_rollback_ddl')
+    def test_strict_fails_without_an_expected_index(self):
+        # Dropped inside the test transaction, so the index comes back with the rollback
+        sql = connection.schema_editor().sql_delete_index % {
+            'name': connection.ops.quote_name('student_status_idx'),
+            'table': connection.ops.quote_name(Student._meta.db_table),
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(sql)
+        out = StringIO()
+        with self.assertRaisesMessage(CommandError, '1 hot queries do not use their index: students by status'):
+            call_command('explain_hot_queries', '--strict', stdout=out)
+        self.assertIn('MISSING  students by status: expected student_status_idx', out.getvalue())
+
+
+class ViewBenchmarkTests(TestCase):
+    def test_seed_dataset(self):
+        counts = seed_dataset(students=28, subjects=112, grades=120, seed=1)
+        self.assertEqual((counts['courses'], counts['subjects'], counts['students']), (14, 112, 28))
+        self.assertEqual(counts['grades'], Grade.objects.count())
+        self.assertFalse(Grade.objects.exclude(subject__course_id=F('student__course')).exists())
+        # Every student's current term is ungraded, earlier terms are graded or dropped
+        for student in Student.objects.all():
+            current = Grade.objects.filter(student=student, year_level=student.year_level, semester=student.semester,
+                                           academic_year=student.academic_year)
+            self.assertTrue(current.exists())
+            self.assertFalse(current.exclude(status='Currently Taking').exists())
+        self.assertEqual(set(Subject.objects.values_list('semester_order', flat=True)), {1, 2})
+
+    def test_grade_scenarios_built_when_curricula_are_full(self):
+        # One subject per curriculum term, so the busiest student takes every subject of their course
+        seed_dataset(students=28, subjects=112, grades=2000, seed=1)
+        scenarios = build_scenarios(benchmark_users(Student.objects.filter(student_status='Enrolled').first()))
+        names = [scenario.name for scenario in scenarios]
+        self.assertEqual(names[-3:], ['edit_grade_ajax', 'delete_grade_ajax', 'change_subject_ajax'])
+        for scenario in scenarios[-3:]:
+            if scenario.setup:
+                scenario.setup(0)
+            self.assertTrue(scenario.request(0).json()['success'], scenario.name)
+
+    def test_compare_flags_regressions(self):
+        def run(median, queries, memory=100.0):
+            return {'results': {'view': {'status': 200, 'wall_ms': {'median': median}, 'queries': queries,
+                                         'peak_memory_kb': memory}}}
+
+        self.assertEqual(compare_results(run(10.0, 5), run(11.0, 5))[0][2], [])
+        self.assertEqual(len(compare_results(run(10.0, 5), run(20.0, 6, 200.0))[0][2]), 3)
+        # Below the noise floor a relative slowdown is not a regression
+        self.assertEqual(compare_results(run(1.0, 5), run(2.0, 5))[0][2], [])
+
+
+class SeedScaleTests(TestCase):
+    def test_seed_scale(self):
+        call_command('seed_scale', students=40, subjects=112, grades=400, staff=2, password='seed-pass', seed=3,
+                     stdout=StringIO())
+        self.assertEqual(Student.objects.count(), 40)
+        self.assertEqual(Student.objects.filter(user__role=User.Role.STUDENT).count(), 40)
+        self.assertEqual(User.objects.filter(role=User.Role.STAFF, staff_profile__isnull=False).count(), 2)
+        self.assertTrue(self.client.login(username='seed3-0000000', password='seed-pass'))
+        # Raw inserts set what Grade.save() would derive
+        self.assertFalse(Grade.objects.filter(created_at__isnull=True).exists())
+        self.assertFalse(Grade.objects.filter(grade_value__isnull=False).exclude(status='Done').exists())
+        with self.assertRaises(CommandError):
+            call_command('seed_scale', students=1, subjects=14, grades=1, seed=3, stdout=StringIO())
+
+    def test_same_seed_same_rows(self):
+        def rows():
+            return list(Grade.objects.order_by('student__student_number', 'subject__subject_id').values_list(
+                'student__student_number', 'subject__subject_id', 'grade_value', 'academic_year', 'status'))
+
+        seed_dataset(students=30, subjects=112, grades=300, seed=5)
+        first = rows()
+        Grade.objects.all().delete()
+        Student.objects.all().delete()
+        Subject.objects.all().delete()
+        Professor.objects.all().delete()
+        seed_dataset(students=30, subjects=112, grades=300, seed=5)
+        self.assertEqual(rows(), first)
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Every route gets a query budget, checked at two dataset sizes: the count must stay within
+    the budget and must not grow when the number of students, subjects and grades does.
+    """
+    # URL name -> (client role, URL arguments, query string, budget)
+    BUDGETS = {
+        'login': (None, (), {}, 0),
+        'accounts_login': (None, (), {}, 0),
+        'register': (None, (), {}, 2),
+        'staff_register': (None, (), {}, 0),
+        'background_template': (None, (), {}, 0),
+        'password_reset': (None, (), {}, 0),
+        'password_reset_done': (None, (), {}, 0),
+        'password_reset_complete': (None, (), {}, 0),
+        'admin_dashboard': ('admin', (), {}, 2),
+        'staff_dashboard': ('staff', (), {}, 2),
+        'student_dashboard': ('student', (), {}, 3),
+        'SMScourse': ('admin', (), {}, 2),
+        'SMS-course-save': ('admin', (), {}, 17),
+        'course_record': ('admin', ('course',), {}, 5),
+        'course_list': ('admin', (), {}, 18),
+        'edit_course': ('admin', ('course',), {}, 5),
+        'SMSsubject': ('admin', (), {}, 7),
+        'SMSsubjectsave': ('admin', (), {}, 3),
+        'subject_record': ('admin', ('subject',), {}, 6),
+        'subject_list': ('admin', (), {}, 5),
+        'edit_subject': ('admin', ('subject',), {}, 5),
+        'SMSstudent': ('admin', (), {}, 4),
+        'add_student_save': ('admin', (), {}, 3),
+        'student_record': ('admin', ('student',), {}, 20),
+        'student_list': ('admin', (), {}, 4),
+        'edit_student': ('admin', ('student',), {}, 5),
+        'edit_grade': ('admin', ('student', 'subject'), {}, 5),
+        'student_profile': ('student', (), {}, 5),
+        'SMS_grade': ('student', (), {}, 7),
+        'student_subjects': ('student', ('student',), {}, 6),
+        'SMS_it': ('student', (), {}, 3),
+        'SMS_hm': ('student', (), {}, 3),
+        'SMS_ba': ('student', (), {}, 3),
+        'SMS_ed': ('student', (), {}, 3),
+        'SMS_a': ('student', (), {}, 3),
+        'account': ('student', (), {}, 3),
+        'accountstaff': ('staff', (), {}, 2),
+        'SMSstaffit': ('staff', (), {}, 6),
+        'SMSstaffvstu': ('staff', ('subject',), {}, 5),
+        'SMSstaffvstu_by_professor': ('staff', ('subject', 'professor'), {}, 5),
+        'SMSstaffcstu': ('staff', ('student',), {}, 9),
+        'SMSstaffhm': ('staff', (), {}, 5),
+        'SMSstaffvstuhm': ('staff', ('subject_code',), {}, 4),
+        'SMSstaffcstuhm': ('staff', ('student',), {}, 8),
+        'SMSstaffba': ('staff', (), {}, 5),
+        'SMSstaffvstuba': ('staff', ('subject',), {}, 4),
+        'SMSstaffcstuba': ('staff', ('student',), {}, 8),
+        'SMSstaffA': ('staff', (), {}, 4),
+        'SMSstaffvstuA': ('staff', ('subject',), {}, 4),
+        'SMSstaffcstuA': ('staff', ('student',), {}, 7),
+        'SMSstaffE': ('staff', (), {}, 9),
+        'SMSstaffvstuE': ('staff', ('subject',), {}, 4),
+        'SMSstaffcstuE': ('staff', ('student',), {}, 12),
+        'transcripts_batch': ('admin', (), {'course': 'course'}, 5),
+        'grade_analytics': ('admin', (), {}, 4),
+        'metrics': (None, (), {}, 0),
+        'api-root': ('admin', (), {}, 2),
+        'student-list': ('admin', (), {}, 3),
+        'student-detail': ('admin', ('student',), {}, 3),
+        'course-list': ('admin', (), {}, 3),
+        'course-detail': ('admin', ('course',), {}, 3),
+        'subject-list': ('admin', (), {}, 3),
+        'subject-detail': ('admin', ('subject',), {}, 3),
+        'subject-roster': ('admin', ('subject',), {}, 4),
+        'grade-list': ('admin', (), {}, 3),
+        'grade-detail': ('admin', ('grade',), {}, 3),
+        'classranking-list': ('admin', (), {}, 3),
+        'gradeauditentry-list': ('admin', (), {}, 3),
+        'gpa-list': ('admin', (), {}, 3),
+        'gpa-detail': ('admin', ('student',), {}, 3),
+        'grade-analytics-list': ('admin', (), {}, 2),
+        'admin:student_management_system_student_changelist': ('admin', (), {}, 5),
+        'admin:student_management_system_staff_changelist': ('admin', (), {}, 5),
+        'admin:student_management_system_classranking_changelist': ('admin', (), {}, 9),
+        'admin:student_management_system_gradearchive_changelist': ('admin', (), {}, 7),
+        'admin:student_management_system_gradeauditentry_changelist': ('admin', (), {}, 7),
+    }
+    # Routes without a budget, and why
+    EXEMPT = {
+        'logout': 'ends the session',
+        'activate': 'needs a signed token; one user lookup',
+        'password_reset_confirm': 'needs a signed token; one user lookup',
+        'delete_course': 'deletes on GET',
+        'delete_subject': 'deletes on GET',
+        'delete_student': 'deletes on GET',
+        'delete_student_picture': 'deletes on GET',
+        'delete_student_doc': 'deletes on GET',
+        'select_subject': 'renders a template that does not exist',
+        'change_student_subject': 'renders a template that does not exist',
+        'edit_grade_ajax': 'single-row POST endpoint',
+        'delete_grade_ajax': 'single-row POST endpoint',
+        'change_subject_ajax': 'single-row POST endpoint',
+        'add_student_subject_ajax': 'single-row POST endpoint',
+        'delete_removed_subject_ajax': 'single-row POST endpoint',
+        'restore_student_subject_ajax': 'single-row POST endpoint',
+        'remove_student_subject_ajax': 'single-row POST endpoint',
+        'update_subject_status_ajax': 'single-row POST endpoint',
+        'student_grade_events': 'event stream, served only under ASGI',
+        'subject_grade_events': 'event stream, served only under ASGI',
+        'classranking-detail': 'one row by primary key',
+        'gradeauditentry-detail': 'one row by primary key',
+    }
+
+    def setUp(self):
+        # Audit entries left by earlier tests would be flushed in the middle of a measured request
+        buffer.clear()
+
+        seed_dataset(students=28, subjects=112, grades=200, seed=1)
+        self.student = Student.objects.filter(student_status='Enrolled').order_by('pk').first()
+        self.subject = Grade.objects.filter(student=self.student).order_by('-semester_order', 'pk').first().subject
+        admin = User.objects.create_superuser('budget-admin', 'budget-admin@example.com', 'pass12345')
+        staff_user = User.objects.create_user('budget-staff', 'budget-staff@example.com', 'pass12345', role=User.Role.STAFF)
+        Staff.objects.create(user=staff_user)
+        student_user = User.objects.create_user('budget-student', 'budget-student@example.com', 'pass12345',
+                                                role=User.Role.STUDENT)
+        Student.objects.filter(pk=self.student.pk).update(user=student_user)
+        self.clients = {None: Client()}
+        for role, user in (('admin', admin), ('staff', staff_user), ('student', student_user)):
+            self.clients[role] = Client()
+            self.clients[role].force_login(user)
+        self._derive()
+
+    def _derive(self):
+        """Rankings, archived grades and audit entries of the seeded grades"""
+
+        GradeAuditEntry.objects.bulk_create([
+            GradeAuditEntry(academic_year=grade.academic_year, semester_order=grade.semester_order, grade_id=grade.pk,
+                            student_id=grade.student_id, subject_id=grade.subject_id, action=GradeAuditEntry.UPDATED,
+                            new_value=grade.grade_value, recorded_at=timezone.now())
+            for grade in Grade.objects.filter(status='Done')
+        ])
+        archive_grades(Grade.objects.filter(academic_year='2022-2023').exclude(student=self.student))
+        recompute_all_rankings()
+
+    def _grow(self):
+        """Seed five times as many rows; the measured student and subject get more grades and classmates"""
+
+        seed_dataset(students=140, subjects=224, grades=2000, seed=2)
+        term = {'semester': self.subject.semester_offered, 'semester_order': self.subject.semester_order,
+                'year_level': self.subject.year_level, 'status': 'Currently Taking', 'is_active': True}
+        classmates = Student.objects.filter(course=self.student.course).exclude(grades__subject=self.subject)
+        extra_subjects = Subject.objects.filter(course_id=self.student.course_id).exclude(grades__student=self.student)
+        Grade.objects.bulk_create(
+            [Grade(student=classmate, subject=self.subject, academic_year=self.student.academic_year, **term)
+             for classmate in classmates]
+            + [Grade(student=self.student, subject=subject, academic_year='2020-2021', semester=subject.semester_offered,
+                     semester_order=subject.semester_order, year_level=subject.year_level, grade_value='2.00',
+                     status='Done') for subject in extra_subjects]
+        )
+        self._derive()
+
+    def _url(self, name, args, query):
+        values = {
+            'student': self.student.pk,
+            'subject': self.subject.pk,
+            'subject_code': self.subject.subject_id,
+            'professor': self.subject.professor_name,
+            'course': self.student.course_id,
+            'grade': Grade.objects.filter(student=self.student).order_by('pk').first().pk,
+        }
+        url = reverse(name, args=[values[arg] for arg in args])
+        if query:
+            url += '?' + '&'.join(f'{key}={values[value]}' for key, value in query.items())
+        return url
+
+    def _count(self, name):
+        role, args, query, _ = self.BUDGETS[name]
+        url = self._url(name, args, query)
+        client = self.clients[role]
+        # The first request fills caches and the CSRF cookie
+        client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertLess(response.status_code, 400, f"{name}: {url} returned {response.status_code}")
+        return len(queries)
+
+    def test_every_route_has_a_budget(self):
+        def names(patterns):
+            for pattern in patterns:
+                if isinstance(pattern, URLResolver):
+                    if pattern.namespace != 'admin':
+                        yield from names(pattern.url_patterns)
+                elif pattern.name:
+                    yield pattern.name
+
+        missing = set(names(get_resolver().url_patterns)) - set(self.BUDGETS) - set(self.EXEMPT)
+        self.assertEqual(missing, set(), "Give these routes a query budget")
+
+    def test_query_counts_within_budget_and_flat(self):
+        small = {name: self._count(name) for name in self.BUDGETS}
+        self._grow()
+        large = {name: self._count(name) for name in self.BUDGETS}
+        for name, (_, _, _, budget) in self.BUDGETS.items():
+            with self.subTest(name):
+                self.assertLessEqual(large[name], budget, f"{name} runs {large[name]} queries")
+                self.assertEqual(large[name], small[name], f"{name} runs more queries with more rows")
+
+
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        self.admin = create_admin()
+        self.client.force_login(self.admin)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs(level='INFO') as logs:
+            response = self.client.get(reverse('student_list'))
+        timing = response['Server-Timing']
+        self.assertIn('queries"', timing)
+        self.assertRegex(timing, r'tpl;dur=\d+\.\d')
+        self.assertRegex(timing, r'total;dur=\d+\.\d')
+        record = next(record for record in logs.records if hasattr(record, 'request_profile'))
+        self.assertEqual(record.request_profile['path'], reverse('student_list'))
+        self.assertEqual(record.request_profile['user_id'], self.admin.pk)
+        self.assertGreater(record.request_profile['queries'], 0)
+        self.assertGreater(record.request_profile['template_ms'], 0)
+
+    @override_settings(REQUEST_PROFILING_SAMPLE_RATE=0.0)
+    def test_off_by_default(self):
+        response = self.client.get(reverse('student_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    def test_repeated_query_shapes(self):
+        department = Department.objects.create(name='College of Education')
+        courses = [Course.objects.create(course_id=f'C{index}', name=f'Course {index}', credits='150',
+                                         department_name=department) for index in range(6)]
+        with profile_queries(RequestProfile()) as profile:
+            for course in courses:
+                Course.objects.get(pk=course.pk).department_name.name
+        self.assertEqual(profile.queries, 12)
+        self.assertEqual([count for _, count in profile.duplicates(threshold=5)], [6, 6])
+        self.assertIn('dup;desc="2 repeated query shapes, up to 6x"', profile.server_timing())
+        self.assertEqual(fingerprint("SELECT 1 FROM t WHERE a = 'x' AND b IN (%s, %s) LIMIT 21"),
+                         fingerprint("SELECT 1 FROM t WHERE a = 'yy' AND b IN (%s) LIMIT 5"))
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        registry._reset()
+        self.admin = create_admin()
+
+    def _scrape(self, **headers):
+        response = self.client.get(reverse('metrics'), **headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        return response.content.decode()
+
+    def test_requests_queries_and_cache_lookups(self):
+        self.client.force_login(self.admin)
+        self.client.get(reverse('student_list'))
+        self.client.get(reverse('student_list'))
+        self.client.get(reverse('admin_dashboard'))
+        self.client.get(reverse('admin_dashboard'))
+        body = self._scrape()
+
+        self.assertIn('# TYPE sms_http_requests_total counter', body)
+        self.assertIn('# TYPE sms_http_request_duration_seconds histogram', body)
+        self.assertIn('sms_http_requests_total{method="GET",status="200",view="student_list"} 2.0', body)
+        self.assertIn('sms_http_request_duration_seconds_bucket{view="student_list",le="+Inf"} 2', body)
+        self.assertIn('sms_http_request_duration_seconds_count{view="student_list"} 2', body)
+        self.assertRegex(body, r'sms_db_queries_total\{view="student_list"\} [1-9]')
+        self.assertIn('sms_cache_requests_total{cache="kpis_students",result="hit"} 1.0', body)
+        self.assertIn('sms_cache_requests_total{cache="kpis_students",result="miss"} 1.0', body)
+        self.assertRegex(body, r'sms_worker_info\{django="[^"]+",pid="\d+",python="[^"]+"\} 1')
+        self.assertIn('sms_audit_buffer_entries{', body)
+
+    def test_multiprocess_mode_adds_up_workers(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_MULTIPROCESS_DIR=directory):
+            self.client.get(reverse('login'))
+            # Another worker that has since exited: its counters count, its gauges do not
+            other = {
+                'pid': 2 ** 22 + 1,
+                'counters': [['sms_http_requests_total', [['method', 'GET'], ['status', '200'], ['view', 'login']], 3]],
+                'histograms': [],
+                'gauges': [['sms_audit_buffer_entries', [['pid', str(2 ** 22 + 1)]], 7]],
+            }
+            with open(os.path.join(directory, f"{other['pid']}.json"), 'w') as f:
+                json.dump(other, f)
+            body = self._scrape()
+            self.assertTrue(os.path.exists(os.path.join(directory, f'{registry.pid}.json')))
+
+        self.assertIn('sms_http_requests_total{method="GET",status="200",view="login"} 4.0', body)
+        self.assertNotIn(f'pid="{other["pid"]}"', body)
+        self.assertIn(f'sms_audit_buffer_entries{{pid="{registry.pid}"}}', body)
+
+    def test_skipped_write_made_by_timer(self):
+        def written():
+            with open(os.path.join(directory, f'{registry.pid}.json')) as f:
+                return {name: value for name, _, value in json.load(f)['counters'] if name == 'sms_emails_total'}
+
+        with tempfile.TemporaryDirectory() as directory, \
+                override_settings(METRICS_MULTIPROCESS_DIR=directory, METRICS_WRITE_INTERVAL=0.2):
+            write_snapshot(force=True)
+            registry.inc('sms_emails_total', {'kind': 'test', 'result': 'sent'})
+            # Too soon after the last write: left to the timer, with no further request
+            write_snapshot()
+            self.assertEqual(written(), {})
+            deadline = time.monotonic() + 5
+            while not written() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            self.assertEqual(written(), {'sms_emails_total': 1})
+
+    def test_histogram_buckets_in_order(self):
+        for view, seconds in (('a', 0.003), ('a', 0.7), ('b', 12.0)):
+            registry.observe('sms_http_request_duration_seconds', {'view': view}, seconds)
+        body = self._scrape()
+
+        sample = re.compile(r'sms_http_request_duration_seconds_(bucket|sum|count)\{view="(\w+)"(?:,le="([^"]+)")?\} (\S+)')
+        parsed = [match.groups() for match in map(sample.match, body.splitlines()) if match]
+        for view in ('a', 'b'):
+            rows = [(kind, le, value) for kind, series, le, value in parsed if series == view]
+            self.assertEqual([kind for kind, _, _ in rows[-2:]], ['sum', 'count'])
+            bounds = [float(le) for kind, le, _ in rows if kind == 'bucket']
+            self.assertEqual(bounds, sorted(bounds))
+            self.assertEqual(bounds[-1], float('inf'))
+            counts = [int(value) for kind, _, value in rows if kind == 'bucket']
+            self.assertEqual(counts, sorted(counts))
+        # Series follow each other whole, in label order
+        self.assertEqual([series for _, series, _, _ in parsed], sorted(series for _, series, _, _ in parsed))
+
+    @override_settings(METRICS_TOKEN='s3cret')
+    def test_token_required_when_set(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self._scrape(HTTP_AUTHORIZATION='Bearer s3cret')
+
+    @override_settings(METRICS_ALLOWED_IPS=['10.0.0.1'])
+    def test_other_addresses_refused(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self._scrape(REMOTE_ADDR='10.0.0.1')
+
+
+class StructuredLoggingTests(CatalogFixture, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = create_admin()
+        self.client.force_login(self.admin)
+
+    def test_request_id_header(self):
+        response = self.client.get(reverse('student_list'), HTTP_X_REQUEST_ID='abc-123')
+        self.assertEqual(response['X-Request-ID'], 'abc-123')
+        response = self.client.get(reverse('student_list'), HTTP_X_REQUEST_ID='bad id\n')
+        self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_queued_records_are_built_on_the_calling_thread(self):
+        records = queue.SimpleQueue()
+        logger = logging.getLogger('sms.tests.queue')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        handler = QueueHandler(records)
+        logger.addHandler(handler)
+        token = current_request_id.set('req-1')
+        try:
+            logger.info('Saved %s grades', 3, extra={'request_profile': {'queries': 2}})
+            try:
+                raise ValueError('boom')
+            except ValueError:
+                logger.exception('Failed')
+        finally:
+            current_request_id.reset(token)
+            logger.removeHandler(handler)
+
+        first, second = records.get_nowait(), records.get_nowait()
+        self.assertEqual((first.msg, first.args, first.request_id), ('Saved 3 grades', None, 'req-1'))
+        self.assertIsNone(second.exc_info)
+        data = json.loads(JsonFormatter().format(first))
+        self.assertEqual(data['message'], 'Saved 3 grades')
+        self.assertEqual(data['request_id'], 'req-1')
+        self.assertEqual(data['request_profile'], {'queries': 2})
+        self.assertIn('ValueError: boom', json.loads(JsonFormatter().format(second))['exception'])
+
+    def test_subject_debug_listing_only_when_enabled(self):
+        self.create_subject('IT1', subject_name='Subject 1')
+        self.client.get(reverse('SMSsubject'))
+        with CaptureQueriesContext(connection) as quiet:
+            self.client.get(reverse('SMSsubject'))
+        with self.assertLogs(level='DEBUG') as logs, CaptureQueriesContext(connection) as verbose:
+            self.client.get(reverse('SMSsubject'))
+        self.assertTrue(any('SMSsubject: Subject: Subject 1' in line for line in logs.output))
+        self.assertLess(len(quiet), len(verbose))
+
+
+class ConnectionPoolTests(TestCase):
+    def _pool(self, **options):
+        return ConnectionPool('pooltest', lambda: sqlite3.connect(':memory:', check_same_thread=False), **options)
+
+    def test_reuses_most_recently_returned_connection(self):
+        pool = self._pool(max_size=2)
+        first = pool.acquire()
+        second = pool.acquire()
+        pool.release(first)
+        pool.release(second)
+        self.assertIs(pool.acquire(), second)
+        self.assertEqual(pool.stats(), {'max_size': 2, 'open': 2, 'idle': 1, 'in_use': 1, 'waiting': 0,
+                                        'opened_total': 2})
+
+    def test_waits_then_times_out_when_full(self):
+        pool = self._pool(max_size=1, timeout=0.05)
+        connection = pool.acquire()
+        with self.assertRaises(OperationalError):
+            pool.acquire()
+        # A connection given back while another thread waits goes to that thread
+        timer = threading.Timer(0.01, pool.release, [connection])
+        pool.timeout = 5
+        timer.start()
+        self.assertIs(pool.acquire(), connection)
+        timer.join()
+
+    def test_failed_check_and_expired_connections_are_replaced(self):
+        pool = self._pool(max_size=2, check=lambda connection: False)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIsNot(pool.acquire(), first)
+
+        pool = self._pool(max_size=2, max_lifetime=0)
+        first = pool.acquire()
+        pool.release(first)
+        self.assertIsNot(pool.acquire(), first)
+        self.assertEqual(pool.stats()['open'], 1)
+
+    def test_pooled_backend_returns_connections_on_close(self):
+        with tempfile.TemporaryDirectory() as directory:
+            databases = ConnectionHandler({
+                'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'},
+                'pooled': {'ENGINE': 'student_management_system.db.sqlite3', 'NAME': os.path.join(directory, 'db'),
+                           'CONN_HEALTH_CHECKS': True, 'OPTIONS': {'pool': {'max_size': 2}}},
+            })
+            connection = databases['pooled']
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                raw = connection.connection
+                connection.close()
+                self.assertEqual(pools['pooled'].stats()['idle'], 1)
+                self.assertIn('sms_db_pool_connections{alias="pooled",pid=', render())
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                self.assertIs(connection.connection, raw)
+                connection.close()
+                self.assertTrue(connection.check_pooled_connection(raw))
+                raw.close()
+                self.assertFalse(connection.check_pooled_connection(raw))
+
+                connection.settings_dict['CONN_MAX_AGE'] = 60
+                with self.assertRaises(ImproperlyConfigured):
+                    connection.ensure_connection()
+            finally:
+                pools.pop('pooled').close()
+
+
+class ReplicaRoutingTests(TestCase):
+    """A second SQLite database stands in for the replica; it holds different rows than the primary"""
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(cls.directory.name, 'replica.sqlite3')}
+        connections.settings['replica'] = connections.configure_settings({'default': {}, 'replica': replica})['replica']
+        # The router keeps migrations off replicas, which real ones get by replication
+        call_command('migrate', database='replica', verbosity=0)
+        # Declared here rather than on the class, so the runner does not look for a test database for it
+        cls.databases = {'default', 'replica'}
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.admin = create_admin()
+        self.client.force_login(self.admin)
+        self.department = Department.objects.create(name='College of Computer Studies')
+        Course.objects.create(course_id='PRIMARY', name='Primary Course', credits='150',
+                              department_name=self.department)
+        replica_department = Department.objects.using('replica').create(name='College of Computer Studies')
+        Course.objects.using('replica').create(course_id='REPLICA', name='Replica Course', credits='150',
+                                               department_name=replica_department)
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_marked_views_read_from_replica_until_the_session_writes(self):
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual([course['course_id'] for course in response.json()['results']], ['REPLICA'])
+        # Unmarked views stay on the primary
+        changelist = self.client.get(reverse('admin:student_management_system_course_changelist'))
+        self.assertContains(changelist, 'Primary Course')
+        self.assertNotContains(changelist, 'Replica Course')
+
+        self.client.post(reverse('course_list'))
+        response = self.client.get(reverse('course-list'))
+        self.assertEqual([course['course_id'] for course in response.json()['results']], ['PRIMARY'])
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_streamed_export_reads_from_replica(self):
+        course = Course.objects.using('replica').get()
+        Student.objects.using('replica').create(first_name='Replica', last_name='Student', course=course,
+                                                department_name=course.department_name, year_level=1)
+        response = self.client.get(reverse('transcripts_batch'), {'course': course.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Replica', b''.join(response.streaming_content))
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_blocks_and_writes(self):
+        self.assertEqual(Course.objects.all().db, 'default')
+        with read_from_replica() as alias:
+            self.assertEqual(alias, 'replica')
+            course = Course.objects.get()
+            self.assertEqual(course.course_id, 'REPLICA')
+            # Saved to the primary, and the rest of the block reads from there
+            course.course_id = 'COPIED'
+            course.pk = None
+            course.department_name = self.department
+            course.save()
+            self.assertEqual(course._state.db, 'default')
+            self.assertEqual(Course.objects.all().db, 'default')
+        self.assertTrue(Course.objects.filter(course_id='COPIED').exists())
@@ -0,0 +1,123 @@
+import json
+from itertools import groupby
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .archive import GradeHistory
+from .models import Student
+
+
+class TranscriptLoader:
+    """
+    Dataloader-style batch loader for student transcripts.
+
+    Callers queue the students they need with load() / load_many() and read them
+    back with dispatch(). However many students are queued, dispatch() runs a
+    fixed number of queries: one for the students, one for the distinct subjects
+    they took and one streamed query for all of their grades.
+    """
+    def __init__(self, include_inactive=False, chunk_size=2000):
+        self.include_inactive = include_inactive
+        self.chunk_size = chunk_size
+        self._student_ids = []
+        self._student_queryset = None
+
+    def load(self, student_id):
+        self._student_ids.append(int(student_id))
+
+    def load_many(self, student_ids):
+        for student_id in student_ids:
+            self.load(student_id)
+
+    def load_queryset(self, queryset):
+        """Queue every student of a queryset, resolved with a subquery instead of an id list"""
+        self._student_queryset = queryset
+
+    def _students(self):
+        queryset = Student.objects.select_related('course', 'department_name')
+        if self._student_queryset is not None:
+            queryset = queryset.filter(pk__in=self._student_queryset.values('pk'))
+        else:
+            queryset = queryset.filter(pk__in=set(self._student_ids))
+        return queryset.order_by('pk')
+
+    def _grades(self, students):
+        grades = GradeHistory().filter(student__in=students.values('pk'))
+        if not self.include_inactive:
+            grades = grades.filter(is_active=True)
+        return grades
+
+    def dispatch(self):
+        """Yield (student, subjects_by_id, grades) for every queued student, ordered by student id"""
+        students = self._students()
+        grades = self._grades(students)
+        subjects_by_id = {subject.pk: subject for subject in grades.subjects()}
+
+        grade_rows = grades.records(
+            'student_id', 'year_level', 'semester_order', 'academic_year', 'subject_id', chunk_size=self.chunk_size
+        )
+        grades_by_student = groupby(grade_rows, key=lambda grade: grade.student_id)
+        next_group = next(grades_by_student, None)
+
+        for student in students.iterator(chunk_size=self.chunk_size):
+            student_grades = []
+            # Both queries are ordered by student id, so the grade groups are merged in one pass
+            while next_group is not None and next_group[0] <= student.pk:
+                if next_group[0] == student.pk:
+                    student_grades = list(next_group[1])
+                next_group = next(grades_by_student, None)
+            yield student, subjects_by_id, student_grades
+
+
+def transcript_dict(student, subjects_by_id, grades):
+    """Build the transcript of a student, with grades grouped by term"""
+    terms = []
+    for (year_level, semester, academic_year), term_grades in groupby(
+        grades, key=lambda grade: (grade.year_level, grade.semester, grade.academic_year)
+    ):
+        subjects = []
+        for grade in term_grades:
+            subject = subjects_by_id.get(grade.subject_id)
+            subjects.append({
+                'subject_id': grade.subject_id,
+                'subject_code': subject.subject_code if subject else None,
+                'subject_name': subject.subject_name if subject else None,
+                'credits': subject.credits if subject else None,
+                'grade_value': grade.grade_value,
+                'status': grade.status,
+                'is_active': grade.is_active,
+                'archived': grade.archived,
+            })
+        terms.append({
+            'year_level': year_level,
+            'semester': semester,
+            'academic_year': academic_year,
+            'subjects': subjects,
+        })
+
+    return {
+        'student': {
+            'id': student.pk,
+            'student_number': student.student_number,
+            'first_name': student.first_name,
+            'middle_name': student.middle_Name,
+            'last_name': student.last_name,
+            'course': student.course.name if student.course else None,
+            'department': student.department_name.name if student.department_name else None,
+            'year_level': student.year_level,
+            'semester': student.semester,
+            'academic_year': student.academic_year,
+            'student_status': student.student_status,
+        },
+        'terms': terms,
+    }
+
+
+def stream_transcripts_json(loader):
+    """Yield a JSON document {"transcripts": [...]} one student at a time"""
+    yield '{"transcripts": ['
+    separator = ''
+    for student, subjects_by_id, grades in loader.dispatch():
+        yield separator + json.dumps(transcript_dict(student, subjects_by_id, grades), cls=DjangoJSONEncoder)
+        separator = ','
+    yield ']}'
@@ -3,15 +3,17 @@ import os
 import random
 import json
 from collections import defaultdict
+from decimal import Decimal, InvalidOperation
 from django.utils import timezone
 from django.contrib import messages
-from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404, aget_object_or_404
+from django.http import Http404, HttpResponse, JsonResponse
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.admin.views.decorators import staff_member_required
-from django.db.models import Q
+from django.db.models import Q, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.core.exceptions import ValidationError, PermissionDenied
 from django.utils.encoding import force_str, force_bytes
 from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
@@ -21,7 +23,7 @@ from django.template.loader import render_to_string
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from .models import Student, Course, Subject, Grade, Department
+from .models import Student, Course, Subject, Grade, Department, Professor, HIGHEST_GRADE, LOWEST_GRADE
 from .forms import (
     AddStudentSubjectForm,
     ChangeStudentSubjectForm,
@@ -35,12 +37,15 @@ from .forms import (
     AccountEditForm,
 )
 from .tokens import account_activation_token
+from .decorators import admin_required, student_required, staff_required, admin_or_staff_required
+from .conditional import conditional_page, student_record_parts, own_grades_parts, catalog_page_parts
+from .replicas import replica_reads
 
 User = get_user_model()
 
 @login_required
 @require_POST
-def update_subject_status_ajax(request):
+async def update_subject_status_ajax(request):
     student_id = request.POST.get('student_id')
     subject_id = request.POST.get('subject_id')
     new_status = request.POST.get('new_subject_status')
@@ -49,20 +54,20 @@ def update_subject_status_ajax(request):
         return JsonResponse({'success': False, 'error': 'Missing required parameters.'})
 
     try:
-        student = Student.objects.get(id=student_id)
+        student = await Student.objects.aget(id=student_id)
     except Student.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Student not found.'})
 
     try:
-        subject = Subject.objects.get(id=subject_id)
+        subject = await Subject.objects.aget(id=subject_id)
     except Subject.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Subject not found.'})
 
     # Update the subject status for this student-subject grade
     try:
-        grade = student.grades.get(subject=subject, is_active=True)
+        grade = await student.grades.aget(subject=subject, is_active=True)
         grade.status = new_status
-        grade.save()
+        await grade.asave()
     except Grade.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Grade record not found for this student and subject.'})
 
@@ -70,46 +75,6 @@ def update_subject_status_ajax(request):
 
 # Create your views here.
 
-# Added decorators for user role checks
-def admin_required(view_func):
-    """
-    Decorator for views that checks that the user is logged in and is a superuser (admin),
-    redirects to login page if necessary.
-    """
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if not request.user.is_superuser:
-            raise PermissionDenied
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
-
-def student_required(view_func):
-    """
-    Decorator for views that checks that the user is logged in and is a student (not staff or superuser),
-    redirects to login page if necessary.
-    """
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if request.user.is_superuser or getattr(request.user, 'is_staff_member', False):
-            raise PermissionDenied
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
-
-def staff_required(view_func):
-    """
-    Decorator for views that checks that the user is logged in and is a staff member (not superuser),
-    redirects to login page if necessary.
-    """
-    def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_authenticated:
-            return redirect('login')
-        if request.user.is_superuser or not getattr(request.user, 'is_staff_member', False):
-            raise PermissionDenied
-        return view_func(request, *args, **kwargs)
-    return _wrapped_view
-
 @csrf_exempt
 def drop_student_subject_ajax(request):
     try:
@@ -145,37 +110,22 @@ def login_user(request):
             return redirect('student_dashboard')
 
     if request.method == 'POST':
-        form = AuthenticationForm(data=request.POST)
+        # AuthenticationForm authenticates through UsernameOrEmailBackend, which accepts
+        # either a username or an email and checks the password exactly once
+        form = AuthenticationForm(request, data=request.POST)
         if form.is_valid():
             username = form.cleaned_data.get('username')
-            password = form.cleaned_data.get('password')
-            user = authenticate(request, username=username, password=password)
-            
-            # If authentication fails with username, try with email
-            if user is None:
-                try:
-                    student = Student.objects.get(email=username)
-                    if student.user:  # Check if student has a related user
-                        user = authenticate(request, username=student.user.username, password=password)
-                    else:
-                        messages.error(request, 'No user account associated with this email')
-                        logging.warning(f"Login failed: No user account associated with email {username}")
-                except Student.DoesNotExist:
-                    messages.error(request, 'Invalid email or password')
-                    logging.warning(f"Login failed: Invalid email {username}")
-            if user is not None:
-                login(request, user)
-                messages.success(request, f'Welcome, {username}!')
-                if user.is_superuser:
-                    return redirect('admin_dashboard')  # Redirect to admin dashboard
-                elif hasattr(user, 'is_staff_member') and user.is_staff_member:
-                    return redirect('staff_dashboard')  # Redirect to staff dashboard
-                else:
-                    return redirect('student_dashboard')  # Redirect to student dashboard
+            user = form.get_user()
+            login(request, user)
+            messages.success(request, f'Welcome, {username}!')
+            if user.is_superuser:
+                return redirect('admin_dashboard')  # Redirect to admin dashboard
+            elif hasattr(user, 'is_staff_member') and user.is_staff_member:
+                return redirect('staff_dashboard')  # Redirect to staff dashboard
             else:
-                messages.error(request, 'Invalid username or password.')
-                logging.warning(f"Login failed: Invalid username {username}")
+                return redirect('student_dashboard')  # Redirect to student dashboard
         else:
+            logging.warning("Login failed: Invalid username or email %s", request.POST.get('username'))
             # Explicitly return the form with errors if form is invalid
             return render(request, 'SMS(logon).html', {'form': form})
     else:
@@ -195,15 +145,13 @@ def logout_user(request):
 @admin_required
 @login_required  # Ensure only admin users can access this view
 def admin_dashboard(request):
-    return render(request, 'SMS(course).html', {'user': request.user})
+    from .kpis import enrollment_kpis
+    return render(request, 'SMS(course).html', {'user': request.user, 'kpis': enrollment_kpis()})
 
 @student_required
 @login_required  # Ensure only student users can access this view
 def student_dashboard(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+    student = request.student or None
     departments = Department.objects.all()
     domain = request.get_host()
     return render(request, 'SMS.html', {'user': request.user, 'student': student, 'departments': departments, 'domain': domain})
@@ -260,12 +208,15 @@ def delete_course(request, course_id):
 
 @login_required
 @admin_required
+@conditional_page(catalog_page_parts)
 def course_record(request, pk):
     course = get_object_or_404(Course, pk=pk)
     return render(request, 'SMS(Crecord).html', {'course': course})
 
+@replica_reads
 @login_required
 @admin_required
+@conditional_page(catalog_page_parts)
 def course_list(request):
     search_query = request.GET.get('search', '')
     courses = Course.objects.all()  # Start with all courses
@@ -317,7 +268,7 @@ def SMSstudent(request):
 def add_student_save(request):
     form = StudentProfileForm()
     # Order students by course name, year level, last name, first name for orderly display
-    students = Student.objects.order_by('course__name', 'year_level', 'last_name', 'first_name')
+    students = Student.objects.select_related('course').order_by('course__name', 'year_level', 'last_name', 'first_name')
 
     if request.method == 'POST':
         form = StudentProfileForm(request.POST, request.FILES)
@@ -362,7 +313,7 @@ def add_student_save(request):
                     messages.success(request, "Student added successfully ") #without linking to a user account!
                 return redirect('SMSstudent')
             except Exception as e:
-                logging.error(f"Error saving student: {str(e)}")
+                logging.error("Error saving student: %s", e)
                 messages.error(request, f"Error saving student: {str(e)}")
                 return render(request, 'SMS(student).html', {'form': form, 'students': students})
         else:
@@ -442,12 +393,13 @@ def change_student_subject(request, student_id, old_subject_id):
 
 from django.core.paginator import Paginator
 
+@replica_reads
 @login_required
 @admin_required
 def student_list(request):
     try:
         search_query = request.GET.get('search', '')
-        all_students = Student.objects.all()  # Full list of all students
+        all_students = Student.objects.select_related('course')  # Full list of all students
         students = all_students  # Start with all students for filtering
         
         if search_query:
@@ -478,7 +430,7 @@ def student_list(request):
             students = students.filter(query)
         
         # Order students by year level for grouping
-        students = students.order_by('year_level')
+        students = students.select_related('course').order_by('year_level')
         
         # Group students by course name
         from collections import defaultdict
@@ -506,7 +458,7 @@ def student_list(request):
             'student_subjects_map': student_subjects_map
         })
     except Exception as e:
-        logging.error(f"Exception in student_list view: {str(e)}", exc_info=True)
+        logging.error("Exception in student_list view: %s", e, exc_info=True)
         messages.error(request, "An error occurred while loading the student list. Please try again later.")
         return redirect('student_dashboard')
 
@@ -527,12 +479,16 @@ def edit_student(request, pk):
             grades_to_activate = grades_qs.filter(year_level=student.year_level, academic_year=student_academic_year)
         else:
             grades_to_activate = grades_qs.filter(year_level=student.year_level)
-        count = grades_to_activate.update(is_active=True)
-        logging.info(f"Activated {count} grades for student id {student.id} with year_level {student.year_level}, semester {student_semester}, and academic_year {student_academic_year}")
+        count = grades_to_activate.update(is_active=True, updated_at=timezone.now())
+        if count:
+            from .signals import grades_updated_in_bulk
+            grades_updated_in_bulk(student)
+        logging.info("Activated %s grades for student id %s with year_level %s, semester %s, and academic_year %s",
+                     count, student.id, student.year_level, student_semester, student_academic_year)
 
     if request.method == 'POST':
-        logging.info(f"edit_student POST request received for student id {pk}")
-        logging.info(f"POST data keys: {list(request.POST.keys())}")
+        logging.info("edit_student POST request received for student id %s", pk)
+        logging.debug("POST data keys: %s", request.POST.keys())
         form = StudentProfileForm(request.POST, request.FILES, instance=student, user=request.user)
         if form.is_valid():
             student = form.save(commit=False)
@@ -549,9 +505,9 @@ def edit_student(request, pk):
                         if os.path.isfile(file_path):
                             try:
                                 os.remove(file_path)
-                                logging.info(f"Deleted file {file_path} for field {field_name}")
+                                logging.info("Deleted file %s for field %s", file_path, field_name)
                             except Exception as e:
-                                logging.error(f"Error deleting file {file_path}: {str(e)}")
+                                logging.error("Error deleting file %s: %s", file_path, e)
                     setattr(student, field_name, None)
 
             department_name = form.cleaned_data.get('department_name')
@@ -573,7 +529,7 @@ def edit_student(request, pk):
 
             activate_grades_for_student(student)
 
-            logging.info(f"Form saved for student id {pk}, pictures field is now: {student.pictures}")
+            logging.info("Form saved for student id %s, pictures field is now: %s", pk, student.pictures)
             messages.success(request, "Student edited successfully.")
 
             return redirect('student_list')
@@ -591,9 +547,8 @@ def edit_student(request, pk):
 @student_required
 def student_profile(request):
     # Get the student profile for the current user
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
+    student = request.student or None
+    if student is None:
         messages.error(request, "No student profile found for the current user.")
         return redirect('student_dashboard')  # Redirect to a safe page
 
@@ -616,16 +571,22 @@ def student_profile(request):
         'student': student
     })
     
+@replica_reads
 @admin_required
 @login_required(login_url='login')
+@conditional_page(catalog_page_parts)
 def SMSsubject(request):
     search_query = request.GET.get('search', '')
-    subjects = Subject.objects.select_related('course_id').all()  # Start with all subjects and fetch related course data
+    subjects = Subject.objects.select_related('course_id', 'department_name').all()  # Start with all subjects and fetch related course data
 
     import logging
-    logging.debug(f"SMSsubject: Total subjects found: {subjects.count()}")
-    for subj in subjects:
-        logging.debug(f"SMSsubject: Subject: {subj.subject_name}, Year Level: {subj.year_level}, Course: {subj.course_id.name if subj.course_id else 'None'}")
+    # Listing every subject costs a query of its own; only do it when someone reads debug logs
+    log_subjects = logging.root.isEnabledFor(logging.DEBUG)
+    if log_subjects:
+        logging.debug("SMSsubject: Total subjects found: %s", subjects.count())
+        for subj in subjects:
+            logging.debug("SMSsubject: Subject: %s, Year Level: %s, Course: %s",
+                          subj.subject_name, subj.year_level, subj.course_id.name if subj.course_id else 'None')
 
     if search_query:
             try:
@@ -651,9 +612,11 @@ def SMSsubject(request):
                     Q(course_id__name__icontains=search_query)
                 )
 
-    logging.debug(f"SMSsubject: Subjects after filtering: {subjects.count()}")
-    for subj in subjects:
-        logging.debug(f"SMSsubject: Filtered Subject: {subj.subject_name}, Year Level: {subj.year_level}, Course: {subj.course_id.name if subj.course_id else 'None'}")
+    if log_subjects:
+        logging.debug("SMSsubject: Subjects after filtering: %s", len(subjects))
+        for subj in subjects:
+            logging.debug("SMSsubject: Filtered Subject: %s, Year Level: %s, Course: %s",
+                          subj.subject_name, subj.year_level, subj.course_id.name if subj.course_id else 'None')
 
     grouped_by_year = {}
     for subject in subjects:
@@ -739,7 +702,7 @@ def SMSsubjectsave(request):
             messages.error(request, "All fields are required.")
             return redirect('SMSsubjectsave')
 
-    subjects = Subject.objects.select_related('course_id').all()
+    subjects = Subject.objects.select_related('course_id', 'department_name').all()
     search_query = request.GET.get('search', '')
 
     if search_query:
@@ -767,7 +730,7 @@ def SMSsubjectsave(request):
             )
 
     # Sort subjects by course name, year_level, and semester_offered for proper grouping and ordering
-    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_offered')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -851,6 +814,7 @@ def delete_subject(request, subject_id):
 
 @admin_required
 @login_required
+@conditional_page(catalog_page_parts)
 def subject_record(request, pk):
     # Retrieve the subject or return a 404 if not found
     subject = get_object_or_404(Subject, pk=pk)
@@ -858,18 +822,22 @@ def subject_record(request, pk):
 
 from django.core.paginator import Paginator
 
+@replica_reads
 @admin_required
 @login_required
+@conditional_page(catalog_page_parts)
 def subject_list(request):
-    subjects = Subject.objects.select_related('course_id').all()  # Fetch all subjects
+    subjects = Subject.objects.select_related('course_id', 'department_name').all()  # Fetch all subjects
 
     # Sort subjects by course name, year_level, and semester_offered for proper grouping and ordering
-    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_offered')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     import logging
-    logging.debug(f"subject_list: Total subjects found: {subjects.count()}")  # Debug print total subjects
-    for subj in subjects:
-        logging.debug(f"subject_list: Subject: {subj.subject_name}, Year Level: {subj.year_level}, Course: {subj.course_id.name if subj.course_id else 'None'}")
+    if logging.root.isEnabledFor(logging.DEBUG):
+        logging.debug("subject_list: Total subjects found: %s", len(subjects))
+        for subj in subjects:
+            logging.debug("subject_list: Subject: %s, Year Level: %s, Course: %s",
+                          subj.subject_name, subj.year_level, subj.course_id.name if subj.course_id else 'None')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -1189,11 +1157,11 @@ def edit_grade(request, student_id, subject_id):
     })
 
 from .models import Grade
-from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 
-@csrf_exempt
-def delete_grade_ajax(request):
+@login_required
+@admin_required
+async def delete_grade_ajax(request):
     if request.method == 'POST':
         try:
             student_id = request.POST.get('student_id')
@@ -1201,21 +1169,20 @@ def delete_grade_ajax(request):
             semester = request.POST.get('semester')
             academic_year = request.POST.get('academic_year')
 
-            student = get_object_or_404(Student, id=student_id)
-            subject = get_object_or_404(Subject, id=subject_id)
+            student = await aget_object_or_404(Student, id=student_id)
+            subject = await aget_object_or_404(Subject, id=subject_id)
 
-            grade = Grade.objects.filter(
+            grade = await Grade.objects.filter(
                 student=student,
                 subject=subject,
                 semester=semester,
                 academic_year=academic_year
-            ).first()
+            ).afirst()
 
             if grade:
-                grade.delete()
+                await grade.adelete()
                 # Update subject status to 'Drop' when grade is deleted
-                subject.status = 'Drop'
-                subject.save()
+                await Subject.objects.filter(pk=subject.pk).aupdate(status='Drop', updated_at=timezone.now())
                 return JsonResponse({'success': True, 'message': 'Grade deleted successfully and subject status updated to Drop.'})
             else:
                 return JsonResponse({'success': False, 'error': 'Grade not found.'})
@@ -1224,8 +1191,9 @@ def delete_grade_ajax(request):
     else:
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
 
-@csrf_exempt
-def edit_grade_ajax(request):
+@login_required
+@admin_required
+async def edit_grade_ajax(request):
     import logging
     if request.method == 'POST':
         try:
@@ -1244,23 +1212,35 @@ def edit_grade_ajax(request):
             # Validate semester
             valid_semesters = ['1st', '2nd']
             if semester not in valid_semesters:
-                logging.error(f"edit_grade_ajax: Invalid semester value: {semester}")
+                logging.error("edit_grade_ajax: Invalid semester value: %s", semester)
                 return JsonResponse({'success': False, 'error': f'Invalid semester value. Must be one of {valid_semesters}.'})
 
             # Validate year_level if provided
-            valid_year_levels = ['1', '2', '3', '4']
+            valid_year_levels = [str(value) for value, label in Student.YEAR_LEVEL_CHOICES]
             if year_level and year_level not in valid_year_levels:
-                logging.error(f"edit_grade_ajax: Invalid year_level value: {year_level}")
+                logging.error("edit_grade_ajax: Invalid year_level value: %s", year_level)
                 return JsonResponse({'success': False, 'error': f'Invalid year_level value. Must be one of {valid_year_levels}.'})
+            year_level = int(year_level) if year_level else None
 
             # Convert grade_value to None if it is '-' or empty string
             if grade_value == '-' or grade_value == '':
                 grade_value = None
 
-            student = get_object_or_404(Student, id=student_id)
-            subject = get_object_or_404(Subject, id=subject_id)
-
-            grade, created = Grade.objects.get_or_create(
+            # Validate grade_value against the grading scale if provided
+            if grade_value is not None:
+                try:
+                    grade_value = Decimal(grade_value)
+                    # Comparing NaN raises InvalidOperation as well
+                    if not HIGHEST_GRADE <= grade_value <= LOWEST_GRADE:
+                        raise InvalidOperation
+                except InvalidOperation:
+                    logging.error("edit_grade_ajax: Invalid grade_value: %s", request.POST.get('grade_value'))
+                    return JsonResponse({'success': False, 'error': f'Invalid grade value. Must be between {HIGHEST_GRADE:.2f} and {LOWEST_GRADE:.2f}.'})
+
+            student = await aget_object_or_404(Student, id=student_id)
+            subject = await aget_object_or_404(Subject, id=subject_id)
+
+            grade, created = await Grade.objects.aget_or_create(
                 student=student,
                 subject=subject,
                 semester=semester,
@@ -1275,14 +1255,15 @@ def edit_grade_ajax(request):
             # Set status to "Currently Taking" if semester and academic_year are filled
             if semester and academic_year:
                 grade.status = "Currently Taking"
-            grade.save()
-            logging.info(f"edit_grade_ajax: {'Created new' if created else 'Updated existing'} grade for student_id={student_id}, subject_id={subject_id}")
+            await grade.asave()
+            logging.info("edit_grade_ajax: %s grade for student_id=%s, subject_id=%s",
+                         'Created new' if created else 'Updated existing', student_id, subject_id)
 
             # Update subject.status to "Done" if grade_value is set (not None or empty)
             if grade.grade_value is not None and grade.grade_value != '' and grade.grade_value != '-':
                 if subject.status != 'Done':
                     subject.status = 'Done'
-                    subject.save()
+                    await Subject.objects.filter(pk=subject.pk).aupdate(status='Done', updated_at=timezone.now())
 
             return JsonResponse({
                 'success': True,
@@ -1295,7 +1276,7 @@ def edit_grade_ajax(request):
                 'subject_status': subject.status
             })
         except Exception as e:
-            logging.error(f"edit_grade_ajax: Exception occurred: {str(e)}")
+            logging.error("edit_grade_ajax: Exception occurred: %s", e)
             return JsonResponse({'success': False, 'error': str(e)})
     else:
         logging.error("edit_grade_ajax: Invalid request method")
@@ -1303,7 +1284,7 @@ def edit_grade_ajax(request):
 
 @login_required
 @admin_required
-def change_subject_ajax(request):
+async def change_subject_ajax(request):
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         try:
             student_id = request.POST.get('student_id')
@@ -1313,21 +1294,20 @@ def change_subject_ajax(request):
             new_subject_year_level = request.POST.get('new_subject_year_level')
             new_subject_semester = request.POST.get('new_subject_semester')
 
-            student = get_object_or_404(Student, pk=student_id)
-            old_subject = get_object_or_404(Subject, pk=old_subject_id)
-            new_subject = get_object_or_404(Subject, pk=new_subject_id)
+            student = await aget_object_or_404(Student, pk=student_id)
+            old_subject = await aget_object_or_404(Subject, pk=old_subject_id)
+            new_subject = await aget_object_or_404(Subject, pk=new_subject_id)
 
             # Remove old subject's grade if exists
-            student.grades.filter(subject=old_subject).delete()
+            await student.grades.filter(subject=old_subject).adelete()
 
             # Add or update new subject's grade with provided status, year level, semester
-            from .models import Grade
-            grade, created = Grade.objects.get_or_create(
+            grade, created = await Grade.objects.aget_or_create(
                 student=student,
                 subject=new_subject,
                 defaults={
                     'semester': new_subject_semester if new_subject_semester else '1st',
-                    'academic_year': timezone.now().year,
+                    'academic_year': str(timezone.now().year),
                     'year_level': int(new_subject_year_level) if new_subject_year_level else None,
                     'status': new_subject_status if new_subject_status else None,
                 }
@@ -1340,7 +1320,7 @@ def change_subject_ajax(request):
                     grade.year_level = int(new_subject_year_level)
                 if new_subject_status:
                     grade.status = new_subject_status
-                grade.save()
+                await grade.asave()
 
             return JsonResponse({
                 'success': True,
@@ -1361,7 +1341,7 @@ def change_subject_ajax(request):
 
 @login_required
 @admin_required
-def add_student_subject_ajax(request):
+async def add_student_subject_ajax(request):
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         try:
             student_id = request.POST.get('student_id')
@@ -1369,24 +1349,25 @@ def add_student_subject_ajax(request):
             selected_course_id = request.POST.get('course')
             semester_to_use = request.POST.get('semester')
 
-            student = get_object_or_404(Student, pk=student_id)
-            new_subject = get_object_or_404(Subject, pk=new_subject_id)
+            student = await aget_object_or_404(Student, pk=student_id)
+            new_subject = await aget_object_or_404(Subject, pk=new_subject_id)
 
-            # Use the selected course if provided, else fallback to student's course
+            # Use the selected course if provided, else fallback to student's course.
+            # Compare foreign key ids so no related object is fetched from async code.
             if selected_course_id:
-                selected_course = get_object_or_404(Course, pk=selected_course_id)
+                selected_course_pk = (await aget_object_or_404(Course, pk=selected_course_id)).pk
             else:
-                selected_course = student.course
+                selected_course_pk = student.course_id
 
             # Check if the subject belongs to the student's department
-            if new_subject.department_name != student.department_name:
+            if new_subject.department_name_id != student.department_name_id:
                 return JsonResponse({
                     'success': False,
                     'error': 'Selected subject does not belong to the student\'s department.'
                 })
 
             # Check if the subject belongs to the selected course
-            if new_subject.course_id != selected_course:
+            if new_subject.course_id_id != selected_course_pk:
                 return JsonResponse({
                     'success': False,
                     'error': 'Selected subject does not belong to the selected course.'
@@ -1401,20 +1382,20 @@ def add_student_subject_ajax(request):
                     'error': 'Semester is required.'
                 })
 
-            existing_grade = Grade.objects.filter(
+            existing_grade = await Grade.objects.filter(
                 student=student,
                 subject=new_subject,
                 semester=semester_to_use,
                 academic_year=current_academic_year,
                 is_active=True
-            ).first()
+            ).aexists()
             if existing_grade:
                 return JsonResponse({
                     'success': False,
                     'error': 'Subject is already assigned to the student for the selected semester and academic year.'
                 })
 
-            Grade.objects.create(
+            await Grade.objects.acreate(
                 student=student,
                 subject=new_subject,
                 semester=semester_to_use,
@@ -1454,14 +1435,18 @@ def activateEmail(request, user, to_email):
         "protocol": 'https' if request.is_secure() else 'http'
     })
     email = EmailMessage(mail_subject, message, to=[to_email])
+    from .metrics import record_email
     try:
-        if email.send():
+        sent = email.send()
+        record_email('activation', sent)
+        if sent:
             messages.success(request, f'Dear <b>{user}</b>, please go to you email <b>{to_email}</b> inbox and click on \
                     received activation link to confirm and complete the registration. <b>Note:</b> Check your spam folder.')
         else:
             messages.error(request, f'Problem sending email to {to_email}, check if you typed it correctly.')
     except Exception as e:
-        logging.error(f"Error sending activation email to {to_email}: {str(e)}")
+        record_email('activation', False)
+        logging.error("Error sending activation email to %s: %s", to_email, e)
         messages.error(request, f'Error sending email to {to_email}. Please try again later.')
 
 import logging
@@ -1480,7 +1465,7 @@ def delete_removed_subject_ajax(request):
             student_id = request.POST.get('student_id')
             subject_id = request.POST.get('subject_id')
 
-            logging.info(f"delete_removed_subject_ajax called with student_id={student_id}, subject_id={subject_id}")
+            logging.info("delete_removed_subject_ajax called with student_id=%s, subject_id=%s", student_id, subject_id)
 
             student = get_object_or_404(Student, pk=student_id)
             subject = get_object_or_404(Subject, pk=subject_id)
@@ -1488,10 +1473,11 @@ def delete_removed_subject_ajax(request):
             # Find the Grade record where is_active=False for the given student and subject
             grade_qs = student.grades.filter(subject=subject, is_active=False)
             count = grade_qs.count()
-            logging.info(f"Found {count} grade records with is_active=False for student_id={student_id} and subject_id={subject_id}")
+            logging.info("Found %s grade records with is_active=False for student_id=%s and subject_id=%s",
+                         count, student_id, subject_id)
 
             if count == 0:
-                logging.warning(f"No removed subject found for student_id={student_id} and subject_id={subject_id}")
+                logging.warning("No removed subject found for student_id=%s and subject_id=%s", student_id, subject_id)
                 return JsonResponse({
                     'success': False,
                     'error': 'Removed subject not found for the student.'
@@ -1501,14 +1487,14 @@ def delete_removed_subject_ajax(request):
 
             # Permanently delete the grade record
             grade.delete()
-            logging.info(f"Removed subject {subject.subject_name} deleted successfully for student_id={student_id}")
+            logging.info("Removed subject %s deleted successfully for student_id=%s", subject.subject_name, student_id)
 
             return JsonResponse({
                 'success': True,
                 'message': f'Removed subject {subject.subject_name} deleted successfully.'
             })
         except Exception as e:
-            logging.error(f"Error in delete_removed_subject_ajax: {str(e)}")
+            logging.error("Error in delete_removed_subject_ajax: %s", e)
             return JsonResponse({
                 'success': False,
                 'error': 'An error occurred while deleting the removed subject. Please try again later.'
@@ -1520,43 +1506,43 @@ def delete_removed_subject_ajax(request):
 
 @login_required
 @admin_required
-def remove_student_subject_ajax(request):
+async def remove_student_subject_ajax(request):
     import logging
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         try:
             student_id = request.POST.get('student_id')
             subject_id = request.POST.get('subject_id')
 
-            logging.info(f"remove_student_subject_ajax called with student_id={student_id}, subject_id={subject_id}")
+            logging.info("remove_student_subject_ajax called with student_id=%s, subject_id=%s", student_id, subject_id)
 
-            student = get_object_or_404(Student, pk=student_id)
-            subject = get_object_or_404(Subject, pk=subject_id)
+            student = await aget_object_or_404(Student, pk=student_id)
+            subject = await aget_object_or_404(Subject, pk=subject_id)
 
             # Find the active Grade record for the given student and subject
             grade_qs = student.grades.filter(subject=subject, is_active=True)
-            count = grade_qs.count()
-            logging.info(f"Found {count} active grade records for student_id={student_id} and subject_id={subject_id}")
+            count = await grade_qs.acount()
+            logging.info("Found %s active grade records for student_id=%s and subject_id=%s", count, student_id, subject_id)
 
             if count == 0:
-                logging.warning(f"No active subject found for student_id={student_id} and subject_id={subject_id}")
+                logging.warning("No active subject found for student_id=%s and subject_id=%s", student_id, subject_id)
                 return JsonResponse({
                     'success': False,
                     'error': 'Active subject not found for the student.'
                 })
 
-            grade = grade_qs.first()
+            grade = await grade_qs.afirst()
 
             # Mark the grade record as inactive (soft delete)
             grade.is_active = False
-            grade.save()
-            logging.info(f"Subject {subject.subject_name} marked as inactive for student_id={student_id}")
+            await grade.asave()
+            logging.info("Subject %s marked as inactive for student_id=%s", subject.subject_name, student_id)
 
             return JsonResponse({
                 'success': True,
                 'message': f'Subject {subject.subject_name} removed successfully.'
             })
         except Exception as e:
-            logging.error(f"Error in remove_student_subject_ajax: {str(e)}")
+            logging.error("Error in remove_student_subject_ajax: %s", e)
             return JsonResponse({
                 'success': False,
                 'error': 'An error occurred while removing the subject. Please try again later.'
@@ -1568,20 +1554,20 @@ def remove_student_subject_ajax(request):
 
 @login_required
 @admin_required
-def restore_student_subject_ajax(request):
+async def restore_student_subject_ajax(request):
     if request.method == 'POST' and request.headers.get('x-requested-with') == 'XMLHttpRequest':
         try:
             student_id = request.POST.get('student_id')
             subject_id = request.POST.get('subject_id')
 
-            student = get_object_or_404(Student, pk=student_id)
-            subject = get_object_or_404(Subject, pk=subject_id)
+            student = await aget_object_or_404(Student, pk=student_id)
+            subject = await aget_object_or_404(Subject, pk=subject_id)
 
             # Mark the Grade record as active to restore
-            grade = student.grades.filter(subject=subject, is_active=False).first()
+            grade = await student.grades.filter(subject=subject, is_active=False).afirst()
             if grade:
                 grade.is_active = True
-                grade.save()
+                await grade.asave()
                 return JsonResponse({
                     'success': True,
                     'message': f'Subject {subject.subject_name} restored successfully.'
@@ -1601,13 +1587,63 @@ def restore_student_subject_ajax(request):
         'error': 'Invalid request method or not AJAX'
     })
 
+def order_subjects_by_term(subjects, student):
+    """
+    Order subjects by year level and by the term they are listed under for the student:
+    the semester of the student's active grade, else the subject's semester_offered.
+    The ordering runs in SQL so callers can group the rows in a single pass.
+    """
+    active_grade_order = Grade.objects.filter(
+        student=student, subject=OuterRef('pk'), is_active=True
+    ).order_by('-pk').values('semester_order')[:1]
+    return subjects.annotate(
+        term_order=Coalesce(Subquery(active_grade_order), 'semester_order')
+    ).order_by('year_level', 'term_order', 'subject_name')
+
+def normalize_student_grades(student):
+    """
+    Set-based fixes student_record applies before rendering: activate the grades of the
+    student's current term, fill blank academic years from the student, and bring grade
+    statuses in line with their values (what Grade.save() derives). Only rows that change
+    are written, so an already normalized record keeps its updated_at and its ETag.
+    Keep conditional.pending_grade_normalizations in step with these filters.
+    """
+    now = timezone.now()
+    changed = 0
+    student_semester = getattr(student, 'semester', None)
+    student_academic_year = getattr(student, 'academic_year', None)
+
+    if student_semester and student_academic_year:
+        activated = student.grades.filter(
+            year_level=student.year_level,
+            semester=student_semester,
+            academic_year=student_academic_year,
+            is_active=False
+        ).update(is_active=True, updated_at=now)
+        if activated:
+            from .signals import grades_updated_in_bulk
+            grades_updated_in_bulk(student)
+        changed += activated
+
+    if student_academic_year:
+        changed += student.grades.filter(
+            Q(academic_year__isnull=True) | Q(academic_year='')
+        ).update(academic_year=student_academic_year, updated_at=now)
+
+    dated_grades = student.grades.exclude(semester='').exclude(academic_year='')
+    changed += dated_grades.filter(grade_value__isnull=False).exclude(status='Done').update(status='Done', updated_at=now)
+    changed += dated_grades.filter(grade_value__isnull=True).exclude(status='Currently Taking').update(
+        status='Currently Taking', updated_at=now
+    )
+    return changed
+
 @login_required
 @admin_required
+@conditional_page(student_record_parts)
 def student_record(request, pk):
     import logging
-    import traceback
 
-    logging.info(f"Accessing student_record view with pk={pk}")
+    logging.info("Accessing student_record view with pk=%s", pk)
     try:
         student = Student.objects.get(pk=pk)
 
@@ -1625,64 +1661,23 @@ def student_record(request, pk):
             messages.error(request, "Invalid student ID.")
             return redirect('student_list')
 
-        # Activate grades matching student's year_level, semester, and academic_year if not active
         student_semester = getattr(student, 'semester', None)
         student_academic_year = getattr(student, 'academic_year', None)
-        if student_semester and student_academic_year:
-            inactive_grades = student.grades.filter(
-                year_level=student.year_level,
-                semester=student_semester,
-                academic_year=student_academic_year,
-                is_active=False
-            )
-            count_activated = inactive_grades.update(is_active=True)
-            logging.info(f"Activated {count_activated} grades for student id {student.id} in student_record view")
-
-        # Save grades with filled semester or academic_year to update status automatically
-        grades_to_update = student.grades.filter(
-            semester__isnull=False
-        ).exclude(semester='').filter(
-            academic_year__isnull=False
-        ).exclude(academic_year='')
-        for grade in grades_to_update:
-            grade.save()
-
-        student = Student.objects.get(pk=pk)
-
-        if not student.id:
-            messages.error(request, "Invalid student ID.")
-            return redirect('student_list')
-
-        # Activate grades matching student's year_level, semester, and academic_year if not active
-        student_semester = getattr(student, 'semester', None)
-        student_academic_year = getattr(student, 'academic_year', None)
-        if student_semester and student_academic_year:
-            inactive_grades = student.grades.filter(
-                year_level=student.year_level,
-                semester=student_semester,
-                academic_year=student_academic_year,
-                is_active=False
-            )
-            count_activated = inactive_grades.update(is_active=True)
-            logging.info(f"Activated {count_activated} grades for student id {student.id} in student_record view")
+        count_normalized = normalize_student_grades(student)
+        logging.info("Normalized %s grades for student id %s in student_record view", count_normalized, student.id)
 
         # Get all subjects for the student's course that the student has grades for (active or inactive)
         subject_ids = student.grades.values_list('subject_id', flat=True).distinct()
-        all_subjects_qs = Subject.objects.filter(id__in=subject_ids).order_by('year_level', 'semester_offered', 'subject_name')
+        all_subjects_qs = order_subjects_by_term(Subject.objects.filter(id__in=subject_ids), student)
 
         # Get active grades for the student
-        active_grades_qs = student.grades.filter(is_active=True).select_related('subject')
-
-        # Bulk update grades with null or empty academic_year to student's academic_year
-        if student_academic_year:
-            student.grades.filter(Q(academic_year__isnull=True) | Q(academic_year='')).update(academic_year=student_academic_year)
-
-        # Re-fetch active grades after update
-        active_grades_qs = student.grades.filter(is_active=True).select_related('subject')
+        active_grades_qs = student.grades.filter(is_active=True).select_related('subject').order_by('pk')
 
         # Query distinct academic years from active grades
-        academic_years_qs = active_grades_qs.values_list('academic_year', flat=True).distinct()
-        academic_years = sorted([ay for ay in academic_years_qs if ay is not None])
+        academic_years = list(
+            active_grades_qs.exclude(academic_year__isnull=True)
+            .order_by('academic_year').values_list('academic_year', flat=True).distinct()
+        )
 
         # Map subject id to grade
         subject_grade_map = {grade.subject_id: grade for grade in active_grades_qs}
@@ -1704,31 +1699,14 @@ def student_record(request, pk):
                 'academic_year': grade.academic_year if grade else None,
             })
 
-        # Group by subject year_level and semester_offered then by subject name
+        # Group by subject year_level and semester; subjects already arrive in that order from SQL
         grouped_grades = {}
-        def semester_sort_key(semester):
-            order = {'1st': 1, '2nd': 2, '3rd': 3}
-            return order.get(semester.lower(), 99)
-
         for item in subjects_with_grades:
             subject = item['subject']
             grade = item['grade']
             year_key = subject.year_level if subject.year_level is not None else "Unassigned Year"
             semester_key = grade.semester if grade and grade.semester else (subject.semester_offered if subject.semester_offered else "Unassigned Semester")
-
-            if year_key not in grouped_grades:
-                grouped_grades[year_key] = {}
-            if semester_key not in grouped_grades[year_key]:
-                grouped_grades[year_key][semester_key] = []
-            grouped_grades[year_key][semester_key].append(item)
-
-        sorted_grouped_grades = {}
-        for year in sorted(grouped_grades.keys(), key=lambda x: int(x) if isinstance(x, int) or (isinstance(x, str) and x.isdigit()) else 99):
-            semesters = grouped_grades[year]
-            sorted_semesters = dict(sorted(semesters.items(), key=lambda x: semester_sort_key(x[0])))
-            sorted_grouped_grades[year] = sorted_semesters
-
-        grouped_grades = sorted_grouped_grades
+            grouped_grades.setdefault(year_key, {}).setdefault(semester_key, []).append(item)
 
         # Add subject_grade_map to context for template use
 
@@ -1746,6 +1724,11 @@ def student_record(request, pk):
         # Fetch inactive grades for removed subjects
         removed_grades = student.grades.filter(is_active=False).select_related('subject')
 
+        # Grades of closed terms moved to the archive table
+        archived_grades = student.archived_grades.select_related('subject').order_by(
+            'year_level', 'semester_order', 'academic_year', 'subject__subject_name'
+        )
+
         add_subject_form = AddStudentSubjectForm(student=student)
 
         # Group all subjects by year_level and semester_offered for the add subject form
@@ -1775,7 +1758,7 @@ def student_record(request, pk):
             grouped_subjects[year_level][semester].append(subject)
 
         # Fetch all subjects for the student's course regardless of grades
-        all_course_subjects_qs = Subject.objects.filter(course_id=student.course).order_by('year_level', 'semester_offered', 'subject_name')
+        all_course_subjects_qs = Subject.objects.filter(course_id=student.course).order_by('year_level', 'semester_order', 'subject_name')
 
         # Create a mapping of all subjects to their grades (active or inactive)
         subject_grade_map_all = {}
@@ -1795,7 +1778,13 @@ def student_record(request, pk):
                 grouped_all_course_subjects[year_level][semester] = []
             grouped_all_course_subjects[year_level][semester].append(subject)
 
-        logging.info(f"student_record view: student_id={student.id}, total subjects={len(all_subjects_qs)}, total course subjects={len(all_course_subjects_qs)}")
+        logging.info("student_record view: student_id=%s, total subjects=%s, total course subjects=%s",
+                     student.id, len(all_subjects_qs), len(all_course_subjects_qs))
+
+        from .gpa import student_gpa
+        from .rankings import current_ranking
+        gpa = student_gpa(student.pk)
+        ranking = current_ranking(student)
 
         subjects = all_subjects_qs
         return render(request, 'SMS(Cstudent).html', {
@@ -1803,6 +1792,7 @@ def student_record(request, pk):
             'grouped_grades': grouped_grades,
             'year_level_academic_years': year_level_academic_years,
             'removed_grades': removed_grades,
+            'archived_grades': archived_grades,
             'add_subject_form': add_subject_form,
             'grouped_subjects': grouped_subjects,
             'subjects': subjects,
@@ -1810,36 +1800,40 @@ def student_record(request, pk):
             'documents': documents,
             'grouped_all_course_subjects': grouped_all_course_subjects,
             'subject_grade_map_all': subject_grade_map_all,
+            'gpa': gpa,
+            'ranking': ranking,
+            'live_grades': sse_enabled(),
         })
     except Student.DoesNotExist:
         messages.error(request, "Student not found.")
         return redirect('student_list')
     except Exception as e:
-        logging.error(f"Unexpected error in student_record view: {str(e)}")
-        logging.error(traceback.format_exc())
+        logging.error("Unexpected error in student_record view: %s", e, exc_info=True)
         messages.error(request, "An unexpected error occurred. Please try again later.")
         return redirect('student_list')
 
 @login_required
 @student_required
+@conditional_page(own_grades_parts)
 def SMS_grade(request):
     import logging
     try:
-        student = Student.objects.filter(user=request.user).first()
+        student = request.student or None
         if not student:
             messages.error(request, "Student profile not found.")
             return redirect('student_dashboard')
 
         # Get all subjects for the student's course or department
-        all_subjects_qs = Subject.objects.filter(
+        all_subjects_qs = order_subjects_by_term(Subject.objects.filter(
             Q(course_id=student.course) | Q(department_name=student.department_name)
-        ).order_by('year_level', 'semester_offered', 'subject_name')
+        ), student)
 
-        # Get active grades for the student
-        active_grades_qs = student.grades.filter(is_active=True).select_related('subject')
+        # Get active grades for the student, including those of closed terms moved to the archive table
+        from .archive import GradeHistory
+        active_grades = GradeHistory().filter(student_id=student.pk, is_active=True).order_by('id')
 
         # Map subject id to grade
-        subject_grade_map = {grade.subject_id: grade for grade in active_grades_qs}
+        subject_grade_map = {grade.subject_id: grade for grade in active_grades}
 
         # Build list of subjects with their grades (or None if no grade)
         subjects_with_grades = []
@@ -1852,33 +1846,14 @@ def SMS_grade(request):
                 'academic_year': grade.academic_year if grade else None,
             })
 
-        # Group by subject year_level and semester_offered then by subject name
+        # Group by subject year_level and semester; subjects already arrive in that order from SQL
         grouped_grades = {}
-        def semester_sort_key(semester):
-            order = {'1st': 1, '2nd': 2, '3rd': 3}
-            if semester is None:
-                return 99
-            return order.get(semester.lower(), 99)
-
         for item in subjects_with_grades:
             subject = item['subject']
             grade = item['grade']
             year_key = subject.year_level if subject.year_level is not None else "Unassigned Year"
             semester_key = grade.semester if grade and grade.semester else (subject.semester_offered if subject.semester_offered else "Unassigned Semester")
-
-            if year_key not in grouped_grades:
-                grouped_grades[year_key] = {}
-            if semester_key not in grouped_grades[year_key]:
-                grouped_grades[year_key][semester_key] = []
-            grouped_grades[year_key][semester_key].append(item)
-
-        sorted_grouped_grades = {}
-        for year in sorted(grouped_grades.keys(), key=lambda x: int(x) if isinstance(x, int) or (isinstance(x, str) and x.isdigit()) else 99):
-            semesters = grouped_grades[year]
-            sorted_semesters = dict(sorted(semesters.items(), key=lambda x: semester_sort_key(x[0])))
-            sorted_grouped_grades[year] = sorted_semesters
-
-        grouped_grades = sorted_grouped_grades
+            grouped_grades.setdefault(year_key, {}).setdefault(semester_key, []).append(item)
 
         # Paginate by year_level
         year_levels = list(grouped_grades.keys())
@@ -1888,13 +1863,13 @@ def SMS_grade(request):
         try:
             page_number = int(page_number)
         except (ValueError, TypeError):
-            logging.warning(f"Invalid page number '{page_number}', defaulting to 1")
+            logging.warning("Invalid page number '%s', defaulting to 1", page_number)
             page_number = 1
 
         try:
             page_obj = paginator.page(page_number)
         except Exception as e:
-            logging.warning(f"Paginator error: {str(e)} - defaulting to page 1")
+            logging.warning("Paginator error: %s - defaulting to page 1", e)
             page_obj = paginator.page(1)
 
         current_year_level = page_obj.object_list[0]
@@ -1910,15 +1885,18 @@ def SMS_grade(request):
             'page_param': 'page',
         }
 
-        logging.info(f"SMS_grade pagination: page {page_obj.number} of {paginator.num_pages}, showing year_level {current_year_level}")
+        logging.info("SMS_grade pagination: page %s of %s, showing year_level %s", page_obj.number, paginator.num_pages, current_year_level)
 
+        from .rankings import current_ranking
         return render(request, 'SMS(grade).html', {
             'grouped_grades': paginated_grades,
             'student': student,
             'pagination_data': pagination_data,
+            'ranking': current_ranking(student),
+            'live_grades': sse_enabled(),
         })
     except Exception as e:
-        logging.error(f"Unexpected error in SMS_grade view: {str(e)}")
+        logging.error("Unexpected error in SMS_grade view: %s", e, exc_info=True)
         messages.error(request, "An unexpected error occurred. Please try again later.")
         return redirect('student_dashboard')
 
@@ -1930,7 +1908,7 @@ def student_subjects(request, student_id):
     student = get_object_or_404(Student, id=student_id)
 
     # Get all subjects in the student's course
-    subjects = Subject.objects.filter(course_id=student.course).order_by('year_level', 'semester_offered', 'subject_name')
+    subjects = Subject.objects.filter(course_id=student.course).order_by('year_level', 'semester_order', 'subject_name')
 
     # Get active grades for the student for these subjects
     active_grades_qs = student.grades.filter(subject__in=subjects, is_active=True).select_related('subject')
@@ -1959,6 +1937,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .models import Subject
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffit(request):
@@ -1977,7 +1956,7 @@ def SMSstaffit(request):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2001,7 +1980,7 @@ def SMSstaffit(request):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2049,6 +2028,7 @@ from .models import Student
 
 
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffvstu(request, subject_id, professor_name=None):
@@ -2070,23 +2050,24 @@ def SMSstaffvstu(request, subject_id, professor_name=None):
     # Get distinct professor names for the subject's subject_name
     professor_names = []
     if subject:
-        professor_names = list(Subject.objects.filter(subject_name=subject.subject_name).values_list('professor_name', flat=True).distinct())
+        professor_names = list(Professor.objects.filter(subjects__subject_name=subject.subject_name).values_list('name', flat=True).distinct())
 
     if subject:
-     # Filter students who have an active grade for the subject or a subject with the same subject_name
+        grade_filters = {
+            'grades__subject__subject_name': subject.subject_name,
+            'grades__is_active': True,
+            'grades__status': 'Currently Taking',
+        }
+        # If professor_name is provided, only keep the grades of that professor's subjects
+        if professor_name:
+            grade_filters['grades__subject__professor__name'] = professor_name
+
+        # Filter students who have an active grade for the subject or a subject with the same subject_name
         students = Student.objects.filter(
-            grades__subject__subject_name=subject.subject_name,
-            grades__is_active=True,
-            grades__status='Currently Taking',
             course__department_name__name="College of Computer Studies",
-            student_status='Enrolled'
+            student_status='Enrolled',
+            **grade_filters
         ).distinct()
-
-        # If professor_name is provided, filter students by professor_name
-        if professor_name:
-            students = students.filter(
-                grades__subject__professor_name=professor_name
-            ).distinct()
     else:
         # If no subject found, fallback to all students in department
         students = Student.objects.filter(course__department_name__name="College of Computer Studies", student_status='Enrolled')
@@ -2100,7 +2081,7 @@ def SMSstaffvstu(request, subject_id, professor_name=None):
         )
 
     # Add ordering by year_level for proper grouping and display
-    students = students.order_by('year_level')
+    students = students.select_related('course').order_by('year_level')
 
     grouped_students = defaultdict(list)
     for student in students:
@@ -2137,7 +2118,7 @@ def SMSstaffcstu(request, pk):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2161,7 +2142,7 @@ def SMSstaffcstu(request, pk):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2221,6 +2202,7 @@ def SMSstaffcstu(request, pk):
 
 #new
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffhm(request):
@@ -2238,7 +2220,7 @@ def SMSstaffhm(request):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2262,7 +2244,7 @@ def SMSstaffhm(request):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2308,6 +2290,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .models import Student
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffvstuhm(request, subject_id):
@@ -2339,7 +2322,7 @@ def SMSstaffvstuhm(request, subject_id):
         )
 
     grouped_students = defaultdict(list)
-    for student in students:
+    for student in students.select_related('course'):
         year = student.year_level if student.year_level else "Unassigned Year"
         grouped_students[year].append(student)
     # Convert defaultdict to regular dict for template context
@@ -2366,7 +2349,7 @@ def SMSstaffcstuhm(request, pk):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2390,7 +2373,7 @@ def SMSstaffcstuhm(request, pk):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2451,6 +2434,7 @@ def SMSstaffcstuhm(request, pk):
 
 #newba
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffba(request):
@@ -2468,7 +2452,7 @@ def SMSstaffba(request):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2492,7 +2476,7 @@ def SMSstaffba(request):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2538,6 +2522,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .models import Student
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffvstuba(request, subject_id):
@@ -2569,12 +2554,12 @@ def SMSstaffvstuba(request, subject_id):
         )
 
     grouped_students = defaultdict(list)
-    for student in students:
+    for student in students.select_related('course'):
         year = student.year_level if student.year_level else "Unassigned Year"
         grouped_students[year].append(student)
     # Convert defaultdict to regular dict for template context
     grouped_students = dict(grouped_students)
-    return render(request, 'staffpage/SMS(staffvstuba).html', {'grouped_students': grouped_students, 'search_query': search_query})
+    return render(request, 'staffpage/SMS(staffvstuba).html', {'grouped_students': grouped_students, 'search_query': search_query, 'subject_id': subject_id})
 
 @login_required
 @staff_required
@@ -2596,7 +2581,7 @@ def SMSstaffcstuba(request, pk):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2620,7 +2605,7 @@ def SMSstaffcstuba(request, pk):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2680,6 +2665,7 @@ def SMSstaffcstuba(request, pk):
 
 #newA
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffA(request):
@@ -2696,7 +2682,7 @@ def SMSstaffA(request):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2720,7 +2706,7 @@ def SMSstaffA(request):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2766,6 +2752,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .models import Student
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffvstuA(request, subject_id):
@@ -2797,7 +2784,7 @@ def SMSstaffvstuA(request, subject_id):
         )
 
     grouped_students = defaultdict(list)
-    for student in students:
+    for student in students.select_related('course'):
         year = student.year_level if student.year_level else "Unassigned Year"
         grouped_students[year].append(student)
     # Convert defaultdict to regular dict for template context
@@ -2823,7 +2810,7 @@ def SMSstaffcstuA(request, pk):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2847,7 +2834,7 @@ def SMSstaffcstuA(request, pk):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2907,6 +2894,7 @@ def SMSstaffcstuA(request, pk):
 
 #newE
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffE(request):
@@ -2928,7 +2916,7 @@ def SMSstaffE(request):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -2952,7 +2940,7 @@ def SMSstaffE(request):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -2998,6 +2986,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from .models import Student
 
+@replica_reads
 @login_required
 @staff_required
 def SMSstaffvstuE(request, subject_id):
@@ -3029,12 +3018,12 @@ def SMSstaffvstuE(request, subject_id):
         )
 
     grouped_students = defaultdict(list)
-    for student in students:
+    for student in students.select_related('course'):
         year = student.year_level if student.year_level else "Unassigned Year"
         grouped_students[year].append(student)
     # Convert defaultdict to regular dict for template context
     grouped_students = dict(grouped_students)
-    return render(request, 'staffpage/SMS(staffvstuE).html', {'grouped_students': grouped_students, 'search_query': search_query})
+    return render(request, 'staffpage/SMS(staffvstuE).html', {'grouped_students': grouped_students, 'search_query': search_query, 'subject_id': subject_id})
 
 @login_required
 @staff_required
@@ -3060,7 +3049,7 @@ def SMSstaffcstuE(request, pk):
     for name in course_names:
         course_name_filter |= Q(course_id__name__icontains=name)
 
-    subjects = Subject.objects.filter(course_name_filter)
+    subjects = Subject.objects.filter(course_name_filter).select_related('course_id', 'department_name')
     if search_query:
             try:
                 credits_query = int(search_query)
@@ -3084,7 +3073,7 @@ def SMSstaffcstuE(request, pk):
                     Q(year_level__icontains=search_query) |
                     Q(course_id__name__icontains=search_query)
                 )
-    subjects = subjects.order_by('course_id__name', 'year_level')
+    subjects = subjects.order_by('course_id__name', 'year_level', 'semester_order')
 
     grouped_by_course = {}
     for subject in subjects:
@@ -3145,50 +3134,35 @@ def SMSstaffcstuE(request, pk):
 @student_required
 @login_required
 def SMS_it(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+    student = request.student or None
     departments = Department.objects.all()
     return render(request, 'SMScourse/SMS(it).html', {'user': request.user, 'student': student, 'departments': departments})
 
 @student_required
 @login_required
 def SMS_hm(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+    student = request.student or None
     departments = Department.objects.all()
     return render(request, 'SMScourse/SMS(hm).html', {'user': request.user, 'student': student, 'departments': departments})
 
 @student_required
 @login_required
 def SMS_ba(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+    student = request.student or None
     departments = Department.objects.all()
     return render(request, 'SMScourse/SMS(BA).html', {'user': request.user, 'student': student, 'departments': departments})
 
 @student_required
 @login_required
 def SMS_ed(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+    student = request.student or None
     departments = Department.objects.all()
     return render(request, 'SMScourse/SMS(ED).html', {'user': request.user, 'student': student, 'departments': departments})
 
 @student_required
 @login_required
 def SMS_a(request):
-    try:
-        student = Student.objects.get(user=request.user)
-    except Student.DoesNotExist:
-        student = None
+    student = request.student or None
     departments = Department.objects.all()
     return render(request, 'SMScourse/SMS(A).html', {'user': request.user, 'student': student, 'departments': departments})
 
@@ -3218,7 +3192,7 @@ def account(request):
 
     return render(request, 'SMS(account).html', {
         'form': form,
-        'student': getattr(user, 'student_profile', None)
+        'student': request.student or None
     })
 
 @staff_required
@@ -3243,6 +3217,176 @@ def accountstaff(request):
 
     return render(request, 'SMS(accountstaff).html', {
         'form': form,
-        'student': getattr(user, 'student_profile', None)
+        'student': request.student or None
+    })
+
+
+MAX_TRANSCRIPT_IDS = 5000
+
+@replica_reads
+@admin_required
+@login_required
+def transcripts_batch(request):
+    """
+    Stream the transcripts of many students as one JSON document.
+
+    Students are picked either by id (?student_ids=1,2,3 or a POSTed JSON body
+    {"student_ids": [...]}) or by filter (?course=, ?year_level=, ?academic_year=,
+    ?status=). Grades and subjects are loaded in batch by TranscriptLoader, so the
+    request costs the same three queries for 5 students as for 500.
+    """
+    from django.http import StreamingHttpResponse
+    from .transcripts import TranscriptLoader, stream_transcripts_json
+
+    if request.method not in ('GET', 'POST'):
+        return JsonResponse({'success': False, 'error': 'Invalid request method'}, status=405)
+
+    student_ids = None
+    if request.method == 'POST':
+        try:
+            student_ids = json.loads(request.body or b'{}').get('student_ids')
+        except (ValueError, AttributeError):
+            return JsonResponse({'success': False, 'error': 'Invalid JSON body.'}, status=400)
+    elif request.GET.get('student_ids'):
+        student_ids = [value for value in request.GET['student_ids'].split(',') if value.strip()]
+
+    loader = TranscriptLoader(include_inactive=request.GET.get('include_inactive') in ('1', 'true'))
+    if student_ids is not None:
+        if not isinstance(student_ids, list) or len(student_ids) > MAX_TRANSCRIPT_IDS:
+            return JsonResponse({'success': False, 'error': f'student_ids must be a list of at most {MAX_TRANSCRIPT_IDS} ids.'}, status=400)
+        try:
+            loader.load_many(student_ids)
+        except (TypeError, ValueError):
+            return JsonResponse({'success': False, 'error': 'student_ids must contain integers only.'}, status=400)
+    else:
+        filters = {
+            'course_id': request.GET.get('course'),
+            'year_level': request.GET.get('year_level'),
+            'academic_year': request.GET.get('academic_year'),
+            'student_status': request.GET.get('status'),
+        }
+        filters = {lookup: value for lookup, value in filters.items() if value}
+        if not filters:
+            return JsonResponse({'success': False, 'error': 'Pass student_ids or at least one of course, year_level, academic_year, status.'}, status=400)
+        try:
+            loader.load_queryset(Student.objects.filter(**filters))
+        except (ValueError, ValidationError):
+            return JsonResponse({'success': False, 'error': 'Invalid filter value.'}, status=400)
+
+    logging.info("Streaming batch transcripts for %s", request.user.username)
+    return StreamingHttpResponse(stream_transcripts_json(loader), content_type='application/json')
+
+SSE_KEEPALIVE_SECONDS = 20
+
+def sse_enabled():
+    """Whether the grade event streams are served: only with SSE_ENABLED, set when the ASGI app serves the site"""
+    from django.conf import settings
+    return getattr(settings, 'SSE_ENABLED', False)
+
+async def _sse_stream(channels, last_event_id, max_seconds):
+    """
+    Relay broker events to one client, with a comment line as keepalive, until it disconnects or
+    max_seconds pass; EventSource then reconnects and replays what it missed via Last-Event-ID.
+    """
+    import asyncio
+    from .events import broker
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_seconds
+    async with broker.subscribe(channels, last_event_id) as subscription:
+        yield 'retry: 5000\n\n'
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                message = await asyncio.wait_for(subscription.get(), timeout=min(SSE_KEEPALIVE_SECONDS, remaining))
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield message
+
+def _sse_response(request, channels):
+    from django.conf import settings
+    from django.http import StreamingHttpResponse
+
+    try:
+        last_event_id = int(request.headers.get('Last-Event-ID', ''))
+    except ValueError:
+        last_event_id = None
+    max_seconds = getattr(settings, 'SSE_MAX_STREAM_SECONDS', 300)
+    response = StreamingHttpResponse(_sse_stream(channels, last_event_id, max_seconds), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Keep nginx from buffering the stream
+    return response
+
+@login_required
+async def student_grade_events(request, student_id):
+    """
+    Server-Sent Events stream of grade and enrollment changes of one student.
+    Admins and staff may follow any student; students only themselves. Serve it from the ASGI app.
+    """
+    from django.core.handlers.asgi import ASGIRequest
+    from .events import student_channel
+
+    # Under WSGI the endless stream would be read to the end before anything is sent, holding a worker
+    if not sse_enabled() or not isinstance(request, ASGIRequest):
+        raise Http404('Live grade events are not enabled.')
+    user = await request.auser()
+    if request.role == User.Role.STUDENT:
+        if not await Student.objects.filter(pk=student_id, user_id=user.pk).aexists():
+            raise PermissionDenied
+    elif request.role not in (User.Role.ADMIN, User.Role.STAFF):
+        raise PermissionDenied
+    return _sse_response(request, [student_channel(student_id)])
+
+@login_required
+async def subject_grade_events(request, subject_id):
+    """Server-Sent Events stream of grade and enrollment changes of one subject, for admins and staff"""
+    from django.core.handlers.asgi import ASGIRequest
+    from .events import subject_channel
+
+    if not sse_enabled() or not isinstance(request, ASGIRequest):
+        raise Http404('Live grade events are not enabled.')
+    if request.role not in (User.Role.ADMIN, User.Role.STAFF):
+        raise PermissionDenied
+    return _sse_response(request, [subject_channel(subject_id)])
+
+@replica_reads
+@login_required
+@admin_or_staff_required
+def grade_analytics(request):
+    """Grade distributions (histogram, pass rate, mean, percentiles) per subject, professor and term"""
+    from .analytics import GROUPINGS, grade_distribution, parse_distribution_params
+
+    try:
+        group_by, filters = parse_distribution_params(request.GET)
+    except ValueError as e:
+        messages.error(request, str(e))
+        group_by, filters = ['subject'], {}
+    distribution = grade_distribution(group_by, filters)
+    return render(request, 'SMS(analytics).html', {
+        'distribution': distribution,
+        'groupings': list(GROUPINGS),
+        'selected': request.GET,
+        'courses': Course.objects.order_by('name').only('id', 'name'),
+        'professors': Professor.objects.order_by('name').only('id', 'name'),
+        'dashboard_url': 'staff_dashboard' if request.role == User.Role.STAFF else 'admin_dashboard',
     })
 
+
+def metrics(request):
+    """
+    Request, query, cache and queue metrics in the Prometheus text format (see metrics.py).
+    Scrapers authenticate with the METRICS_TOKEN bearer token or, without one, by coming from
+    one of METRICS_ALLOWED_IPS.
+    """
+    import hmac
+    from django.conf import settings
+    from .metrics import render
+
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        allowed = request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if not allowed:
+        raise PermissionDenied
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
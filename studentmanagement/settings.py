@@ -42,11 +42,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'student_management_system.middleware.RequestIDMiddleware',  # X-Request-ID, stamped on every log record
+    'student_management_system.middleware.ProfilingMiddleware',  # Sampled SQL/template timing; off unless REQUEST_PROFILING_SAMPLE_RATE > 0
+    'student_management_system.middleware.MetricsMiddleware',  # Request counts, latency and queries for /metrics
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'student_management_system.middleware.ReplicaMiddleware',  # Reads of @replica_reads views go to DATABASE_REPLICAS
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'student_management_system.middleware.RoleMiddleware',  # Resolves request.role / request.student once per request
+    'student_management_system.middleware.AuditMiddleware',  # Actor of grade audit entries; flushes the audit buffer
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -83,10 +89,48 @@ DATABASES = {
         'PASSWORD': 'student@pass',
         'HOST': 'localhost',
         'PORT': '3306',
-
+        # Keep connections between requests instead of opening one per request, and check a kept
+        # connection before reusing it. Under ASGI, or to share connections between threads, set
+        # CONN_MAX_AGE to 0 and use the pooled backend instead (see student_management_system/db/pool.py):
+        #   'ENGINE': 'student_management_system.db.mysql',
+        #   'OPTIONS': {'pool': {'max_size': 10, 'timeout': 10}},
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Cache shared by every worker process. Grade distributions (analytics.py) and dashboard KPIs
+# (kpis.py) are invalidated by bumping a version key or deleting a key, which only reaches the
+# processes reading the same cache; a per-process cache would serve stale numbers for up to
+# their TTL. With REDIS_URL set the cache is Redis (shared across hosts, needs the redis
+# package); otherwise files under CACHE_DIR, shared by the workers of one host.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR', os.path.join(BASE_DIR, 'cache')),
+            # incr() on this backend re-sets the key with the default timeout, which would expire
+            # the grade version counter; every other write passes its own timeout
+            'TIMEOUT': None,
+        }
+    }
+
+# Aliases of read replicas of 'default' in DATABASES. Reporting, roster and catalog pages read
+# from them, except for REPLICA_STICKY_SECONDS after the session writes (see
+# student_management_system/replicas.py). Locally, a copy of an SQLite database stands in:
+#   DATABASES['replica'] = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'replica.sqlite3'}
+#   DATABASE_REPLICAS = ['replica']
+DATABASE_REPLICAS = []
+REPLICA_STICKY_SECONDS = 10
+DATABASE_ROUTERS = ['student_management_system.replicas.ReplicaRouter']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -141,9 +185,69 @@ LOGIN_URL = '/accounts/login/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Read API (student_management_system/api.py)
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'student_management_system.User'
 
+# Log in with either a username or an email address
+AUTHENTICATION_BACKENDS = [
+    'student_management_system.backends.UsernameOrEmailBackend',
+]
+
+# Hash a dummy password when no account matches, so failed logins take as long as successful ones
+LOGIN_DUMMY_PASSWORD_HASH = True
+
+# Share of requests profiled by ProfilingMiddleware (0 = off, 1 = every request), and how often
+# one query shape may repeat in a request before it is logged as a possible N+1
+REQUEST_PROFILING_SAMPLE_RATE = 0.0
+REQUEST_PROFILING_DUPLICATE_THRESHOLD = 5
+
+# /metrics (Prometheus text format). Under a prefork server, point METRICS_MULTIPROCESS_DIR at a
+# directory shared by the workers and emptied at startup. Scrapers are let in by address, or by
+# bearer token when METRICS_TOKEN is set.
+METRICS_MULTIPROCESS_DIR = None
+METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+METRICS_TOKEN = None
+
+# Live grade updates over Server-Sent Events. The streams only work when the site is served by the
+# ASGI app (studentmanagement/asgi.py); under WSGI each one would hold a worker thread, so they stay
+# off (404, and pages do not open them) until SSE_ENABLED is set. Streams close after
+# SSE_MAX_STREAM_SECONDS and the browser reconnects.
+SSE_ENABLED = False
+SSE_MAX_STREAM_SECONDS = 300
+
+# Logs are JSON lines carrying the request ID (see student_management_system/logs.py). With
+# LOG_QUEUE, a background thread writes them so requests never wait on log I/O.
+LOG_QUEUE = True
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_id': {'()': 'student_management_system.logs.RequestIDFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'student_management_system.logs.JsonFormatter'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'json', 'filters': ['request_id']},
+    },
+    'root': {'handlers': ['console'], 'level': os.environ.get('LOG_LEVEL', 'WARNING')},
+    # Through the root handler rather than Django's own console handler, so nothing is written twice
+    'loggers': {
+        'django': {'level': 'INFO'},
+    },
+}
+
 # Set DEBUG to False for production
 # DEBUG = False
 
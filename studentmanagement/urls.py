@@ -15,8 +15,9 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
+from django.urls import include, path
 from student_management_system import views 
+from student_management_system import api
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
@@ -93,6 +94,14 @@ path('SMS-staffvstu/<int:subject_id>/<str:professor_name>/', views.SMSstaffvstu,
     path('account/', views.account, name='account'),
     path('account-staff/', views.accountstaff, name='accountstaff'),
     path('student/update-subject-status-ajax/', views.update_subject_status_ajax, name='update_subject_status_ajax'),
+    path('transcripts/batch/', views.transcripts_batch, name='transcripts_batch'),
+    path('events/student/<int:student_id>/', views.student_grade_events, name='student_grade_events'),
+    path('events/subject/<int:subject_id>/', views.subject_grade_events, name='subject_grade_events'),
+    path('analytics/grades/', views.grade_analytics, name='grade_analytics'),
+    path('metrics', views.metrics, name='metrics'),
+
+    # Read API
+    path('api/v1/', include(api.router.urls)),
 
     # Password reset URLs
     path('password-reset/', auth_views.PasswordResetView.as_view(template_name='password_reset.html'), name='password_reset'),